@@ -1,8 +1,13 @@
 from sqlalchemy.orm import Session
 from .models_features import AuditLog
+from .audit_writer import PENDING_KEY, audit_writer, make_entry
 
 
 def log_action(db: Session, user_id: int, action: str, entity_type: str, entity_id: int, details: str | None = None):
+    if audit_writer.running:
+        # Journaled as the session commits and inserted in a batch later (see audit_writer.py)
+        db.info.setdefault(PENDING_KEY, []).append(make_entry(user_id, action, entity_type, entity_id, details))
+        return
     entry = AuditLog(
         user_id=user_id,
         action=action,
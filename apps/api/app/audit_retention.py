@@ -0,0 +1,258 @@
+"""
+Monthly audit log partitions, retention and archive export.
+
+On Postgres ``audit_logs`` is range-partitioned by month on ``created_at``
+(migration 0007): one table per month, ``audit_logs_yYYYYmMM``, plus
+``audit_logs_default`` for rows outside them. Each partition carries the
+(user_id, created_at desc) index, so the newest rows of a user come from the
+newest partitions, and expiring a month drops a table instead of deleting rows
+from one ever-growing table and its index.
+
+SQLite has no partitioning. There the same month boundaries are applied to
+the single table, and an expired month is deleted by range, which keeps the
+table (the hot working set) to the retention window all the same.
+
+A month older than ``audit_retention_months`` is first exported to
+``<audit_archive_dir>/audit_logs_YYYYMM.jsonl.gz``, one JSON object per row.
+The file is written under a temporary name, fsync'd and renamed. Only then
+are the month's rows removed, so an interrupted run never drops unarchived
+rows. Rows that arrive for a month after it was archived (a late journal
+replay) go to the next run's ``audit_logs_YYYYMM.1.jsonl.gz``.
+
+    python -m app.audit_retention              # create upcoming partitions, archive expired months
+    python -m app.audit_retention --dry-run    # show what would be archived
+    python -m app.audit_retention --months 6   # override audit_retention_months
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import Date, delete, func, literal, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from .config import settings
+from .models_features import AuditLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = "audit_logs_default"
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"audit_logs_y{month.year:04d}m{month.month:02d}"
+
+
+def _in_month(month: date):
+    # Bound as DATE: compares correctly with SQLite's stored timestamp strings too
+    return (AuditLog.created_at >= literal(month, Date)) & (AuditLog.created_at < literal(add_months(month, 1), Date))
+
+
+# ── Postgres partitions ──────────────────────────────
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('audit_logs'))"
+    )).scalar())
+
+
+def month_partitions(conn: Connection) -> dict[date, str]:
+    """Existing monthly partitions of audit_logs by month (Postgres)."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('audit_logs')"
+    )).scalars()
+    out = {}
+    for name in names:
+        if name.startswith("audit_logs_y") and len(name) == len("audit_logs_y2000m01"):
+            out[date(int(name[12:16]), int(name[17:19]), 1)] = name
+    return out
+
+
+def ensure_partitions(conn: Connection, first: date, last: date):
+    """Create the monthly partitions from ``first`` through ``last`` that don't exist yet (Postgres)."""
+    existing = month_partitions(conn)
+    month = month_start(first)
+    while month <= last:
+        if month not in existing:
+            name = partition_name(month)
+            try:
+                with conn.begin_nested():
+                    conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF audit_logs "
+                        f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+                    ))
+            except Exception:
+                # Fails if audit_logs_default already holds rows for that month; they stay there
+                logger.warning("Could not create audit partition %s", name, exc_info=True)
+        month = add_months(month, 1)
+
+
+def partition_audit_logs(conn: Connection, months_ahead: int):
+    """Convert a plain audit_logs into the monthly-partitioned layout (Postgres; no-op if done).
+
+    Copies the rows into the new table, so it takes a while on a large log.
+    The primary key becomes (id, created_at), as Postgres requires the
+    partition key in it; ids keep coming from the same sequence.
+    """
+    if conn.dialect.name != "postgresql" or is_partitioned(conn):
+        return
+    oldest = conn.execute(text("SELECT min(created_at) FROM audit_logs")).scalar()
+    this_month = month_start(date.today())
+    conn.execute(text("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE"))
+    conn.execute(text("ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned"))
+    conn.execute(text("""
+        CREATE TABLE audit_logs (
+            id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            action VARCHAR(50) NOT NULL,
+            entity_type VARCHAR(50) NOT NULL,
+            entity_id INTEGER NOT NULL,
+            details TEXT,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT audit_logs_partitioned_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF audit_logs DEFAULT"))
+    ensure_partitions(conn, oldest.date() if oldest else this_month, add_months(this_month, months_ahead))
+    conn.execute(text(
+        "INSERT INTO audit_logs (id, user_id, action, entity_type, entity_id, details, created_at) "
+        "SELECT id, user_id, action, entity_type, entity_id, details, coalesce(created_at, now()) "
+        "FROM audit_logs_unpartitioned"
+    ))
+    conn.execute(text("DROP TABLE audit_logs_unpartitioned"))
+    conn.execute(text("ALTER TABLE audit_logs RENAME CONSTRAINT audit_logs_partitioned_pkey TO audit_logs_pkey"))
+    conn.execute(text("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id"))
+    for index in AuditLog.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# ── Retention ────────────────────────────────────────
+
+
+def expired_months(conn: Connection, cutoff: date) -> list[date]:
+    """Months before ``cutoff`` that still have rows (or, on Postgres, a partition)."""
+    months = set()
+    oldest = conn.execute(select(func.min(AuditLog.created_at)).where(AuditLog.created_at < literal(cutoff, Date))).scalar()
+    if oldest is not None:
+        if isinstance(oldest, str):  # SQLite returns aggregates of DateTime columns unparsed
+            oldest = datetime.fromisoformat(oldest)
+        month = month_start(oldest.date())
+        while month < cutoff:
+            if conn.execute(select(AuditLog.id).where(_in_month(month)).limit(1)).first():
+                months.add(month)
+            month = add_months(month, 1)
+    if is_partitioned(conn):
+        months.update(m for m in month_partitions(conn) if m < cutoff)
+    return sorted(months)
+
+
+def _archive_path(archive_dir: str, month: date) -> str:
+    base = os.path.join(archive_dir, f"audit_logs_{month.year:04d}{month.month:02d}")
+    path, n = f"{base}.jsonl.gz", 0
+    while os.path.exists(path):
+        n += 1
+        path = f"{base}.{n}.jsonl.gz"
+    return path
+
+
+def export_month(conn: Connection, month: date, archive_dir: str) -> tuple[int, int | None, str | None]:
+    """Write the month's rows to a gzip JSONL archive. Returns (rows, highest id, path)."""
+    rows = conn.execution_options(yield_per=1000).execute(
+        select(AuditLog.__table__).where(_in_month(month)).order_by(AuditLog.id)
+    )
+    path = _archive_path(archive_dir, month)
+    tmp = path + ".tmp"
+    count, max_id = 0, None
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for row in rows:
+                record = dict(row._mapping)
+                record["created_at"] = str(record["created_at"])
+                gz.write((json.dumps(record, separators=(",", ":")) + "\n").encode())
+                count += 1
+                max_id = row.id
+        raw.flush()
+        os.fsync(raw.fileno())
+    if not count:
+        os.remove(tmp)
+        return 0, None, None
+    os.replace(tmp, path)
+    return count, max_id, path
+
+
+def archive_month(conn: Connection, month: date, archive_dir: str) -> tuple[int, str | None]:
+    """Export one month to the archive, then remove it from the database. Returns (rows, path)."""
+    partition = month_partitions(conn).get(month) if is_partitioned(conn) else None
+    if partition:
+        conn.execute(text(f"LOCK TABLE {partition} IN SHARE MODE"))  # no inserts into it while exporting
+    count, max_id, path = export_month(conn, month, archive_dir)
+    if partition:
+        conn.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {partition}"))
+        conn.execute(text(f"DROP TABLE {partition}"))
+    if max_id is not None:
+        # Only rows that made it into the file (the default partition or the SQLite table)
+        conn.execute(delete(AuditLog).where(_in_month(month), AuditLog.id <= max_id))
+    return count, path
+
+
+def run_retention(engine: Engine, months: int, archive_dir: str, months_ahead: int,
+                  dry_run: bool = False, today: date | None = None) -> list[tuple[date, int, str | None]]:
+    """Create upcoming partitions and archive every month older than ``months``. Each month is its own transaction."""
+    this_month = month_start(today or date.today())
+    cutoff = add_months(this_month, -months)
+    with engine.begin() as conn:
+        if is_partitioned(conn) and not dry_run:
+            ensure_partitions(conn, this_month, add_months(this_month, months_ahead))
+        expired = expired_months(conn, cutoff) if months > 0 else []
+    if dry_run:
+        with engine.connect() as conn:
+            return [(m, conn.execute(select(func.count(AuditLog.id)).where(_in_month(m))).scalar(), None)
+                    for m in expired]
+    os.makedirs(archive_dir, exist_ok=True)
+    done = []
+    for month in expired:
+        with engine.begin() as conn:
+            count, path = archive_month(conn, month, archive_dir)
+        logger.info("Archived %s: %d rows%s", month.strftime("%Y-%m"), count, f" to {path}" if path else "")
+        done.append((month, count, path))
+    return done
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.audit_retention")
+    parser.add_argument("--months", type=int, default=settings.audit_retention_months,
+                        help="months of history to keep (0 = keep everything)")
+    parser.add_argument("--archive-dir", default=settings.audit_archive_dir)
+    parser.add_argument("--dry-run", action="store_true", help="list expired months and row counts only")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from .db import engine
+
+    results = run_retention(engine, args.months, args.archive_dir, settings.audit_partitions_ahead, args.dry_run)
+    for month, count, path in results:
+        print(f"{month.strftime('%Y-%m')}  {count:8d} rows  {path or ('(dry run)' if args.dry_run else '')}")
+    if not results:
+        print(f"Nothing older than {args.months} months")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Buffered audit log writer.
+
+``log_action`` used to INSERT and flush each audit entry inside the request's
+transaction. With the writer running, entries wait on the session until it
+commits, are appended to a local journal file just before the commit, and a
+background thread inserts them into ``audit_logs`` in multi-row batches.
+Entries of a transaction that rolls back are dropped, as before.
+
+Durability: entries are journaled (and fsync'd, ``audit_journal_fsync``)
+ahead of the commit, tagged with a transaction id that the transaction itself
+records in ``audit_journal_txns``. A crash after the commit therefore can't
+lose a committed change's entries, and a journal I/O error fails the request
+before anything is committed. Entries are inserted only if their id is in
+``audit_journal_txns`` (a transaction that crashed or rolled back after
+journaling never wrote it), and the id is deleted in the same insert. In this
+process, a segment is inserted only once every transaction in it has
+committed or rolled back.
+
+The journal is split into segments of at most ``audit_batch_size`` entries;
+each segment is inserted in one transaction that also records its name in
+``audit_journal_segments``, then its file is deleted. On startup every worker
+picks up segments no live worker holds (each holds an flock on its own) and
+inserts them, skipping any already recorded, so replay never duplicates rows.
+
+The buffer is bounded: once ``audit_max_pending`` entries are waiting (e.g.
+the database is down), commits wait up to a few seconds for the flusher
+before journaling anyway, since the journal on disk is what makes them safe.
+
+Off by default (``audit_buffered``): each committing transaction still does
+one INSERT (its ``audit_journal_txns`` row) plus the journal fsync, so request
+latency is about the same as inserting the entries directly. What it saves is
+the ``audit_logs`` rows and index updates inside request transactions, which
+only matters for requests that log many entries or when ``audit_logs`` writes
+are the contended part.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models_features import AuditLog, AuditJournalSegment, AuditJournalTxn
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locks, so one worker per journal directory
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "audit_pending"
+TXN_KEY = "audit_txn"
+_SUFFIX = ".jsonl"
+_INSERT_CHUNK = 500  # rows per INSERT statement
+_BACKPRESSURE_WAIT_SECONDS = 5
+
+
+def _lock(fh) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class _Segment:
+    def __init__(self, path: str, fh, entries: int = 0):
+        self.path = path
+        self.name = os.path.basename(path)[:-len(_SUFFIX)]
+        self.fh = fh
+        self.entries = entries
+        self.open_txns: set[str] = set()  # journaled here, not yet committed or rolled back
+
+
+class AuditWriter:
+    def __init__(self, journal_dir: str, flush_interval_ms: int, batch_size: int, max_pending: int, fsync: bool):
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self.flushed = 0
+        self.flush_errors = 0
+        self._bind = None
+        self._active: _Segment | None = None
+        self._sealed: list[_Segment] = []  # oldest first
+        self._open_txns: dict[str, _Segment] = {}
+        self._lock = threading.Lock()  # guards _active, _sealed
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._drained = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending_locked()
+
+    def _pending_locked(self) -> int:
+        return sum(s.entries for s in self._sealed) + (self._active.entries if self._active else 0)
+
+    def start(self, bind=None):
+        """Recover segments left by dead workers and start the flush thread."""
+        if self.running:
+            return
+        from .db import engine, writer_engine
+        self._bind = bind or writer_engine or engine
+        os.makedirs(self.journal_dir, exist_ok=True)
+        recovered = self._claim_orphans()
+        if recovered:
+            logger.info("Audit journal: recovered %d entries from %d segment(s)",
+                        sum(s.entries for s in recovered), len(recovered))
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        """Flush everything and stop the thread. Entries that can't be inserted stay in the journal."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._wake.set()
+        thread.join(timeout)
+        self.flush()
+        with self._lock:
+            for segment in self._sealed:
+                segment.fh.close()
+            self._sealed.clear()
+
+    def write(self, entries: list[dict], txn: str):
+        """Append a committing transaction's entries to the journal (durable when this returns).
+
+        They are inserted once ``resolve(txn)`` is called, if the transaction recorded ``txn``.
+        """
+        data = "".join(json.dumps({**e, "txn": txn}, separators=(",", ":")) + "\n" for e in entries)
+        with self._lock:
+            if self._pending_locked() >= self.max_pending:
+                self._wake.set()
+                self._drained.wait(_BACKPRESSURE_WAIT_SECONDS)
+            if self._active is None:
+                self._active = self._open_segment()
+            fh = self._active.fh
+            fh.write(data)
+            fh.flush()
+            if self.fsync:
+                os.fsync(fh.fileno())
+            self._active.entries += len(entries)
+            self._active.open_txns.add(txn)
+            self._open_txns[txn] = self._active
+            if self._active.entries >= self.batch_size:
+                self._seal_locked()
+                self._wake.set()
+
+    def resolve(self, txn: str):
+        """The transaction that journaled ``txn`` has committed or rolled back."""
+        with self._lock:
+            segment = self._open_txns.pop(txn, None)
+            if segment is not None:
+                segment.open_txns.discard(txn)
+
+    def flush(self) -> int:
+        """Insert every sealed segment plus the active one, but those with transactions still
+        committing. Returns entries inserted."""
+        with self._flush_lock:
+            with self._lock:
+                self._seal_locked()
+                segments = [segment for segment in self._sealed if not segment.open_txns]
+            inserted = 0
+            for segment in segments:
+                try:
+                    inserted += self._insert(segment)
+                except Exception:
+                    self.flush_errors += 1
+                    logger.exception("Audit journal: inserting segment %s failed, will retry", segment.name)
+                    break
+                with self._lock:
+                    self._sealed.remove(segment)
+                    self._drained.notify_all()
+                self._discard(segment)
+            self.flushed += inserted
+            return inserted
+
+    def _run(self):
+        while self._thread is not None:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _open_segment(self) -> _Segment:
+        path = os.path.join(self.journal_dir, f"{uuid.uuid4().hex}{_SUFFIX}")
+        fh = open(path, "a", encoding="utf-8")
+        _lock(fh)
+        return _Segment(path, fh)
+
+    def _seal_locked(self):
+        if self._active is not None and self._active.entries:
+            self._sealed.append(self._active)
+            self._active = None
+
+    def _claim_orphans(self) -> list[_Segment]:
+        claimed = []
+        paths = [os.path.join(self.journal_dir, n) for n in os.listdir(self.journal_dir) if n.endswith(_SUFFIX)]
+        for path in paths:
+            try:
+                fh = open(path, "r+", encoding="utf-8")
+            except FileNotFoundError:  # inserted by another worker meanwhile
+                continue
+            # Owners delete a segment before releasing its lock, so a locked path that still exists is ours
+            if not _lock(fh) or not os.path.exists(path):
+                fh.close()
+                continue
+            fh.seek(0, os.SEEK_END)
+            claimed.append(_Segment(path, fh, entries=len(self._read(path))))
+        claimed.sort(key=lambda s: os.path.getmtime(s.path))
+        with self._lock:
+            self._sealed[:0] = claimed
+        return claimed
+
+    @staticmethod
+    def _read(path: str) -> list[dict]:
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:  # torn final line from a crash mid-write; it was never acknowledged
+                    logger.warning("Audit journal: skipping unreadable line in %s", path)
+        return entries
+
+    def _insert(self, segment: _Segment) -> int:
+        entries = self._read(segment.path)
+        txns = list({e["txn"] for e in entries if e.get("txn")})
+        with self._bind.begin() as conn:
+            done = conn.execute(
+                select(AuditJournalSegment.segment).where(AuditJournalSegment.segment == segment.name)
+            ).first()
+            if done:
+                return 0
+            committed = set()
+            for i in range(0, len(txns), _INSERT_CHUNK):
+                committed.update(conn.execute(
+                    select(AuditJournalTxn.txn).where(AuditJournalTxn.txn.in_(txns[i:i + _INSERT_CHUNK]))
+                ).scalars())
+            # Entries journaled before transaction ids have none; they were journaled after committing
+            rows = [
+                {**{k: v for k, v in e.items() if k != "txn"}, "created_at": datetime.fromisoformat(e["created_at"])}
+                for e in entries if "txn" not in e or e["txn"] in committed
+            ]
+            for i in range(0, len(rows), _INSERT_CHUNK):
+                conn.execute(insert(AuditLog).values(rows[i:i + _INSERT_CHUNK]))
+            done_txns = list(committed)
+            for i in range(0, len(done_txns), _INSERT_CHUNK):
+                conn.execute(delete(AuditJournalTxn).where(AuditJournalTxn.txn.in_(done_txns[i:i + _INSERT_CHUNK])))
+            conn.execute(insert(AuditJournalSegment).values(segment=segment.name, entries=len(rows)))
+        return len(rows)
+
+    def _discard(self, segment: _Segment):
+        os.remove(segment.path)
+        segment.fh.close()
+        try:
+            with self._bind.begin() as conn:
+                conn.execute(delete(AuditJournalSegment).where(AuditJournalSegment.segment == segment.name))
+        except Exception:  # harmless: the row only marks a segment as done
+            logger.warning("Audit journal: could not clear marker for %s", segment.name, exc_info=True)
+
+
+audit_writer = AuditWriter(
+    journal_dir=settings.audit_journal_dir,
+    flush_interval_ms=settings.audit_flush_interval_ms,
+    batch_size=settings.audit_batch_size,
+    max_pending=settings.audit_max_pending,
+    fsync=settings.audit_journal_fsync,
+)
+
+
+def make_entry(user_id: int, action: str, entity_type: str, entity_id: int, details: str | None) -> dict:
+    return {
+        "user_id": user_id,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "details": details,
+        # Time of the action, not of the batch insert; naive UTC like the server default
+        "created_at": datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+    }
+
+
+@event.listens_for(Session, "before_commit")
+def _journal_pending(session: Session):
+    # Ahead of the commit: if journaling fails, so does the commit
+    entries = session.info.pop(PENDING_KEY, None)
+    if not entries:
+        return
+    txn = uuid.uuid4().hex
+    session.execute(insert(AuditJournalTxn).values(txn=txn))
+    session.info[TXN_KEY] = txn
+    audit_writer.write(entries, txn)
+
+
+@event.listens_for(Session, "after_commit")
+def _release_committed(session: Session):
+    txn = session.info.pop(TXN_KEY, None)
+    if txn:
+        audit_writer.resolve(txn)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session):
+    session.info.pop(PENDING_KEY, None)
+    txn = session.info.pop(TXN_KEY, None)
+    if txn:
+        audit_writer.resolve(txn)  # its id was never committed, so its entries are skipped
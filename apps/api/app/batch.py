@@ -0,0 +1,298 @@
+"""
+Nightly analytics batch.
+
+Recomputes, for every user, what read paths would otherwise compute per
+request:
+
+- ``scores``: coverage scores (score_batch.py), served by GET /coverage-scores
+- ``gaps``: the GET /gaps body, stored as a snapshot (snapshots.py)
+- ``reminders``: the GET /reminders/smart alerts, stored as a snapshot
+- ``certificates``: certificates' stored status, brought up to date with
+  their expiration dates (reads derive it, see routes_certificates.py)
+
+Users are split into shards of consecutive ids, worked on by a process pool.
+Each shard runs in one transaction that also marks the shard finished in
+``batch_shards``, so a shard's results and its checkpoint commit together:
+rerunning the same run (by default, today's) skips finished shards and
+redoes the rest. New users who signed up after a run was planned are left
+to the read paths, which compute anything a snapshot doesn't cover.
+
+    python -m app.batch                           # today's run, resumed if it was interrupted
+    python -m app.batch --workers 8 --shard-size 2000
+    python -m app.batch --tasks gaps reminders    # only some tasks
+    python -m app.batch --restart                 # forget today's checkpoints
+    python -m app.batch --user 12 40              # some users, no checkpoints
+    python -m app.batch --dry-run                 # compute and time only
+
+Needs numpy (requirements.txt), for the scores task.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, selectinload
+
+from .models import Policy, User
+from .models_features import BatchShard, Certificate
+from .models_profile import UserProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_SIZE = 1000
+TASKS = ("scores", "gaps", "reminders", "certificates")
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int
+    first_user_id: int
+    last_user_id: int  # inclusive
+    users: int = 0  # when planned
+    user_ids: tuple[int, ...] | None = None  # explicit users (--user) instead of the id range
+
+
+# Each task reads and computes, returning (count, write); writes run together at the end of the
+# shard so its transaction holds write locks (SQLite's single writer lock, in particular) briefly
+Write = Callable[[Connection, dict[int, str]], None]
+
+
+def _scores(conn: Connection, user_ids: list[int], today: date) -> tuple[int, Write]:
+    from .score_batch import compute, load, store
+
+    results = compute(load(conn, user_ids), today)
+    return len(results), lambda c, versions: store(c, results, versions)
+
+
+def _gaps(conn: Connection, user_ids: list[int], today: date) -> tuple[int, Write]:
+    from .policy_details import preload_details
+    from .routes_gaps import _gap_payload, _user_context
+    from .snapshots import store_snapshots
+
+    with Session(bind=conn) as db:
+        policies = db.execute(
+            select(Policy).where(Policy.user_id.in_(user_ids))
+            .options(selectinload(Policy.contacts))
+            .order_by(Policy.id)  # the order GET /gaps loads them in
+        ).unique().scalars().all()
+        preload_details(db, policies)
+        by_user: dict[int, list[Policy]] = {uid: [] for uid in user_ids}
+        for p in policies:
+            by_user[p.user_id].append(p)
+        profiles = {
+            profile.user_id: profile
+            for profile in db.execute(select(UserProfile).where(UserProfile.user_id.in_(user_ids))).scalars()
+        }
+        payloads = {uid: _gap_payload(owned, _user_context(profiles.get(uid)), today) for uid, owned in by_user.items()}
+    count = sum(len(payload["gaps"]) for payload in payloads.values())
+    return count, lambda c, versions: store_snapshots(c, "gaps", payloads, versions, today)
+
+
+def _reminders(conn: Connection, user_ids: list[int], today: date) -> tuple[int, Write]:
+    from .routes_reminders import build_smart_reminders
+    from .snapshots import store_snapshots
+
+    payloads = build_smart_reminders(conn, user_ids, today)
+    count = sum(len(alerts) for alerts in payloads.values())
+    return count, lambda c, versions: store_snapshots(c, "smart_reminders", payloads, versions, today)
+
+
+def _certificates(conn: Connection, user_ids: list[int], today: date) -> tuple[int, Write]:
+    """Certificates whose stored status changed (core statements: status is derived, so no version bump)."""
+    from .routes_certificates import certificate_status
+
+    changes = []
+    for cert_id, expiration_date, status in conn.execute(
+        select(Certificate.id, Certificate.expiration_date, Certificate.status)
+        .where(Certificate.user_id.in_(user_ids), Certificate.expiration_date.is_not(None))
+    ):
+        current = certificate_status(expiration_date, status, today)
+        if current != status:
+            changes.append({"cert_id": cert_id, "new_status": current})
+
+    def write(c: Connection, versions: dict[int, str]):
+        if changes:
+            c.execute(
+                update(Certificate.__table__)
+                .where(Certificate.__table__.c.id == bindparam("cert_id"))
+                .values(status=bindparam("new_status")),
+                changes,
+            )
+    return len(changes), write
+
+
+_RUNNERS = {"scores": _scores, "gaps": _gaps, "reminders": _reminders, "certificates": _certificates}
+
+
+def run_shard(
+    shard: Shard, tasks: tuple[str, ...], today: date, run_id: str | None, dry_run: bool = False,
+) -> tuple[int, int, dict[str, float], dict[str, int]]:
+    """Run ``tasks`` for one shard in one transaction, checkpointing it under ``run_id`` (if given).
+
+    Returns (shard index, users, seconds per task plus "store", count per task).
+    """
+    from .db import engine
+    from .score_batch import data_versions
+
+    timings: dict[str, float] = {}
+    counts: dict[str, int] = {}
+    writes: list[Write] = []
+    with engine.begin() as conn:
+        if shard.user_ids is not None:
+            user_ids = list(shard.user_ids)
+        else:
+            user_ids = list(conn.execute(
+                select(User.id).where(User.id.between(shard.first_user_id, shard.last_user_id)).order_by(User.id)
+            ).scalars())
+        # Versions before any data is read: a concurrent change leaves the results stale, never wrong
+        versions = data_versions(conn, user_ids)
+        for name in tasks:
+            start = time.perf_counter()
+            counts[name], write = _RUNNERS[name](conn, user_ids, today) if user_ids else (0, None)
+            timings[name] = time.perf_counter() - start
+            if write is not None:
+                writes.append(write)
+        if not dry_run:
+            start = time.perf_counter()
+            for write in writes:
+                write(conn, versions)
+            if run_id is not None:
+                conn.execute(
+                    update(BatchShard)
+                    .where(BatchShard.run_id == run_id, BatchShard.shard == shard.index)
+                    .values(finished_at=datetime.now(),
+                            timings=json.dumps({k: round(v, 3) for k, v in timings.items()}))
+                )
+            timings["store"] = time.perf_counter() - start
+    return shard.index, len(user_ids), timings, counts
+
+
+def plan(conn: Connection, run_id: str, shard_size: int, restart: bool = False) -> tuple[list[Shard], int]:
+    """The run's unfinished shards (planning it on first use), and how many shards it has in all."""
+    if restart:
+        conn.execute(delete(BatchShard).where(BatchShard.run_id == run_id))
+    rows = conn.execute(
+        select(BatchShard.shard, BatchShard.first_user_id, BatchShard.last_user_id, BatchShard.users,
+               BatchShard.finished_at)
+        .where(BatchShard.run_id == run_id)
+        .order_by(BatchShard.shard)
+    ).all()
+    if rows:
+        return [
+            Shard(r.shard, r.first_user_id, r.last_user_id, r.users) for r in rows if r.finished_at is None
+        ], len(rows)
+
+    shards = split(conn, shard_size)
+    if shards:
+        conn.execute(insert(BatchShard), [
+            {"run_id": run_id, "shard": s.index, "first_user_id": s.first_user_id, "last_user_id": s.last_user_id,
+             "users": s.users}
+            for s in shards
+        ])
+    return shards, len(shards)
+
+
+def split(conn: Connection, shard_size: int) -> list[Shard]:
+    """Every user, in shards of ``shard_size`` consecutive ids."""
+    user_ids = list(conn.execute(select(User.id).order_by(User.id)).scalars())
+    return [
+        Shard(i // shard_size, user_ids[i], user_ids[min(i + shard_size, len(user_ids)) - 1],
+              users=min(shard_size, len(user_ids) - i))
+        for i in range(0, len(user_ids), shard_size)
+    ]
+
+
+def _init_worker():
+    # Forked workers inherit the parent's pool; drop it without closing the parent's connections
+    from .db import engine
+
+    engine.dispose(close=False)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.batch")
+    parser.add_argument("--run", help="run id to start or resume (default: today's date)")
+    parser.add_argument("--tasks", nargs="+", choices=TASKS, default=list(TASKS))
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="processes (1: run inline)")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="users per shard and transaction")
+    parser.add_argument("--user", type=int, nargs="*", help="only these user ids (one shard, not checkpointed)")
+    parser.add_argument("--restart", action="store_true", help="discard the run's checkpoints and start over")
+    parser.add_argument("--dry-run", action="store_true", help="compute and time without storing anything")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from .db import engine
+
+    today = date.today()
+    tasks = tuple(name for name in TASKS if name in args.tasks)
+    if args.user:
+        user_ids = tuple(sorted(set(args.user)))
+        run_id, shards, total = None, [Shard(0, user_ids[0], user_ids[-1], len(user_ids), user_ids)], 1
+    elif args.dry_run:
+        run_id = None
+        with engine.connect() as conn:
+            shards = split(conn, args.shard_size)
+        total = len(shards)
+    else:
+        run_id = args.run or today.isoformat()
+        with engine.begin() as conn:
+            shards, total = plan(conn, run_id, args.shard_size, restart=args.restart)
+        if not shards and total:
+            logger.info("Run %s already finished (%d shards); --restart to run it again", run_id, total)
+        elif len(shards) < total:
+            logger.info("Resuming run %s: %d of %d shards already finished", run_id, total - len(shards), total)
+
+    start = time.perf_counter()
+    users = failed = 0
+    task_seconds = dict.fromkeys([*tasks, "store"], 0.0)
+
+    def finished(index: int, shard_users: int, timings: dict[str, float], counts: dict[str, int]):
+        nonlocal users
+        users += shard_users
+        for name, seconds in timings.items():
+            task_seconds[name] += seconds
+        logger.info("Shard %d/%d: %d users in %.2fs (%s)", index + 1, total, shard_users, sum(timings.values()),
+                    ", ".join(f"{name} {seconds:.2f}s" + (f"/{counts[name]}" if name in counts else "")
+                              for name, seconds in timings.items()))
+
+    if args.workers <= 1 or len(shards) <= 1:
+        for shard in shards:
+            try:
+                finished(*run_shard(shard, tasks, today, run_id, args.dry_run))
+            except Exception:
+                failed += 1
+                logger.exception("Shard %d/%d failed", shard.index + 1, total)
+    else:
+        engine.dispose()  # no pooled connections for the workers to inherit
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(run_shard, shard, tasks, today, run_id, args.dry_run): shard for shard in shards}
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    finished(*future.result())
+                except Exception:
+                    failed += 1
+                    logger.exception("Shard %d/%d failed", shard.index + 1, total)
+
+    elapsed = time.perf_counter() - start
+    rate = users / elapsed * 60 if elapsed else 0
+    print(f"Processed {users} users in {len(shards) - failed} shards in {elapsed:.1f}s ({rate:,.0f} users/min)"
+          f"{' (dry run, nothing stored)' if args.dry_run else ''}")
+    print("  " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in task_seconds.items()))
+    if failed:
+        print(f"{failed} shard(s) failed" + (f"; rerun with --run {run_id} to resume" if run_id else ""))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Answer cache for chat.
+
+Opening questions like "what does my homeowners cover?" get asked over and over
+against data that hasn't changed. Answers are cached per user, chat mode and
+data version (see data_version.py) and keyed on the normalized question, so
+casing, punctuation, filler words, a few synonyms and plurals don't matter.
+
+A hit needs the normalized questions to be identical. Similarity scoring
+(word/trigram cosine) was tried and served answers across questions that
+differ in one key term: "water backup damage" vs "water damage from a sewer
+line", "123 Main St" vs "125 Main St". Word order is kept for the same
+reason: "does my home policy cover my car" is not "does my car policy cover
+my home". Entries expire after a TTL and the cache is LRU-bounded.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .config import settings
+
+_WORD_RE = re.compile(r"[a-z0-9$]+")
+_STOPWORDS = {
+    "a", "an", "the", "my", "me", "i", "is", "are", "am", "do", "does", "did", "what", "whats",
+    "of", "on", "for", "to", "in", "it", "its", "and", "or", "can", "you", "please", "tell",
+    "about", "how", "much", "there", "this", "that", "have", "has", "be", "with", "insurance", "policy",
+}
+_SYNONYMS = {
+    "homeowners": "home", "homeowner": "home", "house": "home",
+    "car": "auto", "vehicle": "auto",
+    "covered": "cover", "covers": "cover", "coverage": "cover",
+}
+
+
+def normalize_question(text: str) -> str:
+    words = _WORD_RE.findall(text.lower().replace("'", ""))
+    words = [_SYNONYMS.get(w, w) for w in words if w not in _STOPWORDS]
+    # Crude plural folding: "floods" -> "flood", but leave "loss", "gas", "us"
+    return " ".join(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words)
+
+
+@dataclass
+class _Entry:
+    answer: str
+    expires_at: float
+
+
+class ChatAnswerCache:
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, mode: str, version: str, question: str) -> str | None:
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        key = (user_id, mode, version, normalized)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.answer
+
+    def put(self, user_id: int, mode: str, version: str, question: str, answer: str):
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+        key = (user_id, mode, version, normalized)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = _Entry(answer=answer, expires_at=time.monotonic() + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+answer_cache = ChatAnswerCache(
+    max_entries=settings.chat_cache_max_entries,
+    ttl_seconds=settings.chat_cache_ttl_seconds,
+)
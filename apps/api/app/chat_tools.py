@@ -0,0 +1,243 @@
+"""
+Server-side tools for the tool-calling chat mode.
+
+Instead of packing the whole portfolio into the system prompt, the model gets a
+compact policy index and calls these tools to fetch only what a question needs.
+Each tool reuses the same query logic as the matching REST route.
+"""
+
+import json
+import logging
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from .gap_cache import cached, gap_key
+from .models import User, Policy
+from .models_documents import Document
+from .models_features import Claim
+
+logger = logging.getLogger(__name__)
+
+MAX_TOOL_ROUNDS = 4
+MAX_SEARCH_SNIPPETS = 6
+SNIPPET_RADIUS = 300
+
+
+TOOL_SPECS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_policy",
+            "description": "Get full details for one of the user's policies: limits, deductible, premium, contacts, extra details, inclusions and exclusions.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "policy_id": {"type": "integer", "description": "Policy id from the policy index"},
+                },
+                "required": ["policy_id"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_documents",
+            "description": "Search the text of the user's uploaded policy documents and return matching excerpts.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Words or phrase to look for, e.g. 'water backup'"},
+                    "policy_id": {"type": "integer", "description": "Optional: only search documents for this policy"},
+                },
+                "required": ["query"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_gaps",
+            "description": "List coverage gaps and warnings found across the user's portfolio.",
+            "parameters": {"type": "object", "properties": {}},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_claims",
+            "description": "Get the user's claims history, optionally for a single policy.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "policy_id": {"type": "integer", "description": "Optional: only claims for this policy"},
+                },
+            },
+        },
+    },
+]
+
+
+def build_policy_index(user: User, db: Session) -> str:
+    """One line per policy — enough for the model to pick the right tool arguments."""
+    policies = db.execute(
+        select(Policy).where(Policy.user_id == user.id).order_by(Policy.id)
+    ).scalars().all()
+    if not policies:
+        return "No policies on file."
+
+    lines = []
+    for p in policies:
+        name = p.nickname or f"{p.carrier} {p.policy_type}"
+        line = f"- id={p.id} | {p.policy_type} | {name} | carrier: {p.carrier} | status: {p.status or 'active'}"
+        if p.business_name:
+            line += f" | business: {p.business_name}"
+        if p.renewal_date:
+            line += f" | renews {p.renewal_date}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# ── Tool implementations ─────────────────────────────
+
+
+def _tool_get_policy(args: dict, user: User, db: Session) -> dict:
+    from .routes_chat import _policy_to_dict, _format_policy_block
+    from .policy_details import preload_details
+
+    policy = db.execute(
+        select(Policy)
+        .where(Policy.id == int(args["policy_id"]), Policy.user_id == user.id)
+        .options(
+            selectinload(Policy.contacts),
+            selectinload(Policy.coverage_items),
+        )
+    ).scalar_one_or_none()
+    if not policy:
+        return {"error": "Policy not found"}
+    preload_details(db, [policy])
+    return {"policy": _format_policy_block(_policy_to_dict(policy))}
+
+
+def _tool_search_documents(args: dict, user: User, db: Session) -> dict:
+    from .routes_chat import _cache_document_text, MAX_DOCS
+
+    query = (args.get("query") or "").strip().lower()
+    if not query:
+        return {"error": "Empty query"}
+
+    q = (
+        select(Document, Policy.carrier)
+        .join(Policy, Document.policy_id == Policy.id)
+        .where(Policy.user_id == user.id)
+    )
+    if args.get("policy_id") is not None:
+        q = q.where(Policy.id == int(args["policy_id"]))
+    rows = db.execute(q.order_by(Document.created_at.desc()).limit(MAX_DOCS)).all()
+
+    terms = [t for t in query.split() if len(t) >= 3] or [query]
+    matches = []
+    for doc, carrier in rows:
+        text = _cache_document_text(doc, db)
+        if not text:
+            continue
+        lowered = text.lower()
+        # Prefer the full phrase, then fall back to individual terms
+        for needle in [query] + terms:
+            pos = lowered.find(needle)
+            if pos < 0:
+                continue
+            start = max(0, pos - SNIPPET_RADIUS)
+            end = min(len(text), pos + len(needle) + SNIPPET_RADIUS)
+            matches.append({
+                "document": doc.filename,
+                "policy_id": doc.policy_id,
+                "carrier": carrier,
+                "excerpt": text[start:end],
+            })
+            break
+        if len(matches) >= MAX_SEARCH_SNIPPETS:
+            break
+
+    if not matches:
+        return {"matches": [], "note": f"No document text mentions '{query}'."}
+    return {"matches": matches}
+
+
+def _tool_list_gaps(args: dict, user: User, db: Session) -> dict:
+    from .routes_gaps import _portfolio_gaps
+
+    # Same analysis (and cache entry) as GET /gaps
+    today = datetime.now().date()
+    result = cached(gap_key(db, user.id, today, "portfolio"), lambda: _portfolio_gaps(db, user.id, today))
+    if not result["policy_count"]:
+        return {"gaps": [], "note": "No policies on file."}
+    gaps = result["gaps"]
+    return {
+        "gaps": [
+            {
+                "severity": g["severity"],
+                "name": g["name"],
+                "description": g["description"],
+                "recommendation": g.get("recommendation"),
+                "policy_id": g.get("policy_id"),
+            }
+            for g in gaps
+        ]
+    }
+
+
+def _tool_get_claims(args: dict, user: User, db: Session) -> dict:
+    from .routes_claims import _get_user_policy
+
+    q = select(Claim, Policy.carrier).join(Policy, Claim.policy_id == Policy.id).where(Policy.user_id == user.id)
+    if args.get("policy_id") is not None:
+        policy_id = int(args["policy_id"])
+        _get_user_policy(policy_id, db, user)
+        q = q.where(Claim.policy_id == policy_id)
+    rows = db.execute(q.order_by(Claim.date_filed.desc())).all()
+
+    return {
+        "claims": [
+            {
+                "policy_id": c.policy_id,
+                "carrier": carrier,
+                "claim_number": c.claim_number,
+                "status": c.status,
+                "date_filed": str(c.date_filed) if c.date_filed else None,
+                "date_resolved": str(c.date_resolved) if c.date_resolved else None,
+                "amount_claimed": c.amount_claimed,
+                "amount_paid": c.amount_paid,
+                "description": c.description,
+            }
+            for c, carrier in rows
+        ]
+    }
+
+
+_TOOLS = {
+    "get_policy": _tool_get_policy,
+    "search_documents": _tool_search_documents,
+    "list_gaps": _tool_list_gaps,
+    "get_claims": _tool_get_claims,
+}
+
+
+def run_tool(name: str, raw_args: str, user: User, db: Session) -> str:
+    """Execute a tool call from the model and return its JSON-encoded result."""
+    fn = _TOOLS.get(name)
+    if fn is None:
+        return json.dumps({"error": f"Unknown tool: {name}"})
+    try:
+        args = json.loads(raw_args) if raw_args else {}
+        result = fn(args, user, db)
+    except HTTPException as e:
+        result = {"error": e.detail}
+    except (ValueError, KeyError, TypeError) as e:
+        result = {"error": f"Invalid arguments: {e}"}
+    except Exception as e:
+        logger.warning("Chat tool %s failed: %s", name, e)
+        result = {"error": "Tool failed"}
+    return json.dumps(result, default=str)
@@ -3,6 +3,36 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./covrabl.db"
+    database_replica_urls: str = ""  # comma-separated; GET requests read from these when set
+    db_read_your_writes_seconds: int = 10  # after a write, that user's reads stay on the primary this long
+    db_replica_retry_seconds: int = 30  # how long an unreachable replica is skipped
+    db_replica_health_seconds: int = 5  # how long a replica that answered is used without checking again
+    db_pool_size: int = 5  # per worker process (and again for the async engine)
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # seconds to wait for a free connection before erroring
+    db_pool_recycle: int = 1800  # seconds; keep below the server/proxy idle timeout
+    db_pool_pre_ping: bool = False  # extra round-trip per checkout; enable if idle connections get dropped
+    db_pool_slow_checkout_ms: int = 250  # log a warning when a checkout waits this long
+    db_auto_migrate: bool = False  # apply pending migrations at startup instead of refusing to start
+    db_pgbouncer: bool = False  # behind PgBouncer transaction pooling: no server-side prepared statements
+    sqlite_profile: str = "default"  # "production": WAL + pragmas, reads on a pool, writes through one connection
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
+    query_stats_headers: bool = False  # debug only: X-DB-Query-* headers with per-request statement counts
+    query_stats_repeat_warn: int = 10  # log requests that run one statement shape this many times (0 = off)
+    audit_buffered: bool = False  # journal audit entries, insert them in batches from a background thread (see audit_writer.py)
+    audit_journal_dir: str = "./audit_journal"  # must persist across worker restarts for crash recovery
+    audit_journal_fsync: bool = True  # fsync each commit's entries; off trades crash durability for latency
+    audit_flush_interval_ms: int = 500
+    audit_batch_size: int = 500  # entries per journal segment / insert transaction
+    audit_max_pending: int = 50_000  # beyond this, commits wait for the flusher (bounded backlog)
+    audit_retention_months: int = 24  # older months are archived by `python -m app.audit_retention` (0 = keep all)
+    audit_archive_dir: str = "./audit_archive"  # gzip JSONL per archived month
+    audit_partitions_ahead: int = 3  # Postgres: monthly partitions created in advance
+    scores_background: bool = True  # recompute coverage scores in a background thread; GET serves stored rows
+    score_debounce_ms: int = 2000  # recompute this long after a user's last policy/detail change
+    score_max_delay_ms: int = 30_000  # ...but no later than this after the first one
     s3_endpoint: str = "localhost:9000"
     s3_access_key: str = ""
     s3_secret_key: str = ""
@@ -15,7 +45,16 @@ class Settings(BaseSettings):
     llm_provider: str = "anthropic"  # "anthropic" or "openai"
     anthropic_api_key: str = ""
     openai_api_key: str = ""
+    chat_mode: str = "context"  # "context" (full portfolio in prompt) or "tools" (fetch on demand)
+    chat_cache_enabled: bool = True
+    chat_cache_ttl_seconds: int = 6 * 3600
+    chat_cache_max_entries: int = 5000
+    agent_summary_cache_ttl_seconds: int = 600
+    agent_summary_cache_max_entries: int = 2000  # per worker; 0 disables
+    gap_cache_ttl_seconds: int = 3600
+    gap_cache_max_entries: int = 5000  # per worker; 0 disables
     cors_origins: str = ""
+    health_token: str = ""  # /health/db, /audit, /scores need X-Health-Token: <this>; unset = disabled (404)
 
     resend_api_key: str = ""
     smtp_host: str = ""
@@ -4,6 +4,7 @@ Defines coverage categories, what policies provide them, and rules for identifyi
 """
 
 from dataclasses import dataclass
+from datetime import date
 from typing import Optional
 import re
 
@@ -62,6 +63,31 @@ EXCLUSION_KEYWORDS = {
 }
 
 
+def _compile_exclusion_table(table: dict) -> dict[str, tuple[tuple[str, tuple[str, ...]], ...]]:
+    """Per policy type: the exclusions that apply, in table order, each with the keywords worth testing.
+
+    Keywords are lowercased once, and a keyword containing another keyword of
+    the same exclusion ("flood damage", "flood") is dropped: it can only match
+    where the shorter one does, so the answer is unchanged.
+    """
+    compiled = {}
+    for excl_id, info in table.items():
+        keywords = [k.lower() for k in info["keywords"]]
+        keywords = tuple(dict.fromkeys(k for k in keywords if not any(o != k and o in k for o in keywords)))
+        for ptype in info.get("applies_to", []):
+            compiled.setdefault(ptype, []).append((excl_id, keywords))
+    return {ptype: tuple(entries) for ptype, entries in compiled.items()}
+
+
+EXCLUSIONS_BY_TYPE = _compile_exclusion_table(EXCLUSION_KEYWORDS)
+
+
+def find_exclusions(ptype: str, text: str) -> list[str]:
+    """Ids of the exclusions for ``ptype`` with a keyword in ``text`` (lowercase), in EXCLUSION_KEYWORDS order."""
+    return [excl_id for excl_id, keywords in EXCLUSIONS_BY_TYPE.get(ptype, ())
+            if any(k in text for k in keywords)]
+
+
 @dataclass
 class CoverageCategory:
     """A category of protection (e.g., liability, property damage)."""
@@ -356,7 +382,8 @@ def get_policy_coverages(policy_type: str) -> list[str]:
 
 def analyze_coverage_gaps(
     policies: list[dict],
-    user_context: Optional[dict] = None
+    user_context: Optional[dict] = None,
+    today: Optional[date] = None,
 ) -> list[dict]:
     """
     Analyze a user's policies and identify coverage gaps.
@@ -364,369 +391,26 @@ def analyze_coverage_gaps(
     Args:
         policies: List of policy dicts with type, coverage_amount, details, etc.
         user_context: Optional dict with user info (has_dependents, is_homeowner, etc.)
+        today: Date the renewal and review gaps are counted from (default: the local date)
 
     Returns:
         List of identified gaps with severity, description, and recommendations
     """
-    user_context = user_context or {}
-    gaps = []
+    from .gap_engine import engine  # the rules live there and read this module's tables
 
-    # Build a set of what coverage the user has
-    policy_types = set()
-    has_coverages = set()
-    total_liability = 0
+    return engine.evaluate(policies, user_context, today)
 
-    for policy in policies:
-        ptype = (policy.get("policy_type") or "").lower()
-        policy_types.add(ptype)
-        has_coverages.update(get_policy_coverages(ptype))
-
-        # Track liability limits
-        if ptype == "auto":
-            total_liability += policy.get("coverage_amount") or 0
-
-        # Check for specific coverages in details
-        details = {d.get("field_name", "").lower(): d.get("field_value", "")
-                   for d in policy.get("details", [])}
-
-        if details.get("uninsured_motorist"):
-            has_coverages.add("uninsured_motorist")
-        if details.get("roadside_assistance"):
-            has_coverages.add("roadside")
-
-    # Check each gap rule
-    # No auto insurance
-    if "auto" not in policy_types:
-        severity = "high" if user_context.get("has_vehicle") else "info"
-        gaps.append({
-            "id": "consider_auto",
-            "name": "Auto Insurance",
-            "severity": severity,
-            "description": "No auto policy on file. If you own or lease a vehicle, you need auto insurance.",
-            "recommendation": "Add your auto policy to track coverage and renewals.",
-            "category": "auto_liability"
-        })
-
-    # No home/renters
-    if "home" not in policy_types and "renters" not in policy_types:
-        if user_context.get("is_homeowner"):
-            severity = "high"
-        elif user_context.get("is_renter"):
-            severity = "medium"
-        else:
-            severity = "info"
-        gaps.append({
-            "id": "consider_property",
-            "name": "Property Insurance",
-            "severity": severity,
-            "description": "No home or renters policy on file.",
-            "recommendation": "Homeowners need dwelling coverage. Renters should have renters insurance to protect belongings.",
-            "category": "personal_property"
-        })
-
-    # No life insurance - especially important with dependents
-    if "life" not in policy_types:
-        severity = "high" if user_context.get("has_dependents") else "info"
-        gaps.append({
-            "id": "no_life",
-            "name": "Life Insurance",
-            "severity": severity,
-            "description": "No life insurance policy on file.",
-            "recommendation": "Life insurance provides financial security for your loved ones. Term life is an affordable option.",
-            "category": "life_insurance"
-        })
-
-    # No umbrella - important for asset protection
-    if "umbrella" not in policy_types and "liability" not in policy_types:
-        if user_context.get("high_net_worth") or len(policy_types) >= 2:
-            severity = "high" if user_context.get("high_net_worth") else "medium"
-            gaps.append({
-                "id": "no_umbrella",
-                "name": "Umbrella Coverage",
-                "severity": severity,
-                "description": "No umbrella/excess liability policy.",
-                "recommendation": "An umbrella policy provides additional liability coverage above your auto and home limits. Protects your assets from lawsuits.",
-                "category": "umbrella_liability"
-            })
-
-    # No health insurance
-    if "health" not in policy_types:
-        severity = "high" if user_context.get("has_dependents") else "medium"
-        gaps.append({
-            "id": "no_health",
-            "name": "Health Insurance",
-            "severity": severity,
-            "description": "No health insurance policy on file.",
-            "recommendation": "Health insurance is essential. If employer-sponsored, add it here to track deductibles and out-of-pocket costs.",
-            "category": "health_insurance"
-        })
-
-    # No dental
-    if "dental" not in policy_types:
-        gaps.append({
-            "id": "no_dental",
-            "name": "Dental Insurance",
-            "severity": "info",
-            "description": "No dental insurance policy on file.",
-            "recommendation": "Dental coverage helps manage preventive and restorative care costs.",
-            "category": "dental_insurance"
-        })
-
-    # No vision
-    if "vision" not in policy_types:
-        gaps.append({
-            "id": "no_vision",
-            "name": "Vision Insurance",
-            "severity": "info",
-            "description": "No vision insurance policy on file.",
-            "recommendation": "Vision plans cover eye exams, glasses, and contacts at reduced cost.",
-            "category": "vision_insurance"
-        })
-
-    # No disability — critical for income earners
-    if "disability" not in policy_types:
-        severity = "medium" if user_context.get("has_dependents") else "info"
-        gaps.append({
-            "id": "no_disability",
-            "name": "Disability Insurance",
-            "severity": severity,
-            "description": "No disability insurance on file.",
-            "recommendation": "Disability insurance replaces income if you can't work due to illness or injury. Often overlooked but critical.",
-            "category": "disability_income"
-        })
-
-    # Business gap analysis
-    business_types = {"general_liability", "professional_liability", "commercial_property",
-                      "commercial_auto", "cyber", "bop", "directors_officers", "epli",
-                      "inland_marine", "workers_comp"}
-    has_business_policies = bool(policy_types & business_types)
-    owns_business = user_context.get("owns_business", False)
-
-    if has_business_policies or owns_business:
-        if "general_liability" not in policy_types and "bop" not in policy_types:
-            gaps.append({
-                "id": "no_gl",
-                "name": "No General Liability",
-                "severity": "high",
-                "description": "No general liability or BOP policy on file. GL is the foundation of business insurance.",
-                "recommendation": "General liability covers third-party injury and property damage claims. Required by most contracts and leases.",
-                "category": "general_liability"
-            })
-        if "cyber" not in policy_types:
-            severity = "high" if owns_business else "medium"
-            gaps.append({
-                "id": "no_cyber",
-                "name": "No Cyber Coverage",
-                "severity": severity,
-                "description": "No cyber liability policy on file.",
-                "recommendation": "Cyber insurance covers data breaches, ransomware, and response costs. A growing risk for all businesses.",
-                "category": "cyber_liability"
-            })
-        if "epli" not in policy_types and ("workers_comp" in policy_types or owns_business):
-            severity = "high" if owns_business else "medium"
-            gaps.append({
-                "id": "no_epli",
-                "name": "No Employment Practices Liability",
-                "severity": severity,
-                "description": "No EPLI coverage on file.",
-                "recommendation": "EPLI covers wrongful termination, discrimination, and harassment claims — risks not covered by workers' comp.",
-                "category": "employment_practices"
-            })
-        if "professional_liability" not in policy_types:
-            gaps.append({
-                "id": "no_professional_liability",
-                "name": "Professional Liability (E&O)",
-                "severity": "info",
-                "description": "No professional liability policy on file.",
-                "recommendation": "If your business provides professional services or advice, E&O insurance protects against negligence claims.",
-                "category": "professional_liability"
-            })
-
-    # Low auto liability
-    if "auto" in policy_types:
-        auto_policies = [p for p in policies if (p.get("policy_type") or "").lower() == "auto"]
-        for ap in auto_policies:
-            coverage = ap.get("coverage_amount") or 0
-            if coverage > 0 and coverage < 100000:
-                gaps.append({
-                    "id": "low_auto_liability",
-                    "name": "Low Auto Liability Limit",
-                    "severity": "medium",
-                    "description": f"Your auto liability limit (${coverage:,}) may be insufficient.",
-                    "recommendation": "Consider increasing to at least $100,000/$300,000. Medical costs and lawsuits can easily exceed low limits.",
-                    "category": "auto_liability"
-                })
-                break
-
-    # Check for policies expiring soon
-    from datetime import datetime, timedelta
-    now = datetime.now().date()
-    for policy in policies:
-        renewal = policy.get("renewal_date")
-        if renewal:
-            try:
-                if isinstance(renewal, str):
-                    renewal_date = datetime.strptime(renewal, "%Y-%m-%d").date()
-                else:
-                    renewal_date = renewal
-
-                days_until = (renewal_date - now).days
-
-                if days_until < 0:
-                    gaps.append({
-                        "id": f"expired_{policy.get('id')}",
-                        "name": "Policy Expired",
-                        "severity": "high",
-                        "description": f"Your {policy.get('carrier', 'policy')} {policy.get('policy_type', '')} policy has expired.",
-                        "recommendation": "Renew immediately to avoid coverage lapses.",
-                        "category": "renewal",
-                        "policy_id": policy.get("id")
-                    })
-                elif days_until <= 14:
-                    gaps.append({
-                        "id": f"expiring_soon_{policy.get('id')}",
-                        "name": "Renewal Urgent",
-                        "severity": "medium",
-                        "description": f"Your {policy.get('carrier', 'policy')} {policy.get('policy_type', '')} policy expires in {days_until} days.",
-                        "recommendation": "Review coverage and renew before expiration.",
-                        "category": "renewal",
-                        "policy_id": policy.get("id")
-                    })
-                elif days_until <= 30:
-                    gaps.append({
-                        "id": f"expiring_{policy.get('id')}",
-                        "name": "Renewal Approaching",
-                        "severity": "low",
-                        "description": f"Your {policy.get('carrier', 'policy')} {policy.get('policy_type', '')} policy expires in {days_until} days.",
-                        "recommendation": "Good time to review coverage and shop around.",
-                        "category": "renewal",
-                        "policy_id": policy.get("id")
-                    })
-            except (ValueError, TypeError):
-                pass
-
-    # Check for stale home coverage (not updated in 3+ years - construction costs rise ~5-10% annually)
-    for policy in policies:
-        ptype = (policy.get("policy_type") or "").lower()
-        if ptype == "home":
-            created = policy.get("created_at")
-            renewal = policy.get("renewal_date")
-
-            # Check if dwelling coverage might be outdated
-            coverage = policy.get("coverage_amount") or 0
-            if coverage > 0:
-                # Simple heuristic: if home policy was created 3+ years ago, coverage may need review
-                # In real world, would compare to local rebuild cost indices
-                try:
-                    if created:
-                        created_date = datetime.strptime(str(created)[:10], "%Y-%m-%d").date()
-                        years_old = (now - created_date).days / 365
-                        if years_old >= 3:
-                            estimated_increase = int(years_old * 7)  # ~7% annual construction cost increase
-                            gaps.append({
-                                "id": f"stale_home_coverage_{policy.get('id')}",
-                                "name": "Home Coverage Review Needed",
-                                "severity": "medium",
-                                "description": f"Your home coverage (${coverage:,}) hasn't been reviewed in {int(years_old)} years. Construction costs have risen ~{estimated_increase}% since then.",
-                                "recommendation": "Contact your agent to review dwelling coverage. You may be underinsured if rebuild costs have increased.",
-                                "category": "dwelling_coverage",
-                                "policy_id": policy.get("id")
-                            })
-                except (ValueError, TypeError):
-                    pass
-
-    # Check for missing claims contact (preparedness warning)
-    for policy in policies:
-        contacts = policy.get("contacts", [])
-        has_claims_contact = any(
-            c.get("role") in ("claims", "customer_service") and c.get("phone")
-            for c in contacts
-        )
-        if not has_claims_contact and policy.get("carrier") != "Pending extraction...":
-            gaps.append({
-                "id": f"no_claims_contact_{policy.get('id')}",
-                "name": "Missing Claims Contact",
-                "severity": "low",
-                "description": f"Your {policy.get('carrier', 'policy')} policy has no claims phone number on file.",
-                "recommendation": "Add the claims phone number so you're ready if you need to file a claim.",
-                "category": "preparedness",
-                "policy_id": policy.get("id")
-            })
-
-    # Check for policies with no coverage amount specified
-    for policy in policies:
-        if not policy.get("coverage_amount") and policy.get("carrier") != "Pending extraction...":
-            ptype = policy.get("policy_type", "")
-            if ptype in ("auto", "home", "umbrella", "liability", "general_liability", "professional_liability", "commercial_property", "cyber"):
-                gaps.append({
-                    "id": f"unknown_coverage_{policy.get('id')}",
-                    "name": "Unknown Coverage Limit",
-                    "severity": "low",
-                    "description": f"Your {policy.get('carrier', 'policy')} {ptype} policy has no coverage limit recorded.",
-                    "recommendation": "Add your coverage limit to better understand your protection level.",
-                    "category": "incomplete_data",
-                    "policy_id": policy.get("id")
-                })
-
-    # Scan for exclusion keywords in policy details
-    exclusions_found = set()  # Track unique exclusions to avoid duplicates
-    for policy in policies:
-        ptype = (policy.get("policy_type") or "").lower()
-        details = policy.get("details", [])
-
-        # Combine all detail text for scanning
-        detail_text = " ".join([
-            f"{d.get('field_name', '')} {d.get('field_value', '')}"
-            for d in details
-        ]).lower()
-
-        # Also scan carrier name and any notes
-        detail_text += f" {policy.get('carrier', '')} {policy.get('notes', '')}".lower()
-
-        for excl_id, excl_info in EXCLUSION_KEYWORDS.items():
-            # Skip if this exclusion doesn't apply to this policy type
-            if ptype not in excl_info.get("applies_to", []):
-                continue
-
-            # Check if any keywords match
-            for keyword in excl_info["keywords"]:
-                if keyword.lower() in detail_text:
-                    exclusion_key = f"{excl_id}_{policy.get('id')}"
-                    if exclusion_key not in exclusions_found:
-                        exclusions_found.add(exclusion_key)
-                        gaps.append({
-                            "id": f"exclusion_{excl_id}_{policy.get('id')}",
-                            "name": excl_info["name"],
-                            "severity": "info",
-                            "description": excl_info["description"],
-                            "recommendation": excl_info["recommendation"],
-                            "category": "exclusion_warning",
-                            "policy_id": policy.get("id")
-                        })
-                    break  # Only add once per exclusion type per policy
-
-    # For home policies, proactively warn about common exclusions even if not found in text
-    # These are almost universal exclusions that users should be aware of
-    home_policies = [p for p in policies if (p.get("policy_type") or "").lower() in ("home", "renters")]
-    for hp in home_policies:
-        policy_id = hp.get("id")
-        # Check if we already warned about flood for this policy
-        if f"flood_{policy_id}" not in exclusions_found:
-            gaps.append({
-                "id": f"exclusion_flood_reminder_{policy_id}",
-                "name": "Flood Coverage Reminder",
-                "severity": "info",
-                "description": "Standard home/renters policies do NOT cover flood damage.",
-                "recommendation": "If you're in a flood-prone area, consider NFIP or private flood insurance.",
-                "category": "exclusion_warning",
-                "policy_id": policy_id
-            })
-
-    # Sort by severity
-    severity_order = {"high": 0, "medium": 1, "low": 2, "info": 3}
-    gaps.sort(key=lambda g: severity_order.get(g["severity"], 4))
-
-    return gaps
+
+def analyze_policy_gaps(policy: dict, today: Optional[date] = None) -> list[dict]:
+    """
+    The gaps analyze_coverage_gaps reports for one policy (its policy_id), from that policy alone.
+
+    Policy-level checks (renewal, stale coverage, contacts, limits, exclusions)
+    don't depend on the rest of the portfolio or on the user context.
+    """
+    from .gap_engine import engine
+
+    return engine.evaluate_policy(policy, today)
 
 
 def get_coverage_summary(policies: list[dict]) -> dict:
@@ -736,37 +420,36 @@ def get_coverage_summary(policies: list[dict]) -> dict:
     Returns:
         Dict with coverage statistics and insights
     """
-    policy_types = set()
-    total_coverage = 0
-    total_premium = 0
     coverage_by_type = {}
 
     for policy in policies:
         ptype = (policy.get("policy_type") or "other").lower()
-        policy_types.add(ptype)
-
         coverage = policy.get("coverage_amount") or 0
         premium = policy.get("premium_amount") or 0
 
-        total_coverage += coverage
-        total_premium += premium
-
         if ptype not in coverage_by_type:
             coverage_by_type[ptype] = {"coverage": 0, "premium": 0, "count": 0}
         coverage_by_type[ptype]["coverage"] += coverage
         coverage_by_type[ptype]["premium"] += premium
         coverage_by_type[ptype]["count"] += 1
 
+    return summarize_coverage_by_type(coverage_by_type)
+
+
+def summarize_coverage_by_type(coverage_by_type: dict) -> dict:
+    """The get_coverage_summary() result from per-type {coverage, premium, count} totals."""
+    policy_types = set(coverage_by_type)
+
     # Determine what categories are covered
     covered_categories = set()
     for ptype in policy_types:
         covered_categories.update(get_policy_coverages(ptype))
 
     return {
-        "total_policies": len(policies),
+        "total_policies": sum(t["count"] for t in coverage_by_type.values()),
         "policy_types": list(policy_types),
-        "total_coverage": total_coverage,
-        "total_annual_premium": total_premium,
+        "total_coverage": sum(t["coverage"] for t in coverage_by_type.values()),
+        "total_annual_premium": sum(t["premium"] for t in coverage_by_type.values()),
         "coverage_by_type": coverage_by_type,
         "covered_categories": list(covered_categories),
         "missing_categories": [
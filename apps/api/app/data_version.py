@@ -0,0 +1,84 @@
+"""
+Per-user data version stamps.
+
+Every flush that creates, changes or deletes a user's policies (or anything
+hanging off them, or their profile) writes a fresh random stamp to
+``user_data_versions`` in the same transaction. Caches key on the stamp, so a
+cached answer can never outlive the data it was computed from.
+
+Random stamps rather than counters: two concurrent writers can't collide on the
+same value, and the upsert below needs no read-modify-write.
+"""
+
+import secrets
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from .models import Policy, PolicyDetail, Contact, CoverageItem, Exposure
+from .models_documents import Document
+from .models_features import Certificate, Claim, Premium, UserDataVersion
+from .models_profile import UserProfile
+
+# Models whose rows belong to a user directly (user_id) or through a policy (policy_id)
+TRACKED_MODELS = (
+    Policy, PolicyDetail, Contact, CoverageItem, Exposure,
+    Document, Claim, Premium, UserProfile, Certificate,
+)
+
+_INFO_KEY = "data_version_users"
+
+
+def get_data_version(db: Session, user_id: int) -> str:
+    """Current stamp for a user ("0" if their data has never been written through the ORM)."""
+    stamp = db.execute(
+        select(UserDataVersion.stamp).where(UserDataVersion.user_id == user_id)
+    ).scalar()
+    return stamp or "0"
+
+
+def _owner_id(session: Session, obj) -> int | None:
+    user_id = getattr(obj, "user_id", None)
+    if user_id is not None:
+        return user_id
+    policy_id = getattr(obj, "policy_id", None)
+    if policy_id is None:
+        return None
+    with session.no_autoflush:
+        policy = session.get(Policy, policy_id)
+    return policy.user_id if policy else None
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_users(session: Session, flush_context, instances):
+    changed = session.info.setdefault(_INFO_KEY, set())
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, TRACKED_MODELS):
+            changed.add(_owner_id(session, obj))
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED_MODELS) and session.is_modified(obj, include_collections=False):
+            changed.add(_owner_id(session, obj))
+    changed.discard(None)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_versions(session: Session, flush_context):
+    changed = session.info.pop(_INFO_KEY, None)
+    if not changed:
+        return
+    conn = session.connection()
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return
+    rows = [{"user_id": uid, "stamp": secrets.token_hex(8)} for uid in sorted(changed)]
+    stmt = insert(UserDataVersion.__table__)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"stamp": stmt.excluded.stamp, "updated_at": stmt.excluded.updated_at},
+        ),
+        rows,
+    )
@@ -1,17 +1,47 @@
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 from .config import settings
+from .db_pool import TimedQueuePool, TimedAsyncQueuePool, timed_pool_class
+
+
+def _driver_url(url: str) -> str:
+    # Railway Postgres provides "postgresql://..." but SQLAlchemy needs the driver suffix.
+    # Using psycopg3 (psycopg[binary]) so the driver is "+psycopg".
+    # Also handle the legacy "postgres://" scheme that some providers use.
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg://", 1)
+    if url.startswith("postgresql://") and "+" not in url.split("://")[0]:
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+def _async_url(url: str) -> str:
+    # psycopg3 speaks asyncio natively; SQLite goes through aiosqlite.
+    return url.replace("sqlite://", "sqlite+aiosqlite://", 1) if url.startswith("sqlite://") else url
+
+
+def _connect_args_for(url: str, is_async: bool = False) -> dict:
+    if url.startswith("sqlite"):
+        return {} if is_async else {"check_same_thread": False}
+    if settings.db_pgbouncer:
+        # PgBouncer in transaction mode hands each transaction to whichever server
+        # connection is free, so statements psycopg prepared on one connection are
+        # missing (or clash by name) on the next. Disable server-side preparing.
+        return {"prepare_threshold": None}
+    return {}
 
-_db_url = settings.database_url
 
-# Railway Postgres provides "postgresql://..." but SQLAlchemy needs the driver suffix.
-# Using psycopg3 (psycopg[binary]) so the driver is "+psycopg".
-# Also handle the legacy "postgres://" scheme that some providers use.
-if _db_url.startswith("postgres://"):
-    _db_url = _db_url.replace("postgres://", "postgresql+psycopg://", 1)
-elif _db_url.startswith("postgresql://") and "+" not in _db_url.split("://")[0]:
-    _db_url = _db_url.replace("postgresql://", "postgresql+psycopg://", 1)
+_db_url = _driver_url(settings.database_url)
 
 # Log which DB backend is in use (mask credentials)
 if "postgresql" in _db_url:
@@ -20,15 +50,258 @@ if "postgresql" in _db_url:
 else:
     logging.warning("DATABASE: SQLite (ephemeral — data will be lost on redeploy!)")
 
-_connect_args = {"check_same_thread": False} if _db_url.startswith("sqlite") else {}
-engine = create_engine(_db_url, pool_pre_ping=True, connect_args=_connect_args)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+_pool_args = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
+engine = create_engine(_db_url, poolclass=TimedQueuePool, connect_args=_connect_args_for(_db_url), **_pool_args)
+
+# Async engine for routes declared with `async def`, same database.
+# expire_on_commit=False so returned ORM objects stay readable without a lazy
+# refresh (which would need an await).
+async_engine = create_async_engine(
+    _async_url(_db_url), poolclass=TimedAsyncQueuePool,
+    connect_args=_connect_args_for(_db_url, is_async=True), **_pool_args,
+)
+
+# Read replicas. Replica pools always pre-ping so a dead replica is noticed at
+# checkout and the request falls back to the primary instead of failing.
+_replica_urls = [_driver_url(u.strip()) for u in settings.database_replica_urls.split(",") if u.strip()]
+replica_engines = [
+    create_engine(
+        url, poolclass=timed_pool_class(f"replica-{i}"), connect_args=_connect_args_for(url),
+        **{**_pool_args, "pool_pre_ping": True},
+    )
+    for i, url in enumerate(_replica_urls)
+]
+async_replica_engines = [
+    create_async_engine(
+        _async_url(url), poolclass=timed_pool_class(f"async-replica-{i}", TimedAsyncQueuePool),
+        connect_args=_connect_args_for(url, is_async=True), **{**_pool_args, "pool_pre_ping": True},
+    )
+    for i, url in enumerate(_replica_urls)
+]
+if _replica_urls:
+    logging.info("DATABASE: %d read replica(s) for GET requests", len(_replica_urls))
+
+
+# ── SQLite production profile ────────────────────────
+# WAL lets readers run alongside the writer, and a single writer connection
+# queues writes in-process (on the pool) instead of having concurrent
+# transactions fight over the database lock until one gets "database is locked".
+
+_sqlite_production = _db_url.startswith("sqlite") and settings.sqlite_profile == "production"
+
+
+def _apply_sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; safe with WAL
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.close()
+
+
+writer_engine = async_writer_engine = None
+if _sqlite_production:
+    _writer_args = {**_pool_args, "pool_size": 1, "max_overflow": 0}
+    writer_engine = create_engine(
+        _db_url, poolclass=timed_pool_class("sqlite-writer"), connect_args=_connect_args_for(_db_url), **_writer_args,
+    )
+    async_writer_engine = create_async_engine(
+        _async_url(_db_url), poolclass=timed_pool_class("async-sqlite-writer", TimedAsyncQueuePool),
+        connect_args=_connect_args_for(_db_url, is_async=True), **_writer_args,
+    )
+    for _e in (engine, async_engine.sync_engine, writer_engine, async_writer_engine.sync_engine):
+        event.listen(_e, "connect", _apply_sqlite_pragmas)
+    if _replica_urls:
+        logging.warning("DATABASE: replicas are ignored with the SQLite production profile")
+    logging.info("DATABASE: SQLite production profile (WAL, single writer connection)")
+
+
+# ── Read routing ─────────────────────────────────────
+# Sessions for GET/HEAD requests read from a replica. A user who wrote within
+# db_read_your_writes_seconds reads from the primary instead, so they see their
+# own change. A response to a request that wrote carries the time in
+# X-Last-Write and clients send it back, so this holds whichever worker serves
+# the next request; each worker also remembers its own recent writers, for
+# clients that don't echo the header.
+
+LAST_WRITE_HEADER = "X-Last-Write"
+
+_last_write: dict[int, float] = {}
+_replica_down_until: dict[int, float] = {}
+_replica_up_until: dict[int, float] = {}
+_routing_lock = threading.Lock()
+_request_write: ContextVar[dict | None] = ContextVar("request_write", default=None)
+
+
+def note_write(user_id: int):
+    with _routing_lock:
+        _last_write[user_id] = time.monotonic()
+        if len(_last_write) > 10_000:
+            cutoff = time.monotonic() - settings.db_read_your_writes_seconds
+            for uid in [u for u, t in _last_write.items() if t < cutoff]:
+                del _last_write[uid]
+
+
+def _wrote_recently(user_id: int) -> bool:
+    ts = _last_write.get(user_id)
+    return ts is not None and time.monotonic() - ts < settings.db_read_your_writes_seconds
+
+
+def _wrote_before(header: str | None) -> bool:
+    """Whether an X-Last-Write value from the client is within the read-your-writes window."""
+    try:
+        age = time.time() - float(header)
+    except (TypeError, ValueError):
+        return False
+    return 0 <= age < settings.db_read_your_writes_seconds
+
+
+def _replica_available(replica: Engine) -> bool:
+    """Checked with a connection at most every db_replica_health_seconds; pre-ping covers the gaps."""
+    now = time.monotonic()
+    if _replica_down_until.get(id(replica), 0) > now:
+        return False
+    if _replica_up_until.get(id(replica), 0) > now:
+        return True
+    try:
+        with replica.connect():
+            pass
+    except DBAPIError as e:
+        logging.warning("Read replica %s unavailable, using primary: %s", replica.url.host or replica.url.database, e)
+        _replica_down_until[id(replica)] = now + settings.db_replica_retry_seconds
+        return False
+    _replica_up_until[id(replica)] = now + settings.db_replica_health_seconds
+    return True
+
+
+class RoutingSession(Session):
+    """Session that sends reads to a replica when ``info["read_only"]`` is set.
+
+    With the SQLite production profile the "primary" is the single writer
+    connection and the "replica" is the normal read pool on the same file:
+    every session reads from the pool until it first flushes.
+    """
+
+    primary: Engine = writer_engine or engine
+    replicas: list[Engine] = [engine] if _sqlite_production else replica_engines
+    reads_default_to_replica: bool = _sqlite_production
+    replicas_lag: bool = not _sqlite_production
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or self.info.get("wrote"):
+            return self.primary
+        if clause is not None and (getattr(clause, "is_dml", False) or getattr(clause, "is_ddl", False)):
+            # Core DML/DDL writes: on SQLite a write on a read connection takes the database lock
+            # the writer connection then waits on. text() can't be told apart and is routed as a
+            # read, so raw SQL that writes belongs on a connection, not a session.
+            self.info["wrote"] = True
+            return self.primary
+        if not self.info.get("read_only", self.reads_default_to_replica):
+            return self.primary
+        bind = self.info.get("read_bind")
+        if bind is None:
+            bind = self.info["read_bind"] = self._pick_read_bind()
+        return bind
+
+    def _pick_read_bind(self) -> Engine:
+        if not self.replicas_lag:
+            return self.replicas[0]
+        if self.info.get("wrote_before"):
+            return self.primary
+        user_id = self.info.get("user_id")
+        if user_id is not None and _wrote_recently(user_id):
+            return self.primary
+        candidates = list(self.replicas)
+        random.shuffle(candidates)
+        for replica in candidates:
+            if _replica_available(replica):
+                return replica
+        return self.primary
+
+
+class AsyncRoutingSession(RoutingSession):
+    primary = (async_writer_engine or async_engine).sync_engine
+    replicas = [async_engine.sync_engine] if _sqlite_production else [e.sync_engine for e in async_replica_engines]
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_wrote(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session):
+    if session.info.pop("wrote", False) and session.info.get("user_id") is not None:
+        note_write(session.info["user_id"])
+        request_write = _request_write.get()
+        if request_write is not None:
+            request_write["at"] = time.time()
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware: adds X-Last-Write to responses of requests that committed a user's write."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_write: dict = {}
+        token = _request_write.set(request_write)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start" and "at" in request_write:
+                header = (LAST_WRITE_HEADER.lower().encode(), f"{request_write['at']:.3f}".encode())
+                message["headers"] = list(message.get("headers", [])) + [header]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _request_write.reset(token)
+
+
+def _route_session(db, request: Request | None):
+    """Tag a request's session with what the router needs (no-op without replicas)."""
+    if request is None or not _replica_urls or _sqlite_production:
+        return
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        from jose import JWTError, jwt
+        try:
+            payload = jwt.decode(auth[7:], settings.jwt_key, algorithms=[settings.jwt_algorithm])
+            db.info["user_id"] = int(payload["sub"])
+        except (JWTError, KeyError, ValueError):
+            pass
+    db.info["read_only"] = request.method in ("GET", "HEAD")
+    db.info["wrote_before"] = _wrote_before(request.headers.get(LAST_WRITE_HEADER))
+
+
+SessionLocal = sessionmaker(bind=engine, class_=RoutingSession, autoflush=False, autocommit=False)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False,
+)
 
 class Base(DeclarativeBase):
     pass
-def get_db():
+def get_db(request: Request = None):
     db = SessionLocal()
+    _route_session(db, request)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db(request: Request = None):
+    async with AsyncSessionLocal() as db:
+        _route_session(db.sync_session, request)
+        yield db
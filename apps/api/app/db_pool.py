@@ -0,0 +1,112 @@
+"""
+Connection pools that record checkout telemetry.
+
+QueuePool only reports a point-in-time status string. These subclasses time
+every checkout (how long a request waited for a connection), count timeouts
+and track peak usage so pool_size / max_overflow can be sized from real data.
+Stats are exposed on /health/db (internal, see routes_health.py).
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait histogram; the last bucket is open-ended
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# QueuePool._do_get retries by calling itself; only the outermost call is timed
+_checkout_depth: ContextVar[int] = ContextVar("pool_checkout_depth", default=0)
+
+
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.peak_checked_out = 0
+            self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record(self, wait_ms: float, checked_out: int, timed_out: bool = False):
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.wait_histogram[bucket] += 1
+        if wait_ms >= settings.db_pool_slow_checkout_ms:
+            logger.warning("DB pool %s: waited %.0f ms for a connection (%d checked out)", self.name, wait_ms, checked_out)
+
+    def snapshot(self, pool) -> dict:
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            labels = [f"<={b}ms" for b in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": checked_out,
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "saturation": round(checked_out / capacity, 3) if capacity else None,
+                "peak_checked_out": self.peak_checked_out,
+                "peak_saturation": round(self.peak_checked_out / capacity, 3) if capacity else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "wait_histogram": dict(zip(labels, self.wait_histogram)),
+            }
+
+
+class _TimedPoolMixin:
+    stats: PoolStats
+
+    def _do_get(self):
+        depth = _checkout_depth.get()
+        if depth:
+            return super()._do_get()
+        token = _checkout_depth.set(depth + 1)
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record((time.perf_counter() - start) * 1000, self.checkedout(), timed_out=True)
+            raise
+        finally:
+            _checkout_depth.reset(token)
+        self.stats.record((time.perf_counter() - start) * 1000, self.checkedout())
+        return record
+
+
+# Stats live on the class so they survive Pool.recreate() (engine.dispose())
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    stats = PoolStats("sync")
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats("async")
+
+
+def timed_pool_class(name: str, base: type = TimedQueuePool) -> type:
+    """A pool class with its own stats, for engines beyond the primary pair (e.g. replicas)."""
+    return type(f"{base.__name__}_{name}", (base,), {"stats": PoolStats(name)})
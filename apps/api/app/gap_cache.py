@@ -0,0 +1,68 @@
+"""
+Cached gap analysis, and ETags for the endpoints that serve it.
+
+Gap results are a function of the owner's data (policies, details,
+contacts, exposures, certificates and the profile the user_context flags
+come from) and of the date, since gaps say "expires in N days". ``gap_key``
+captures both, plus the scope of the analysis (the whole portfolio, one
+business entity, one exposure, ...), in one lookup of the owner's data
+version stamp (see data_version.py). The flags are covered by the stamp
+because the profile is tracked there.
+
+The same key is the response's ETag: a client polling with If-None-Match
+gets a 304 after that one lookup, before any policy is loaded. The ETag
+also covers the rule source, so a deploy that changes the rules changes the
+tags.
+"""
+
+import hashlib
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache
+from .config import settings
+from .data_version import get_data_version
+
+# Per-worker; entries go stale by key, the TTL only bounds how long unused ones linger
+gap_cache = TTLCache(
+    max_entries=settings.gap_cache_max_entries,
+    ttl_seconds=settings.gap_cache_ttl_seconds,
+)
+
+_RULES_STAMP = hashlib.sha1(b"".join(
+    (Path(__file__).parent / name).read_bytes() for name in ("coverage_taxonomy.py", "gap_engine.py")
+)).hexdigest()[:8]
+
+
+def gap_key(db: Session, user_id: int, today: date, *scope) -> tuple:
+    """Cache key (and ETag source) for a gap analysis of ``user_id``'s data as of ``today``."""
+    return (user_id, get_data_version(db, user_id), today.isoformat(), *scope)
+
+
+def cached(key: tuple, build: Callable[[], Any]) -> Any:
+    value = gap_cache.get(key)
+    if value is None:
+        value = build()
+        gap_cache.put(key, value)
+    return value
+
+
+def etag(key: tuple) -> str:
+    return 'W/"%s"' % hashlib.sha1(f"{_RULES_STAMP}:{key!r}".encode()).hexdigest()[:20]
+
+
+def not_modified(request: Request, response: Response, key: tuple) -> Response | None:
+    """Put ``key``'s ETag on ``response``; return a 304 instead if If-None-Match already has it."""
+    tag = etag(key)
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache"}  # keep it, but revalidate every time
+    header = request.headers.get("if-none-match")
+    if header:
+        tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+        if "*" in tags or tag.removeprefix("W/") in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
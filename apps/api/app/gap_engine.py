@@ -0,0 +1,532 @@
+"""
+Coverage gap rules and the engine that evaluates them.
+
+Each check that analyze_coverage_gaps used to make in its own loop over the
+policies is a ``GapRule``, registered with ``@rule`` in output order:
+
+- Policy rules run once per policy whose (lowercased) type is in
+  ``applies_to`` (None: every policy), and declare the per-policy features
+  they read in ``needs``. A feature is computed once per policy, and only if
+  a rule that applies to the policy's type needs it.
+- Deferred rules are policy rules that run after the pass, for checks that
+  depend on what the other rules found across the portfolio.
+- Portfolio rules run once, after the pass, on the aggregates collected from
+  every policy (``Portfolio``).
+
+``GapEngine.evaluate`` makes one pass over the policies, then runs the
+deferred and portfolio rules, and returns the same list, in the same order,
+as the old function did. ``GapEngine.evaluate_policy`` runs only the policy
+and deferred rules, for one policy: exactly the gaps ``evaluate`` reports for
+that policy, without the rest of the portfolio. Pass ``timings`` to get the
+seconds spent per rule (and on features).
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Callable, Optional
+
+from .coverage_taxonomy import EXCLUSION_KEYWORDS, EXCLUSIONS_BY_TYPE, find_exclusions
+
+SEVERITY_ORDER = {"high": 0, "medium": 1, "low": 2, "info": 3}
+
+BUSINESS_TYPES = {"general_liability", "professional_liability", "commercial_property",
+                  "commercial_auto", "cyber", "bop", "directors_officers", "epli",
+                  "inland_marine", "workers_comp"}
+
+# Compared with the policy_type as stored, not lowercased (as it always was)
+COVERAGE_LIMIT_TYPES = ("auto", "home", "umbrella", "liability", "general_liability", "professional_liability",
+                        "commercial_property", "cyber")
+
+
+@dataclass(frozen=True)
+class GapRule:
+    id: str
+    check: Callable
+    scope: str = "policy"  # "policy" / "deferred": check(features, portfolio); "portfolio": check(portfolio)
+    applies_to: Optional[frozenset[str]] = None  # lowercased policy types; None: every policy
+    needs: tuple[str, ...] = ()  # PolicyFeatures computed for the check
+
+
+RULES: list[GapRule] = []
+
+
+def rule(id: str, scope: str = "policy", applies_to: Optional[set[str]] = None, needs: tuple[str, ...] = ()):
+    """Register the decorated check as a GapRule. Registration order is output order."""
+    def register(check):
+        RULES.append(GapRule(id, check, scope, frozenset(applies_to) if applies_to is not None else None, needs))
+        return check
+    return register
+
+
+# ── Per-policy features ──────────────────────────────
+
+
+@lru_cache(maxsize=8192)
+def _parse_day(text: str) -> Optional[date]:
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _renewal_days(policy: dict, today: date) -> Optional[int]:
+    """Days until renewal_date (negative once past); None if missing or unusable."""
+    renewal = policy.get("renewal_date")
+    if not renewal:
+        return None
+    if isinstance(renewal, str):
+        renewal = _parse_day(renewal)
+        if renewal is None:
+            return None
+    try:
+        return (renewal - today).days
+    except (ValueError, TypeError):
+        return None
+
+
+def _created(policy: dict, today: date) -> Optional[date]:
+    created = policy.get("created_at")
+    return _parse_day(str(created)[:10]) if created else None
+
+
+def _detail_text(policy: dict, today: date) -> str:
+    # Every detail, plus the carrier name and any notes, lowercased for keyword scans
+    text = " ".join([
+        f"{d.get('field_name', '')} {d.get('field_value', '')}"
+        for d in policy.get("details", [])
+    ]).lower()
+    return text + f" {policy.get('carrier', '')} {policy.get('notes', '')}".lower()
+
+
+def _claims_contact(policy: dict, today: date) -> bool:
+    return any(
+        c.get("role") in ("claims", "customer_service") and c.get("phone")
+        for c in policy.get("contacts", [])
+    )
+
+
+FEATURES: dict[str, Callable[[dict, date], object]] = {
+    "renewal_days": _renewal_days,
+    "created": _created,
+    "detail_text": _detail_text,
+    "claims_contact": _claims_contact,
+}
+
+
+class PolicyFeatures:
+    """A policy with what the rules read from it. Only the features some applicable rule needs are set."""
+
+    __slots__ = ("policy", "id", "ptype", "coverage", *FEATURES)
+
+    def __init__(self, policy: dict, needs: tuple[str, ...], today: date):
+        self.policy = policy
+        self.id = policy.get("id")
+        self.ptype = (policy.get("policy_type") or "").lower()
+        self.coverage = policy.get("coverage_amount") or 0
+        for name in needs:
+            setattr(self, name, FEATURES[name](policy, today))
+
+
+class Portfolio:
+    """Aggregates over every policy, plus what the rules share while evaluating."""
+
+    def __init__(self, user_context: dict, today: date):
+        self.user_context = user_context
+        self.today = today
+        self.policy_types: set[str] = set()
+        self.low_auto_coverage = None  # first auto policy with 0 < coverage < 100k
+        self.exclusions_found: set[str] = set()  # f"{exclusion}_{policy id}"
+
+    def add(self, f: PolicyFeatures):
+        self.policy_types.add(f.ptype)
+        if f.ptype == "auto" and self.low_auto_coverage is None and 0 < f.coverage < 100000:
+            self.low_auto_coverage = f.coverage
+
+
+# ── Engine ───────────────────────────────────────────
+
+
+class GapEngine:
+    def __init__(self, rules: list[GapRule]):
+        self.rules = rules
+        self.portfolio_rules = [r for r in rules if r.scope == "portfolio"]
+        self._plans: dict[str, tuple[list[GapRule], list[GapRule], tuple[str, ...]]] = {}
+
+    def _plan(self, ptype: str) -> tuple[list[GapRule], list[GapRule], tuple[str, ...]]:
+        """The policy and deferred rules for a policy type and the features they need, worked out once per type."""
+        plan = self._plans.get(ptype)
+        if plan is None:
+            rules = [r for r in self.rules if r.scope != "portfolio" and (r.applies_to is None or ptype in r.applies_to)]
+            needs = tuple(dict.fromkeys(name for r in rules for name in r.needs))
+            plan = self._plans[ptype] = (
+                [r for r in rules if r.scope == "policy"], [r for r in rules if r.scope == "deferred"], needs,
+            )
+        return plan
+
+    def evaluate(
+        self,
+        policies: list[dict],
+        user_context: Optional[dict] = None,
+        today: Optional[date] = None,
+        timings: Optional[dict[str, float]] = None,
+    ) -> list[dict]:
+        """The coverage gaps for a portfolio, sorted by severity.
+
+        ``today`` defaults to the local date. With ``timings``, adds the seconds
+        spent in each rule (by rule id) and on computing features.
+        """
+        return self._evaluate(policies, Portfolio(user_context or {}, today or datetime.now().date()), timings, True)
+
+    def evaluate_policy(
+        self,
+        policy: dict,
+        today: Optional[date] = None,
+        timings: Optional[dict[str, float]] = None,
+    ) -> list[dict]:
+        """The gaps ``evaluate`` would report for this policy (``policy_id`` equal to its id), from it alone.
+
+        Only policy and deferred rules run, and none of them read the
+        user_context or the other policies.
+        """
+        return self._evaluate([policy], Portfolio({}, today or datetime.now().date()), timings, False)
+
+    def _evaluate(self, policies: list[dict], portfolio: Portfolio, timings: Optional[dict[str, float]],
+                  with_portfolio_rules: bool) -> list[dict]:
+        found: dict[str, list[dict]] = {r.id: [] for r in self.rules}
+        clock = time.perf_counter if timings is not None else None
+
+        def run(r: GapRule, *args):
+            if clock:
+                t0 = clock()
+            gaps = r.check(*args)
+            if gaps:
+                found[r.id].extend(gaps)
+            if clock:
+                timings[r.id] = timings.get(r.id, 0.0) + clock() - t0
+
+        deferred = []
+        for policy in policies:
+            ptype = (policy.get("policy_type") or "").lower()
+            rules, after, needs = self._plan(ptype)
+            if clock:
+                t0 = clock()
+            f = PolicyFeatures(policy, needs, portfolio.today)
+            portfolio.add(f)
+            if clock:
+                timings["features"] = timings.get("features", 0.0) + clock() - t0
+            for r in rules:
+                run(r, f, portfolio)
+            if after:
+                deferred.append((f, after))
+
+        for f, after in deferred:
+            for r in after:
+                run(r, f, portfolio)
+        if with_portfolio_rules:
+            for r in self.portfolio_rules:
+                run(r, portfolio)
+
+        result = [gap for r in self.rules for gap in found[r.id]]
+        result.sort(key=lambda g: SEVERITY_ORDER.get(g["severity"], 4))
+        return result
+
+
+# ── Rules ────────────────────────────────────────────
+
+
+@rule("consider_auto", scope="portfolio")
+def _consider_auto(p: Portfolio):
+    if "auto" not in p.policy_types:
+        return [{
+            "id": "consider_auto",
+            "name": "Auto Insurance",
+            "severity": "high" if p.user_context.get("has_vehicle") else "info",
+            "description": "No auto policy on file. If you own or lease a vehicle, you need auto insurance.",
+            "recommendation": "Add your auto policy to track coverage and renewals.",
+            "category": "auto_liability"
+        }]
+
+
+@rule("consider_property", scope="portfolio")
+def _consider_property(p: Portfolio):
+    if "home" not in p.policy_types and "renters" not in p.policy_types:
+        if p.user_context.get("is_homeowner"):
+            severity = "high"
+        elif p.user_context.get("is_renter"):
+            severity = "medium"
+        else:
+            severity = "info"
+        return [{
+            "id": "consider_property",
+            "name": "Property Insurance",
+            "severity": severity,
+            "description": "No home or renters policy on file.",
+            "recommendation": "Homeowners need dwelling coverage. Renters should have renters insurance to protect belongings.",
+            "category": "personal_property"
+        }]
+
+
+@rule("no_life", scope="portfolio")
+def _no_life(p: Portfolio):
+    if "life" not in p.policy_types:
+        return [{
+            "id": "no_life",
+            "name": "Life Insurance",
+            "severity": "high" if p.user_context.get("has_dependents") else "info",
+            "description": "No life insurance policy on file.",
+            "recommendation": "Life insurance provides financial security for your loved ones. Term life is an affordable option.",
+            "category": "life_insurance"
+        }]
+
+
+@rule("no_umbrella", scope="portfolio")
+def _no_umbrella(p: Portfolio):
+    if "umbrella" not in p.policy_types and "liability" not in p.policy_types:
+        if p.user_context.get("high_net_worth") or len(p.policy_types) >= 2:
+            return [{
+                "id": "no_umbrella",
+                "name": "Umbrella Coverage",
+                "severity": "high" if p.user_context.get("high_net_worth") else "medium",
+                "description": "No umbrella/excess liability policy.",
+                "recommendation": "An umbrella policy provides additional liability coverage above your auto and home limits. Protects your assets from lawsuits.",
+                "category": "umbrella_liability"
+            }]
+
+
+@rule("no_health", scope="portfolio")
+def _no_health(p: Portfolio):
+    if "health" not in p.policy_types:
+        return [{
+            "id": "no_health",
+            "name": "Health Insurance",
+            "severity": "high" if p.user_context.get("has_dependents") else "medium",
+            "description": "No health insurance policy on file.",
+            "recommendation": "Health insurance is essential. If employer-sponsored, add it here to track deductibles and out-of-pocket costs.",
+            "category": "health_insurance"
+        }]
+
+
+@rule("no_dental", scope="portfolio")
+def _no_dental(p: Portfolio):
+    if "dental" not in p.policy_types:
+        return [{
+            "id": "no_dental",
+            "name": "Dental Insurance",
+            "severity": "info",
+            "description": "No dental insurance policy on file.",
+            "recommendation": "Dental coverage helps manage preventive and restorative care costs.",
+            "category": "dental_insurance"
+        }]
+
+
+@rule("no_vision", scope="portfolio")
+def _no_vision(p: Portfolio):
+    if "vision" not in p.policy_types:
+        return [{
+            "id": "no_vision",
+            "name": "Vision Insurance",
+            "severity": "info",
+            "description": "No vision insurance policy on file.",
+            "recommendation": "Vision plans cover eye exams, glasses, and contacts at reduced cost.",
+            "category": "vision_insurance"
+        }]
+
+
+@rule("no_disability", scope="portfolio")
+def _no_disability(p: Portfolio):
+    if "disability" not in p.policy_types:
+        return [{
+            "id": "no_disability",
+            "name": "Disability Insurance",
+            "severity": "medium" if p.user_context.get("has_dependents") else "info",
+            "description": "No disability insurance on file.",
+            "recommendation": "Disability insurance replaces income if you can't work due to illness or injury. Often overlooked but critical.",
+            "category": "disability_income"
+        }]
+
+
+@rule("business", scope="portfolio")
+def _business(p: Portfolio):
+    owns_business = p.user_context.get("owns_business", False)
+    if not (p.policy_types & BUSINESS_TYPES or owns_business):
+        return None
+    gaps = []
+    if "general_liability" not in p.policy_types and "bop" not in p.policy_types:
+        gaps.append({
+            "id": "no_gl",
+            "name": "No General Liability",
+            "severity": "high",
+            "description": "No general liability or BOP policy on file. GL is the foundation of business insurance.",
+            "recommendation": "General liability covers third-party injury and property damage claims. Required by most contracts and leases.",
+            "category": "general_liability"
+        })
+    if "cyber" not in p.policy_types:
+        gaps.append({
+            "id": "no_cyber",
+            "name": "No Cyber Coverage",
+            "severity": "high" if owns_business else "medium",
+            "description": "No cyber liability policy on file.",
+            "recommendation": "Cyber insurance covers data breaches, ransomware, and response costs. A growing risk for all businesses.",
+            "category": "cyber_liability"
+        })
+    if "epli" not in p.policy_types and ("workers_comp" in p.policy_types or owns_business):
+        gaps.append({
+            "id": "no_epli",
+            "name": "No Employment Practices Liability",
+            "severity": "high" if owns_business else "medium",
+            "description": "No EPLI coverage on file.",
+            "recommendation": "EPLI covers wrongful termination, discrimination, and harassment claims — risks not covered by workers' comp.",
+            "category": "employment_practices"
+        })
+    if "professional_liability" not in p.policy_types:
+        gaps.append({
+            "id": "no_professional_liability",
+            "name": "Professional Liability (E&O)",
+            "severity": "info",
+            "description": "No professional liability policy on file.",
+            "recommendation": "If your business provides professional services or advice, E&O insurance protects against negligence claims.",
+            "category": "professional_liability"
+        })
+    return gaps
+
+
+@rule("low_auto_liability", scope="portfolio")
+def _low_auto_liability(p: Portfolio):
+    coverage = p.low_auto_coverage
+    if coverage is not None:
+        return [{
+            "id": "low_auto_liability",
+            "name": "Low Auto Liability Limit",
+            "severity": "medium",
+            "description": f"Your auto liability limit (${coverage:,}) may be insufficient.",
+            "recommendation": "Consider increasing to at least $100,000/$300,000. Medical costs and lawsuits can easily exceed low limits.",
+            "category": "auto_liability"
+        }]
+
+
+@rule("renewal", needs=("renewal_days",))
+def _renewal(f: PolicyFeatures, p: Portfolio):
+    days_until = f.renewal_days
+    if days_until is None:
+        return None
+    policy = f.policy
+    if days_until < 0:
+        return [{
+            "id": f"expired_{policy.get('id')}",
+            "name": "Policy Expired",
+            "severity": "high",
+            "description": f"Your {policy.get('carrier', 'policy')} {policy.get('policy_type', '')} policy has expired.",
+            "recommendation": "Renew immediately to avoid coverage lapses.",
+            "category": "renewal",
+            "policy_id": policy.get("id")
+        }]
+    if days_until <= 14:
+        return [{
+            "id": f"expiring_soon_{policy.get('id')}",
+            "name": "Renewal Urgent",
+            "severity": "medium",
+            "description": f"Your {policy.get('carrier', 'policy')} {policy.get('policy_type', '')} policy expires in {days_until} days.",
+            "recommendation": "Review coverage and renew before expiration.",
+            "category": "renewal",
+            "policy_id": policy.get("id")
+        }]
+    if days_until <= 30:
+        return [{
+            "id": f"expiring_{policy.get('id')}",
+            "name": "Renewal Approaching",
+            "severity": "low",
+            "description": f"Your {policy.get('carrier', 'policy')} {policy.get('policy_type', '')} policy expires in {days_until} days.",
+            "recommendation": "Good time to review coverage and shop around.",
+            "category": "renewal",
+            "policy_id": policy.get("id")
+        }]
+
+
+@rule("stale_home_coverage", applies_to={"home"}, needs=("created",))
+def _stale_home_coverage(f: PolicyFeatures, p: Portfolio):
+    # Construction costs rise ~5-10% a year; a home policy 3+ years old may need its dwelling limit reviewed.
+    # In the real world we'd compare with local rebuild cost indices.
+    coverage = f.coverage
+    if coverage > 0 and f.created is not None:
+        years_old = (p.today - f.created).days / 365
+        if years_old >= 3:
+            estimated_increase = int(years_old * 7)  # ~7% annual construction cost increase
+            return [{
+                "id": f"stale_home_coverage_{f.id}",
+                "name": "Home Coverage Review Needed",
+                "severity": "medium",
+                "description": f"Your home coverage (${coverage:,}) hasn't been reviewed in {int(years_old)} years. Construction costs have risen ~{estimated_increase}% since then.",
+                "recommendation": "Contact your agent to review dwelling coverage. You may be underinsured if rebuild costs have increased.",
+                "category": "dwelling_coverage",
+                "policy_id": f.id
+            }]
+
+
+@rule("no_claims_contact", needs=("claims_contact",))
+def _no_claims_contact(f: PolicyFeatures, p: Portfolio):
+    if not f.claims_contact and f.policy.get("carrier") != "Pending extraction...":
+        return [{
+            "id": f"no_claims_contact_{f.id}",
+            "name": "Missing Claims Contact",
+            "severity": "low",
+            "description": f"Your {f.policy.get('carrier', 'policy')} policy has no claims phone number on file.",
+            "recommendation": "Add the claims phone number so you're ready if you need to file a claim.",
+            "category": "preparedness",
+            "policy_id": f.id
+        }]
+
+
+@rule("unknown_coverage", applies_to=set(COVERAGE_LIMIT_TYPES))
+def _unknown_coverage(f: PolicyFeatures, p: Portfolio):
+    policy = f.policy
+    ptype = policy.get("policy_type", "")
+    if not f.coverage and ptype in COVERAGE_LIMIT_TYPES and policy.get("carrier") != "Pending extraction...":
+        return [{
+            "id": f"unknown_coverage_{f.id}",
+            "name": "Unknown Coverage Limit",
+            "severity": "low",
+            "description": f"Your {policy.get('carrier', 'policy')} {ptype} policy has no coverage limit recorded.",
+            "recommendation": "Add your coverage limit to better understand your protection level.",
+            "category": "incomplete_data",
+            "policy_id": f.id
+        }]
+
+
+@rule("exclusions", applies_to=set(EXCLUSIONS_BY_TYPE), needs=("detail_text",))
+def _exclusions(f: PolicyFeatures, p: Portfolio):
+    gaps = []
+    for excl_id in find_exclusions(f.ptype, f.detail_text):
+        exclusion_key = f"{excl_id}_{f.id}"
+        if exclusion_key not in p.exclusions_found:
+            p.exclusions_found.add(exclusion_key)
+            excl_info = EXCLUSION_KEYWORDS[excl_id]
+            gaps.append({
+                "id": f"exclusion_{excl_id}_{f.id}",
+                "name": excl_info["name"],
+                "severity": "info",
+                "description": excl_info["description"],
+                "recommendation": excl_info["recommendation"],
+                "category": "exclusion_warning",
+                "policy_id": f.id
+            })
+    return gaps
+
+
+@rule("flood_reminder", scope="deferred", applies_to={"home", "renters"})
+def _flood_reminder(f: PolicyFeatures, p: Portfolio):
+    # Standard home/renters policies exclude flood: remind, unless a flood exclusion was already found for the policy
+    if f"flood_{f.id}" not in p.exclusions_found:
+        return [{
+            "id": f"exclusion_flood_reminder_{f.id}",
+            "name": "Flood Coverage Reminder",
+            "severity": "info",
+            "description": "Standard home/renters policies do NOT cover flood damage.",
+            "recommendation": "If you're in a flood-prone area, consider NFIP or private flood insurance.",
+            "category": "exclusion_warning",
+            "policy_id": f.id
+        }]
+
+
+engine = GapEngine(RULES)
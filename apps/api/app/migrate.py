@@ -0,0 +1,42 @@
+"""
+Apply database schema migrations.
+
+    python -m app.migrate            # upgrade to head
+    python -m app.migrate --status   # show current and head versions
+    python -m app.migrate --target 3
+
+Run from apps/api before starting the app (the Docker image does this).
+"""
+
+import argparse
+import logging
+import sys
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate")
+    parser.add_argument("--status", action="store_true", help="print versions and pending migrations, then exit")
+    parser.add_argument("--target", type=int, help="stop at this version instead of head")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from .db import engine
+    from .migrations import HEAD, MIGRATIONS, current_version, migrate
+
+    current = current_version(engine)
+    if args.status:
+        print(f"current: {current}  head: {HEAD}")
+        for m in MIGRATIONS:
+            print(f"  {'applied' if m.version <= current else 'pending'}  {m.version:04d}_{m.name}")
+        return 0
+
+    applied = migrate(engine, args.target)
+    if applied:
+        print(f"Migrated {current} -> {max(applied)} ({len(applied)} applied)")
+    else:
+        print(f"Already at {current_version(engine)} (head {HEAD})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
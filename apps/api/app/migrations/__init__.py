@@ -0,0 +1,150 @@
+"""
+Versioned schema migrations.
+
+Each module named ``vNNNN_<name>.py`` in this package defines ``upgrade(conn)``.
+Applied versions are recorded in ``schema_migrations``; ``python -m app.migrate``
+applies whatever is pending. Runners take a single-writer lock (a Postgres
+advisory lock, or SQLite's write lock via BEGIN IMMEDIATE) and re-check each
+version under it, so several workers or deploys racing to migrate is safe.
+
+App startup only compares the recorded version with ``HEAD`` (one query).
+"""
+
+import importlib
+import logging
+import pkgutil
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+_MODULE_RE = re.compile(r"^v(\d{4})_(\w+)$")
+_PG_LOCK_KEY = 0x636F7672  # arbitrary, shared by every migration runner
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def _discover() -> list[Migration]:
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        m = _MODULE_RE.match(info.name)
+        if not m:
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        found.append(Migration(int(m.group(1)), m.group(2), module.upgrade))
+    found.sort(key=lambda mig: mig.version)
+    versions = [mig.version for mig in found]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return found
+
+
+MIGRATIONS = _discover()
+HEAD = MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(engine: Engine) -> int:
+    """Highest applied version, or 0 for a database that has never been migrated."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+def is_at_head(engine: Engine) -> bool:
+    return current_version(engine) >= HEAD
+
+
+def _applied(conn: Connection) -> set[int]:
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def _record(conn: Connection, mig: Migration):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+        {"v": mig.version, "n": mig.name},
+    )
+
+
+def _run_postgres(engine: Engine, pending: list[Migration]) -> list[int]:
+    done = []
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _PG_LOCK_KEY})
+        conn.commit()
+        try:
+            with conn.begin():
+                conn.execute(text(_CREATE_TABLE))
+            for mig in pending:
+                with conn.begin():
+                    if mig.version in _applied(conn):
+                        continue
+                    _apply(conn, mig)
+                done.append(mig.version)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _PG_LOCK_KEY})
+            conn.commit()
+    return done
+
+
+def _run_sqlite(engine: Engine, pending: list[Migration]) -> list[int]:
+    # pysqlite only opens transactions before DML by itself; drive them by hand so
+    # DDL is transactional and BEGIN IMMEDIATE takes the database write lock.
+    done = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        conn.execute(text(_CREATE_TABLE))
+        conn.exec_driver_sql("COMMIT")
+        for mig in pending:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                if mig.version in _applied(conn):
+                    conn.exec_driver_sql("COMMIT")
+                    continue
+                _apply(conn, mig)
+                conn.exec_driver_sql("COMMIT")
+            except Exception:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            done.append(mig.version)
+    return done
+
+
+def _apply(conn: Connection, mig: Migration):
+    start = time.perf_counter()
+    mig.upgrade(conn)
+    _record(conn, mig)
+    logger.info("Applied migration %04d_%s in %.0f ms", mig.version, mig.name, (time.perf_counter() - start) * 1000)
+
+
+def migrate(engine: Engine, target: int | None = None) -> list[int]:
+    """Apply pending migrations up to ``target`` (default: HEAD). Returns the versions applied."""
+    target = HEAD if target is None else target
+    current = current_version(engine)
+    pending = [m for m in MIGRATIONS if current < m.version <= target]
+    if not pending:
+        return []
+    if engine.dialect.name == "sqlite":
+        return _run_sqlite(engine, pending)
+    if engine.dialect.name == "postgresql":
+        return _run_postgres(engine, pending)
+    raise RuntimeError(f"Unsupported database for migrations: {engine.dialect.name}")
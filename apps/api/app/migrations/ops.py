@@ -0,0 +1,29 @@
+"""
+Idempotent schema helpers for migrations.
+
+Fresh databases get the whole current schema from the baseline (create_all), so
+later migrations also run against tables that already have their changes.
+Every step must therefore be safe to re-run.
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def table_exists(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def column_names(conn: Connection, table: str) -> set[str]:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def add_column_if_missing(conn: Connection, table: str, column: str, ddl: str):
+    """ALTER TABLE ... ADD COLUMN unless it's already there. ``ddl`` is the type and options."""
+    if table_exists(conn, table) and column not in column_names(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index_if_missing(conn: Connection, name: str, table: str, columns: list[str], unique: bool = False):
+    cols = ", ".join(columns)
+    conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
@@ -0,0 +1,45 @@
+"""Baseline: create any missing tables and apply the column additions that used to run at startup."""
+
+from sqlalchemy.engine import Connection
+
+from .ops import add_column_if_missing
+
+
+def upgrade(conn: Connection):
+    # Registers every model on Base.metadata
+    from app import models, models_chat, models_documents, models_features, models_profile  # noqa: F401
+    from app.db import Base
+
+    Base.metadata.create_all(bind=conn)
+
+    for column, ddl in [
+        ("nickname", "VARCHAR(200)"),
+        ("premium_amount", "INTEGER"),
+        ("business_name", "VARCHAR(200)"),
+        ("exposure_id", "INTEGER"),
+        ("status", "VARCHAR(20) DEFAULT 'active'"),
+        # Health-specific fields
+        ("plan_subtype", "VARCHAR(30)"),
+        ("out_of_pocket_max", "INTEGER"),
+        ("family_deductible", "INTEGER"),
+        ("family_oop_max", "INTEGER"),
+        # Deductible tracking
+        ("deductible_type", "VARCHAR(20)"),
+        ("deductible_period_start", "DATE"),
+        ("deductible_applied", "INTEGER"),
+    ]:
+        add_column_if_missing(conn, "policies", column, ddl)
+
+    for column, ddl in [
+        ("role", "VARCHAR(20) DEFAULT 'individual'"),
+        ("plan", "VARCHAR(20) DEFAULT 'trial'"),
+        ("stripe_customer_id", "VARCHAR(100)"),
+        ("stripe_subscription_id", "VARCHAR(100)"),
+        ("trial_ends_at", "TIMESTAMP"),
+    ]:
+        add_column_if_missing(conn, "users", column, ddl)
+
+    add_column_if_missing(conn, "documents", "cached_text", "TEXT")
+
+    add_column_if_missing(conn, "policy_shares", "role_label", "VARCHAR(30)")
+    add_column_if_missing(conn, "policy_shares", "expires_at", "DATE")
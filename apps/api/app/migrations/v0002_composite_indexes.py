@@ -0,0 +1,22 @@
+"""Composite indexes for the hot multi-column filters (see the __table_args__ on each model)."""
+
+from sqlalchemy.engine import Connection
+
+from .ops import create_index_if_missing
+
+INDEXES = [
+    ("ix_policies_user_id_status", "policies", ["user_id", "status"]),
+    ("ix_policies_user_id_renewal_date", "policies", ["user_id", "renewal_date"]),
+    ("ix_policy_deltas_policy_id_created_at", "policy_deltas", ["policy_id", "created_at"]),
+    ("ix_policy_deltas_policy_id_is_acknowledged", "policy_deltas", ["policy_id", "is_acknowledged"]),
+    ("ix_policy_shares_email_accepted_expires_at", "policy_shares", ["shared_with_email", "accepted", "expires_at"]),
+    ("ix_renewal_reminders_dismissed_remind_at", "renewal_reminders", ["dismissed", "remind_at"]),
+    ("ix_premiums_policy_id_paid_date_due_date", "premiums", ["policy_id", "paid_date", "due_date"]),
+    ("ix_coverage_scores_user_id_category", "coverage_scores", ["user_id", "category"]),
+    ("ix_audit_logs_user_id_created_at", "audit_logs", ["user_id", "created_at"]),
+]
+
+
+def upgrade(conn: Connection):
+    for name, table, columns in INDEXES:
+        create_index_if_missing(conn, name, table, columns)
@@ -0,0 +1,12 @@
+"""Covering index for an agent's client list (distinct owners who shared with them as broker)."""
+
+from sqlalchemy.engine import Connection
+
+from .ops import create_index_if_missing
+
+
+def upgrade(conn: Connection):
+    create_index_if_missing(
+        conn, "ix_policy_shares_email_role_accepted_owner", "policy_shares",
+        ["shared_with_email", "role_label", "accepted", "owner_id"],
+    )
@@ -0,0 +1,11 @@
+"""user_portfolio_stats: per-user aggregates maintained by flush hooks, backfilled here."""
+
+from sqlalchemy.engine import Connection
+
+
+def upgrade(conn: Connection):
+    from app.models_features import UserPortfolioStats
+    from app.portfolio_stats import rebuild_all
+
+    UserPortfolioStats.__table__.create(conn, checkfirst=True)
+    rebuild_all(conn)
@@ -0,0 +1,10 @@
+"""Indexes matching the keyset order of the drafts and conversations lists."""
+
+from sqlalchemy.engine import Connection
+
+from .ops import create_index_if_missing
+
+
+def upgrade(conn: Connection):
+    create_index_if_missing(conn, "ix_policy_drafts_user_id_created_at", "policy_drafts", ["user_id", "created_at"])
+    create_index_if_missing(conn, "ix_conversations_user_id_updated_at", "conversations", ["user_id", "updated_at"])
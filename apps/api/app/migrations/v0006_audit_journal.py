@@ -0,0 +1,9 @@
+"""audit_journal_segments: journal segments already inserted by the buffered audit writer."""
+
+from sqlalchemy.engine import Connection
+
+
+def upgrade(conn: Connection):
+    from app.models_features import AuditJournalSegment
+
+    AuditJournalSegment.__table__.create(conn, checkfirst=True)
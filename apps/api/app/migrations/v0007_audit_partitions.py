@@ -0,0 +1,17 @@
+"""Monthly partitions for audit_logs on Postgres, and the (user_id, created_at desc) index everywhere."""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .ops import create_index_if_missing
+
+
+def upgrade(conn: Connection):
+    from app.audit_retention import partition_audit_logs
+    from app.config import settings
+
+    partition_audit_logs(conn, settings.audit_partitions_ahead)
+    conn.execute(text("DROP INDEX IF EXISTS ix_audit_logs_user_id_created_at"))
+    create_index_if_missing(
+        conn, "ix_audit_logs_user_id_created_at_desc", "audit_logs", ["user_id", "created_at DESC", "id DESC"],
+    )
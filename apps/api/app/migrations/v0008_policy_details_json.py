@@ -0,0 +1,17 @@
+"""policies.details_json: policy details as one JSON value per policy, backfilled here (GIN-indexed on Postgres)."""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .ops import add_column_if_missing
+
+
+def upgrade(conn: Connection):
+    from app.policy_details import rebuild
+
+    add_column_if_missing(conn, "policies", "details_json", "JSONB" if conn.dialect.name == "postgresql" else "JSON")
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_policies_details_json ON policies USING gin (details_json jsonb_path_ops)"
+        ))
+    rebuild(conn, only_missing=True)
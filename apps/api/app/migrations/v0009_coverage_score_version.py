@@ -0,0 +1,9 @@
+"""coverage_scores.data_version: the user data version each score was computed from."""
+
+from sqlalchemy.engine import Connection
+
+from .ops import add_column_if_missing
+
+
+def upgrade(conn: Connection):
+    add_column_if_missing(conn, "coverage_scores", "data_version", "VARCHAR(32)")
@@ -0,0 +1,10 @@
+"""user_snapshots and batch_shards: nightly batch results and its per-shard checkpoints."""
+
+from sqlalchemy.engine import Connection
+
+
+def upgrade(conn: Connection):
+    from app.models_features import BatchShard, UserSnapshot
+
+    UserSnapshot.__table__.create(conn, checkfirst=True)
+    BatchShard.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,9 @@
+"""audit_journal_txns: committed transactions whose journaled audit entries await insertion."""
+
+from sqlalchemy.engine import Connection
+
+
+def upgrade(conn: Connection):
+    from app.models_features import AuditJournalTxn
+
+    AuditJournalTxn.__table__.create(conn, checkfirst=True)
@@ -1,4 +1,5 @@
-from sqlalchemy import String, Integer, Boolean, Date, DateTime, ForeignKey, func
+from sqlalchemy import String, Integer, Boolean, Date, DateTime, ForeignKey, Index, JSON, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -30,6 +31,12 @@ class Exposure(Base):
 
 class Policy(Base):
     __tablename__ = "policies"
+    __table_args__ = (
+        Index("ix_policies_user_id_status", "user_id", "status"),
+        Index("ix_policies_user_id_renewal_date", "user_id", "renewal_date"),
+        Index("ix_policies_details_json", "details_json", postgresql_using="gin",
+              postgresql_ops={"details_json": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
@@ -60,6 +67,11 @@ class Policy(Base):
 
     renewal_date: Mapped[Date | None] = mapped_column(Date, nullable=True)
 
+    # Copy of the policy_details rows, kept in sync by a flush hook; NULL until built (see policy_details.py)
+    details_json: Mapped[list | None] = mapped_column(
+        JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True,
+    )
+
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
 
     # Relationships for eager loading
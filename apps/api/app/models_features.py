@@ -1,10 +1,13 @@
-from sqlalchemy import String, Integer, Date, DateTime, Boolean, ForeignKey, func, Text
+from sqlalchemy import String, Integer, BigInteger, Date, DateTime, Boolean, ForeignKey, Index, func, Text
 from sqlalchemy.orm import Mapped, mapped_column
 from .db import Base
 
 
 class Premium(Base):
     __tablename__ = "premiums"
+    __table_args__ = (
+        Index("ix_premiums_policy_id_paid_date_due_date", "policy_id", "paid_date", "due_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     policy_id: Mapped[int] = mapped_column(Integer, ForeignKey("policies.id", ondelete="CASCADE"), index=True)
@@ -35,6 +38,9 @@ class Claim(Base):
 
 class RenewalReminder(Base):
     __tablename__ = "renewal_reminders"
+    __table_args__ = (
+        Index("ix_renewal_reminders_dismissed_remind_at", "dismissed", "remind_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     policy_id: Mapped[int] = mapped_column(Integer, ForeignKey("policies.id", ondelete="CASCADE"), index=True)
@@ -44,6 +50,7 @@ class RenewalReminder(Base):
 
 
 class AuditLog(Base):
+    """Range-partitioned by month on Postgres; see audit_retention.py."""
     __tablename__ = "audit_logs"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -55,8 +62,42 @@ class AuditLog(Base):
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
 
 
+# Newest-first per user, the order /audit pages in (column expressions, so defined after the class)
+Index("ix_audit_logs_user_id_created_at_desc", AuditLog.user_id, AuditLog.created_at.desc(), AuditLog.id.desc())
+
+
+class AuditJournalSegment(Base):
+    """Journal segments already inserted into audit_logs (see audit_writer.py).
+
+    Written in the same transaction as the segment's rows, so a segment file
+    left behind by a crash before it was deleted is not inserted twice.
+    """
+    __tablename__ = "audit_journal_segments"
+
+    segment: Mapped[str] = mapped_column(String(64), primary_key=True)
+    entries: Mapped[int] = mapped_column(Integer)
+    inserted_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+
+class AuditJournalTxn(Base):
+    """Transactions whose journaled audit entries are to be inserted (see audit_writer.py).
+
+    Entries are journaled just before their transaction commits, and this row
+    is written in that transaction, so it exists only if the commit did.
+    Deleted when the entries are inserted.
+    """
+    __tablename__ = "audit_journal_txns"
+
+    txn: Mapped[str] = mapped_column(String(32), primary_key=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+
 class PolicyShare(Base):
     __tablename__ = "policy_shares"
+    __table_args__ = (
+        Index("ix_policy_shares_email_accepted_expires_at", "shared_with_email", "accepted", "expires_at"),
+        Index("ix_policy_shares_email_role_accepted_owner", "shared_with_email", "role_label", "accepted", "owner_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     policy_id: Mapped[int] = mapped_column(Integer, ForeignKey("policies.id", ondelete="CASCADE"), index=True)
@@ -104,6 +145,10 @@ class PremiumHistory(Base):
 class PolicyDelta(Base):
     """Track changes between policy versions detected during extraction."""
     __tablename__ = "policy_deltas"
+    __table_args__ = (
+        Index("ix_policy_deltas_policy_id_created_at", "policy_id", "created_at"),
+        Index("ix_policy_deltas_policy_id_is_acknowledged", "policy_id", "is_acknowledged"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     policy_id: Mapped[int] = mapped_column(Integer, ForeignKey("policies.id", ondelete="CASCADE"), index=True)
@@ -131,6 +176,9 @@ class DeltaExplanation(Base):
 class CoverageScore(Base):
     """User coverage score by category."""
     __tablename__ = "coverage_scores"
+    __table_args__ = (
+        Index("ix_coverage_scores_user_id_category", "user_id", "category"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
@@ -139,6 +187,7 @@ class CoverageScore(Base):
     score_breakdown: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON
     insights: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON array
     last_calculated: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+    data_version: Mapped[str | None] = mapped_column(String(32), nullable=True)  # UserDataVersion stamp these scores are from
 
 
 class InboundAddress(Base):
@@ -171,6 +220,9 @@ class InboundEmail(Base):
 class PolicyDraft(Base):
     """Policy draft created from email ingestion awaiting user approval."""
     __tablename__ = "policy_drafts"
+    __table_args__ = (
+        Index("ix_policy_drafts_user_id_created_at", "user_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
@@ -220,3 +272,54 @@ class CertificateReminder(Base):
     remind_at: Mapped[Date] = mapped_column(Date)
     dismissed: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+
+class UserDataVersion(Base):
+    """Opaque stamp that changes whenever a user's insurance data changes (see data_version.py)."""
+    __tablename__ = "user_data_versions"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    stamp: Mapped[str] = mapped_column(String(32))
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class UserPortfolioStats(Base):
+    """Per-user portfolio aggregates, kept current by flush hooks (see portfolio_stats.py)."""
+    __tablename__ = "user_portfolio_stats"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    policy_count: Mapped[int] = mapped_column(Integer, default=0)
+    active_policy_count: Mapped[int] = mapped_column(Integer, default=0)
+    total_coverage: Mapped[int] = mapped_column(BigInteger, default=0)
+    total_premium: Mapped[int] = mapped_column(BigInteger, default=0)
+    coverage_by_type: Mapped[str] = mapped_column(Text, default="{}")  # JSON: {type: {coverage, premium, count}}
+    next_renewal: Mapped[Date | None] = mapped_column(Date, nullable=True, index=True)  # earliest renewal on/after the day computed
+    overall_score: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    unacknowledged_deltas: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class UserSnapshot(Base):
+    """Per-user result precomputed by the nightly batch (see snapshots.py)."""
+    __tablename__ = "user_snapshots"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(30), primary_key=True)  # "gaps", "smart_reminders"
+    data_version: Mapped[str] = mapped_column(String(32))  # UserDataVersion stamp the payload is from
+    code_version: Mapped[str] = mapped_column(String(16))  # hash of the code that computed it
+    computed_for: Mapped[Date] = mapped_column(Date)  # the day the payload is correct for
+    payload: Mapped[str] = mapped_column(Text)  # JSON
+    computed_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+
+class BatchShard(Base):
+    """One shard of a nightly batch run; finished_at is its checkpoint (see batch.py)."""
+    __tablename__ = "batch_shards"
+
+    run_id: Mapped[str] = mapped_column(String(40), primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    first_user_id: Mapped[int] = mapped_column(Integer)
+    last_user_id: Mapped[int] = mapped_column(Integer)  # inclusive
+    users: Mapped[int] = mapped_column(Integer)  # when planned
+    finished_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True)
+    timings: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON: seconds per task
@@ -0,0 +1,106 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque token holding the sort key and id of the last row a
+client saw; the next page is "rows after that key" in the same order, so deep
+pages cost the same as the first and rows inserted meanwhile don't shift pages.
+List endpoints keep returning their usual body; the cursor for the next page
+goes in the ``X-Next-Cursor`` response header (absent on the last page).
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.sql import ColumnElement
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+DEFAULT_PAGE_SIZE = 50  # when a cursor is passed without a limit
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(list(values), default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parsers: Sequence[Callable[[Any], Any]]) -> list:
+    """Decode a cursor, converting each value with the matching parser (e.g. ``date.fromisoformat``)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError
+        return [None if v is None else parse(v) for parse, v in zip(parsers, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(columns: Sequence[ColumnElement], values: Sequence[Any], descending: bool = False) -> ColumnElement:
+    """Rows strictly after ``values`` in (columns...) order, all ascending or all descending.
+
+    Expanded to OR/AND rather than a row-value comparison so it works on every
+    backend; sort columns must not be NULL (coalesce them first). The redundant
+    bound on the leading column lets the planner seek into an index on it
+    instead of scanning from the start.
+    """
+    clauses = []
+    for i, (col, value) in enumerate(zip(columns, values)):
+        step = col < value if descending else col > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], step))
+    if len(columns) == 1:
+        return clauses[0]
+    lead = columns[0] <= values[0] if descending else columns[0] >= values[0]
+    return and_(lead, or_(*clauses))
+
+
+def page_size(limit: int | None, cursor: str | None) -> int | None:
+    """Page size for endpoints where pagination is opt-in: none unless a limit or cursor is given."""
+    if limit is None and cursor:
+        return DEFAULT_PAGE_SIZE
+    return limit
+
+
+def apply_keyset(stmt, columns: Sequence, cursor: str | None, limit: int | None,
+                 parsers: Sequence[Callable[[Any], Any]], descending: bool = True):
+    """Order ``stmt`` by ``columns`` and, with a cursor, start after the cursor row.
+
+    ``columns`` are the sort key(s) followed by the row id, all on the same table.
+    Fetches ``limit + 1`` rows so page_rows() can tell whether there is a next page.
+    The comparison uses the cursor row's stored sort values rather than the copy
+    in the cursor (SQLite timestamps don't round-trip exactly through the driver),
+    falling back to the copy if that row has since been deleted. The cursor row
+    is looked up under ``stmt``'s own filters, so a crafted cursor naming someone
+    else's row can't anchor on it (and leak its sort value through the page).
+    """
+    if cursor:
+        values = decode_cursor(cursor, parsers)
+        id_col, last_id = columns[-1], values[-1]
+        scope = [id_col == last_id]
+        if stmt.whereclause is not None:
+            scope.append(stmt.whereclause)
+        anchors = [
+            func.coalesce(select(col).where(*scope).correlate(None).scalar_subquery(), value)
+            for col, value in zip(columns[:-1], values[:-1])
+        ]
+        stmt = stmt.where(keyset_after(list(columns), [*anchors, last_id], descending))
+    stmt = stmt.order_by(*[col.desc() if descending else col for col in columns])
+    return stmt if limit is None else stmt.limit(limit + 1)
+
+
+def page_rows(response: Response, rows: list, limit: int | None, key: Callable[[Any], Sequence[Any]]) -> list:
+    """Trim rows fetched with ``LIMIT limit + 1`` to one page and set X-Next-Cursor if there are more."""
+    if limit is None or len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
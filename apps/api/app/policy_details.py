@@ -0,0 +1,163 @@
+"""
+Policy details stored as JSON on the policy row (``policies.details_json``).
+
+``policy_details`` (one row per field, dozens per policy) stays the source of
+truth and the write path: the CRUD routes and extraction keep adding
+PolicyDetail rows. A flush hook rebuilds ``details_json`` for every policy
+whose rows changed, in the same transaction, as a list of
+``{"id", "field_name", "field_value"}`` in id order. Readers get a policy's
+details from the policy row itself instead of loading its detail rows.
+
+Dual read: ``details_json`` is NULL for policies it hasn't been built for
+(rows written before migration 0008 ran, or by bulk statements, which bypass
+the hook). ``policy_details()`` falls back to the PolicyDetail rows for those,
+and ``preload_details()`` loads the fallback rows for a whole list of policies
+in one query, so mixed lists are still two queries at most.
+
+On Postgres the column is JSONB with a GIN index (jsonb_path_ops), so
+containment lookups such as ``details_json @> '[{"field_name": "flood_zone"}]'``
+are index searches rather than scans of policy_details.
+
+    python -m app.policy_details               # rebuild every policy
+    python -m app.policy_details --missing     # only policies with no JSON yet
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import event, inspect, select, update, bindparam
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .models import Policy, PolicyDetail
+
+_BATCH = 1000
+
+
+class DetailRow(NamedTuple):
+    """Read-only stand-in for a PolicyDetail, built from the JSON column."""
+    id: int
+    field_name: str
+    field_value: str
+
+
+def policy_details(policy: Policy) -> list:
+    """The policy's details, from the JSON column when built, else its PolicyDetail rows."""
+    if policy.details_json is not None:
+        return [DetailRow(d["id"], d["field_name"], d["field_value"]) for d in policy.details_json]
+    return sorted(policy.details, key=lambda d: d.id)
+
+
+def preload_details(session: Session, policies: Iterable[Policy]):
+    """Load the PolicyDetail rows of the policies without JSON in one query (no-op if all have it)."""
+    missing = {p.id: p for p in policies if p.details_json is None and "details" in inspect(p).unloaded}
+    if not missing:
+        return
+    rows = defaultdict(list)
+    for d in session.execute(
+        select(PolicyDetail).where(PolicyDetail.policy_id.in_(list(missing))).order_by(PolicyDetail.id)
+    ).scalars():
+        rows[d.policy_id].append(d)
+    for pid, policy in missing.items():
+        set_committed_value(policy, "details", rows.get(pid, []))
+
+
+def details_by_policy(db: Session, policy_ids: list[int]) -> dict[int, list]:
+    """Details for policies by id, without loading the Policy objects (two queries at most)."""
+    out = {pid: [] for pid in policy_ids}
+    if not policy_ids:
+        return out
+    missing = []
+    for pid, stored in db.execute(select(Policy.id, Policy.details_json).where(Policy.id.in_(policy_ids))):
+        if stored is None:
+            missing.append(pid)
+        else:
+            out[pid] = [DetailRow(d["id"], d["field_name"], d["field_value"]) for d in stored]
+    if missing:
+        for d in db.execute(
+            select(PolicyDetail).where(PolicyDetail.policy_id.in_(missing)).order_by(PolicyDetail.id)
+        ).scalars():
+            out[d.policy_id].append(d)
+    return out
+
+
+def build(conn: Connection, policy_ids: list[int]) -> dict[int, list[dict]]:
+    """The JSON value for each policy, from its PolicyDetail rows."""
+    out = {pid: [] for pid in policy_ids}
+    for pid, did, name, value in conn.execute(
+        select(PolicyDetail.policy_id, PolicyDetail.id, PolicyDetail.field_name, PolicyDetail.field_value)
+        .where(PolicyDetail.policy_id.in_(policy_ids))
+        .order_by(PolicyDetail.id)
+    ):
+        out[pid].append({"id": did, "field_name": name, "field_value": value})
+    return out
+
+
+def refresh(conn: Connection, policy_ids: Iterable[int]) -> dict[int, list[dict]]:
+    """Rebuild and store details_json for ``policy_ids``. Returns the new values."""
+    policy_ids = sorted(set(policy_ids))
+    stored = {}
+    stmt = update(Policy.__table__).where(Policy.__table__.c.id == bindparam("pid")).values(
+        details_json=bindparam("value", type_=Policy.__table__.c.details_json.type)
+    )
+    for i in range(0, len(policy_ids), _BATCH):
+        batch = build(conn, policy_ids[i:i + _BATCH])
+        conn.execute(stmt, [{"pid": pid, "value": value} for pid, value in batch.items()])
+        stored.update(batch)
+    return stored
+
+
+def rebuild(conn: Connection, only_missing: bool = False) -> int:
+    stmt = select(Policy.id)
+    if only_missing:
+        stmt = stmt.where(Policy.details_json.is_(None))
+    policy_ids = list(conn.execute(stmt).scalars())
+    refresh(conn, policy_ids)
+    return len(policy_ids)
+
+
+# ── Flush hook ───────────────────────────────────────
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_details_json(session: Session, flush_context):
+    # Runs after the flush's INSERTs, so new policies and details have ids;
+    # new/dirty/deleted still describe what this flush did.
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, PolicyDetail):
+            changed.add(obj.policy_id)
+            changed.update(inspect(obj).attrs.policy_id.history.deleted)  # moved to another policy
+        elif isinstance(obj, Policy) and obj in session.new:
+            changed.add(obj.id)
+    changed.discard(None)
+    if not changed:
+        return
+    stored = refresh(session.connection(), changed)
+    # Policies already loaded in this session see the new value without a reload
+    for pid, value in stored.items():
+        policy = session.identity_map.get(inspect(Policy).identity_key_from_primary_key([pid]))
+        if policy is not None:
+            set_committed_value(policy, "details_json", value)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.policy_details")
+    parser.add_argument("--missing", action="store_true", help="only policies whose JSON hasn't been built")
+    args = parser.parse_args(argv)
+
+    from .db import engine
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        count = rebuild(conn, only_missing=args.missing)
+    print(f"Rebuilt details_json for {count} polic{'y' if count == 1 else 'ies'} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
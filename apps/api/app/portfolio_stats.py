@@ -0,0 +1,249 @@
+"""
+Materialized per-user portfolio aggregates (``user_portfolio_stats``).
+
+Policy counts and totals, coverage by type, next renewal, overall score and
+unacknowledged delta count are read on every dashboard and agent page load.
+Instead of aggregating on each read, flush hooks on Policy, PolicyDelta and
+CoverageScore recompute the row for each user whose relevant columns changed,
+in the same transaction. Recomputing the user's row (a few indexed queries)
+rather than applying +/- deltas keeps it exact under edits and deletes.
+
+``next_renewal`` is "earliest renewal on or after the day it was computed", so
+it goes stale when that date passes; readers that use it call
+``refresh_stale()``, and ``python -m app.portfolio_stats --stale`` can run daily.
+Bulk statements bypass the hooks: run ``python -m app.portfolio_stats`` after
+them to rebuild.
+
+    python -m app.portfolio_stats               # rebuild every user
+    python -m app.portfolio_stats --user 12 40  # rebuild some users
+    python -m app.portfolio_stats --stale       # only rows whose next renewal has passed
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import event, select, func, case, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .data_version import _owner_id
+from .models import User, Policy
+from .models_features import PolicyDelta, CoverageScore, UserPortfolioStats
+
+logger = logging.getLogger(__name__)
+
+_INFO_KEY = "portfolio_stats_users"
+_BATCH = 1000
+
+# Columns whose change affects a user's stats; other edits (e.g. a nickname) don't trigger a recompute
+_WATCHED = {
+    Policy: ("user_id", "policy_type", "coverage_amount", "premium_amount", "renewal_date", "status"),
+    PolicyDelta: ("policy_id", "is_acknowledged"),
+    CoverageScore: ("user_id", "category", "score_total"),
+}
+
+
+def _empty(user_id: int) -> dict:
+    return {
+        "user_id": user_id, "policy_count": 0, "active_policy_count": 0, "total_coverage": 0,
+        "total_premium": 0, "coverage_by_type": {}, "next_renewal": None, "overall_score": None,
+        "unacknowledged_deltas": 0,
+    }
+
+
+def compute_stats(conn: Connection, user_ids: list[int], today: date | None = None) -> dict[int, dict]:
+    """Aggregate the stats for ``user_ids`` from the source tables (users with no data get zeros)."""
+    today = today or date.today()
+    stats = {uid: _empty(uid) for uid in user_ids}
+    if not user_ids:
+        return stats
+
+    # Same normalisation as coverage_taxonomy.get_coverage_summary: missing/blank type -> "other", lowercased
+    ptype = func.lower(func.coalesce(func.nullif(Policy.policy_type, ""), "other"))
+    by_type = conn.execute(
+        select(
+            Policy.user_id,
+            ptype.label("ptype"),
+            func.count(Policy.id),
+            func.sum(case((func.coalesce(Policy.status, "active") == "active", 1), else_=0)),
+            func.coalesce(func.sum(Policy.coverage_amount), 0),
+            func.coalesce(func.sum(Policy.premium_amount), 0),
+            func.min(case((Policy.renewal_date >= today, Policy.renewal_date))),
+        )
+        .where(Policy.user_id.in_(user_ids))
+        .group_by(Policy.user_id, ptype)
+    ).all()
+    for uid, type_name, count, active, coverage, premium, next_renewal in by_type:
+        s = stats[uid]
+        s["policy_count"] += count
+        s["active_policy_count"] += active
+        s["total_coverage"] += coverage
+        s["total_premium"] += premium
+        s["coverage_by_type"][type_name] = {"coverage": coverage, "premium": premium, "count": count}
+        if next_renewal is not None and (s["next_renewal"] is None or next_renewal < s["next_renewal"]):
+            s["next_renewal"] = next_renewal
+
+    for uid, score in conn.execute(
+        select(CoverageScore.user_id, func.max(CoverageScore.score_total))
+        .where(CoverageScore.user_id.in_(user_ids), CoverageScore.category == "overall")
+        .group_by(CoverageScore.user_id)
+    ):
+        stats[uid]["overall_score"] = score
+
+    for uid, count in conn.execute(
+        select(Policy.user_id, func.count(PolicyDelta.id))
+        .join(Policy, Policy.id == PolicyDelta.policy_id)
+        .where(Policy.user_id.in_(user_ids), PolicyDelta.is_acknowledged == False)  # noqa: E712
+        .group_by(Policy.user_id)
+    ):
+        stats[uid]["unacknowledged_deltas"] = count
+
+    return stats
+
+
+def _upsert(conn: Connection, rows: list[dict]):
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return
+    rows = [{**r, "coverage_by_type": json.dumps(r["coverage_by_type"], sort_keys=True)} for r in rows]
+    stmt = insert(UserPortfolioStats.__table__)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={c: stmt.excluded[c] for c in rows[0] if c != "user_id"} | {"updated_at": func.now()},
+        ),
+        rows,
+    )
+
+
+def refresh(conn: Connection, user_ids: Iterable[int], today: date | None = None):
+    """Recompute and store the stats rows for ``user_ids``."""
+    user_ids = sorted(set(user_ids))
+    for i in range(0, len(user_ids), _BATCH):
+        batch = compute_stats(conn, user_ids[i:i + _BATCH], today)
+        _upsert(conn, list(batch.values()))
+
+
+def stale_user_ids(conn: Connection, today: date | None = None, among=None) -> list[int]:
+    """Users whose stored next_renewal has passed (``among``: optional id list or subquery)."""
+    stmt = select(UserPortfolioStats.user_id).where(UserPortfolioStats.next_renewal < (today or date.today()))
+    if among is not None:
+        stmt = stmt.where(UserPortfolioStats.user_id.in_(among))
+    return list(conn.execute(stmt).scalars())
+
+
+def refresh_stale(db: Session, among=None, today: date | None = None) -> int:
+    """Recompute rows whose next_renewal has passed. Returns how many were refreshed.
+
+    Looks for stale rows through ``db`` but writes in a separate session, so it
+    also works from a GET request whose session reads from a replica.
+    """
+    from .db import SessionLocal
+
+    stale = stale_user_ids(db.connection(), today, among)
+    if stale:
+        with SessionLocal() as writer:
+            refresh(writer.connection(), stale, today)
+            writer.commit()
+    return len(stale)
+
+
+def get_stats(db: Session, user_id: int) -> dict:
+    """Stored stats for one user, as a dict (zeros if the user has no row yet)."""
+    row = db.execute(
+        select(UserPortfolioStats).where(UserPortfolioStats.user_id == user_id)
+    ).scalar_one_or_none()
+    if row is None:
+        return _empty(user_id)
+    return {
+        "user_id": row.user_id,
+        "policy_count": row.policy_count,
+        "active_policy_count": row.active_policy_count,
+        "total_coverage": row.total_coverage,
+        "total_premium": row.total_premium,
+        "coverage_by_type": json.loads(row.coverage_by_type or "{}"),
+        "next_renewal": row.next_renewal,
+        "overall_score": row.overall_score,
+        "unacknowledged_deltas": row.unacknowledged_deltas,
+    }
+
+
+def rebuild_all(conn: Connection, today: date | None = None) -> int:
+    user_ids = list(conn.execute(select(User.id)).scalars())
+    refresh(conn, user_ids, today)
+    return len(user_ids)
+
+
+# ── Flush hooks ──────────────────────────────────────
+
+
+def _touches_stats(obj) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _WATCHED[type(obj)])
+
+
+def _affected_users(session: Session, obj) -> set:
+    users = {_owner_id(session, obj)}
+    if isinstance(obj, CoverageScore):
+        history = inspect(obj).attrs.category.history
+        if "overall" not in (obj.category, *history.deleted):
+            return set()
+    # A policy or score moved between users: recompute the previous owner too
+    if isinstance(obj, (Policy, CoverageScore)):
+        users.update(inspect(obj).attrs.user_id.history.deleted)
+    return users
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_users(session: Session, flush_context, instances):
+    changed = session.info.setdefault(_INFO_KEY, set())
+    for obj in list(session.new) + list(session.deleted):
+        if type(obj) in _WATCHED:
+            changed.update(_affected_users(session, obj))
+    for obj in session.dirty:
+        if type(obj) in _WATCHED and _touches_stats(obj):
+            changed.update(_affected_users(session, obj))
+    changed.discard(None)
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_users(session: Session, flush_context):
+    changed = session.info.pop(_INFO_KEY, None)
+    if changed:
+        refresh(session.connection(), changed)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.portfolio_stats")
+    parser.add_argument("--user", type=int, nargs="+", help="only these user ids")
+    parser.add_argument("--stale", action="store_true", help="only rows whose next renewal has passed")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from .db import engine
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        if args.stale:
+            user_ids = stale_user_ids(conn)
+            refresh(conn, user_ids)
+            count = len(user_ids)
+        elif args.user:
+            refresh(conn, args.user)
+            count = len(args.user)
+        else:
+            count = rebuild_all(conn)
+    print(f"Refreshed portfolio stats for {count} user(s) in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
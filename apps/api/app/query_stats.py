@@ -0,0 +1,141 @@
+"""
+Per-request SQL statement counting.
+
+Cursor-execute events on every engine record into the ``QueryStats`` of the
+current request (a ContextVar set by the middleware in main.py, or by
+``capture_queries()`` in scripts and tests). Statements are grouped by shape —
+the SQL text with literals and expanded IN lists collapsed — so an N+1 shows up
+as one shape executed once per row.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+
+_IN_LIST_RE = re.compile(r"\((?:\s*(?:\?|%\([^)]*\)s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\([^)]*\)s|\$\d+|:\w+)\s*\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    shape = _IN_LIST_RE.sub("(?…)", statement)
+    shape = _LITERAL_RE.sub("?", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    def __init__(self, parent: "QueryStats | None" = None):
+        self.parent = parent  # an enclosing capture (e.g. a test around a request) sees nested statements too
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed_ms: float):
+        shape = statement_shape(statement)
+        stats = self
+        while stats is not None:
+            with stats._lock:
+                stats.count += 1
+                stats.total_ms += elapsed_ms
+                stats.shapes[shape] += 1
+            stats = stats.parent
+
+    def repeated(self, threshold: int = 2) -> list[tuple[str, int]]:
+        """Shapes executed at least ``threshold`` times, most frequent first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def headers(self) -> dict[str, str]:
+        top = self.shapes.most_common(1)
+        return {
+            "X-DB-Query-Count": str(self.count),
+            "X-DB-Query-Ms": f"{self.total_ms:.1f}",
+            "X-DB-Query-Max-Repeat": str(top[0][1] if top else 0),
+        }
+
+
+@contextmanager
+def capture_queries():
+    """Count the statements run inside the block (on any engine, in this context)."""
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("query_stats_start")
+    if stats is None or not starts:
+        return
+    stats.record(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get("query_stats_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def log_repeated(stats: QueryStats, label: str, threshold: int):
+    repeated = stats.repeated(threshold)
+    if repeated:
+        shape, n = repeated[0]
+        logger.warning(
+            "%s: %d queries (%.1f ms); statement repeated %dx, likely N+1: %.200s",
+            label, stats.count, stats.total_ms, n, shape,
+        )
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: one QueryStats per HTTP request.
+
+    Logs requests that repeat a statement shape ``repeat_threshold`` times and,
+    with ``headers`` on (debug only), adds X-DB-Query-Count / -Ms / -Max-Repeat.
+    Pure ASGI rather than BaseHTTPMiddleware so streaming responses pass through.
+    """
+
+    def __init__(self, app, headers: bool = False, repeat_threshold: int = 0):
+        self.app = app
+        self.headers = headers
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = QueryStats(parent=_current.get())
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if self.headers and message["type"] == "http.response.start":
+                extra = [(k.lower().encode(), v.encode()) for k, v in stats.headers().items()]
+                message["headers"] = list(message.get("headers", [])) + extra
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            if self.repeat_threshold:
+                log_repeated(stats, f"{scope['method']} {scope['path']}", self.repeat_threshold)
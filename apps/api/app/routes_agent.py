@@ -1,14 +1,21 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import select, func, distinct
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from .auth import get_current_user
+from .cache import TTLCache
+from .config import settings
 from .coverage_taxonomy import analyze_coverage_gaps, get_coverage_summary
+from .data_version import get_data_version
 from .db import get_db
-from .models import User, Policy, Contact, PolicyDetail, Exposure
-from .models_features import PolicyShare, CoverageScore
+from .models import User, Policy
+from .models_features import PolicyShare, CoverageScore, UserPortfolioStats
+from .pagination import MAX_PAGE_SIZE, decode_cursor, keyset_after, page_rows
+from .policy_details import policy_details, preload_details
+from .portfolio_stats import refresh_stale
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
@@ -43,66 +50,109 @@ def _policy_to_dict(p: Policy, contacts: list | None = None, details: list | Non
     return d
 
 
-def _get_client_ids(db: Session, agent_email: str) -> list[int]:
-    """Get distinct owner_ids who shared with this agent as broker."""
-    rows = db.execute(
-        select(distinct(PolicyShare.owner_id)).where(
-            PolicyShare.shared_with_email == agent_email,
-            PolicyShare.role_label == "broker",
-            PolicyShare.accepted == True,  # noqa: E712
+def _client_ids_query(agent_email: str):
+    """Distinct owner_ids who shared with this agent as broker (a select, for use in IN)."""
+    return select(distinct(PolicyShare.owner_id)).where(
+        PolicyShare.shared_with_email == agent_email,
+        PolicyShare.role_label == "broker",
+        PolicyShare.accepted == True,  # noqa: E712
+    )
+
+
+_CLIENT_CURSOR_PARSERS = {"email": str, "policy_count": int, "protection_score": int, "next_renewal": date.fromisoformat}
+# NULLs can't take part in keyset comparisons, so missing values sort as sentinels
+_NO_SCORE = -1
+_NO_RENEWAL = date(9999, 12, 31)
+
+
+def _client_rows(agent_email: str):
+    """One row per client with policy count, overall score and next renewal, as a subquery."""
+    return (
+        select(
+            User.id,
+            User.email,
+            func.coalesce(UserPortfolioStats.policy_count, 0).label("policy_count"),
+            func.coalesce(UserPortfolioStats.overall_score, _NO_SCORE).label("protection_score"),
+            func.coalesce(UserPortfolioStats.next_renewal, _NO_RENEWAL).label("next_renewal"),
         )
-    ).scalars().all()
-    return list(rows)
+        .outerjoin(UserPortfolioStats, UserPortfolioStats.user_id == User.id)
+        .where(User.id.in_(_client_ids_query(agent_email)))
+        .subquery()
+    )
 
 
 @router.get("/clients")
-def list_clients(agent: User = Depends(require_agent), db: Session = Depends(get_db)):
-    client_ids = _get_client_ids(db, agent.email)
-    if not client_ids:
-        return []
-
-    clients = []
-    for cid in client_ids:
-        user = db.get(User, cid)
-        if not user:
-            continue
-        policy_count = db.execute(
-            select(func.count(Policy.id)).where(Policy.user_id == cid)
-        ).scalar() or 0
-
-        # Get overall score
-        score_row = db.execute(
-            select(CoverageScore.score_total).where(
-                CoverageScore.user_id == cid,
-                CoverageScore.category == "overall",
-            )
-        ).scalar()
-
-        # Next renewal
-        today = datetime.now().date()
-        next_renewal = db.execute(
-            select(func.min(Policy.renewal_date)).where(
-                Policy.user_id == cid,
-                Policy.renewal_date >= today,
-            )
-        ).scalar()
-
-        clients.append({
-            "id": user.id,
-            "email": user.email,
-            "policy_count": policy_count,
-            "protection_score": score_row,
-            "next_renewal": str(next_renewal) if next_renewal else None,
-        })
-
-    return clients
+def list_clients(
+    response: Response,
+    q: str | None = Query(default=None, description="Filter by client email (substring)"),
+    min_score: int | None = Query(default=None, ge=0, le=100),
+    max_score: int | None = Query(default=None, ge=0, le=100),
+    renewal_within_days: int | None = Query(default=None, ge=0),
+    sort: Literal["email", "policy_count", "protection_score", "next_renewal"] = "email",
+    order: Literal["asc", "desc"] = "asc",
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    agent: User = Depends(require_agent),
+    db: Session = Depends(get_db),
+):
+    """The agent's book of business, read from user_portfolio_stats in one query.
+
+    Without ``limit`` every client is returned (the original behaviour); with it,
+    pages are keyset-paginated and X-Next-Cursor carries the next page's cursor.
+    """
+    today = datetime.now().date()
+    refresh_stale(db, among=_client_ids_query(agent.email), today=today)
+
+    rows = _client_rows(agent.email)
+    sort_col = rows.c[sort]
+    descending = order == "desc"
+
+    stmt = select(rows)
+    if q:
+        stmt = stmt.where(rows.c.email.ilike(f"%{q}%"))
+    if min_score is not None:
+        stmt = stmt.where(rows.c.protection_score >= min_score)
+    if max_score is not None:
+        stmt = stmt.where(rows.c.protection_score.between(0, max_score))
+    if renewal_within_days is not None:
+        stmt = stmt.where(rows.c.next_renewal <= today + timedelta(days=renewal_within_days))
+    if cursor:
+        after = decode_cursor(cursor, [_CLIENT_CURSOR_PARSERS[sort], int])
+        stmt = stmt.where(keyset_after([sort_col, rows.c.id], after, descending))
+    if descending:
+        stmt = stmt.order_by(sort_col.desc(), rows.c.id.desc())
+    else:
+        stmt = stmt.order_by(sort_col, rows.c.id)
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    result = page_rows(response, db.execute(stmt).all(), limit, key=lambda r: (getattr(r, sort), r.id))
+    return [
+        {
+            "id": r.id,
+            "email": r.email,
+            "policy_count": r.policy_count,
+            "protection_score": None if r.protection_score == _NO_SCORE else r.protection_score,
+            "next_renewal": None if r.next_renewal == _NO_RENEWAL else str(r.next_renewal),
+        }
+        for r in result
+    ]
 
 
 @router.get("/overview")
 def agent_overview(agent: User = Depends(require_agent), db: Session = Depends(get_db)):
-    client_ids = _get_client_ids(db, agent.email)
+    clients = _client_ids_query(agent.email)
+    total_clients, total_policies, score_sum, score_count = db.execute(
+        select(
+            func.count(User.id),
+            func.coalesce(func.sum(UserPortfolioStats.policy_count), 0),
+            func.sum(UserPortfolioStats.overall_score),
+            func.count(UserPortfolioStats.overall_score),
+        )
+        .outerjoin(UserPortfolioStats, UserPortfolioStats.user_id == User.id)
+        .where(User.id.in_(clients))
+    ).one()
 
-    total_clients = len(client_ids)
     if total_clients == 0:
         return {
             "total_clients": 0,
@@ -111,25 +161,15 @@ def agent_overview(agent: User = Depends(require_agent), db: Session = Depends(g
             "upcoming_renewals": 0,
         }
 
-    total_policies = db.execute(
-        select(func.count(Policy.id)).where(Policy.user_id.in_(client_ids))
-    ).scalar() or 0
-
     # Average protection score across clients
-    scores = db.execute(
-        select(CoverageScore.score_total).where(
-            CoverageScore.user_id.in_(client_ids),
-            CoverageScore.category == "overall",
-        )
-    ).scalars().all()
-    avg_score = round(sum(scores) / len(scores)) if scores else None
+    avg_score = round(score_sum / score_count) if score_count else None
 
     # Upcoming renewals (next 60 days)
     today = datetime.now().date()
     cutoff = today + timedelta(days=60)
     upcoming = db.execute(
         select(func.count(Policy.id)).where(
-            Policy.user_id.in_(client_ids),
+            Policy.user_id.in_(clients),
             Policy.renewal_date >= today,
             Policy.renewal_date <= cutoff,
         )
@@ -143,35 +183,39 @@ def agent_overview(agent: User = Depends(require_agent), db: Session = Depends(g
     }
 
 
-@router.get("/clients/{client_id}/summary")
-def client_summary(client_id: int, agent: User = Depends(require_agent), db: Session = Depends(get_db)):
-    # Verify agent has access to this client
-    client_ids = _get_client_ids(db, agent.email)
-    if client_id not in client_ids:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No access to this client")
+# Per-worker; keyed on the client's data version, so edits show up on the next request
+summary_cache = TTLCache(
+    max_entries=settings.agent_summary_cache_max_entries,
+    ttl_seconds=settings.agent_summary_cache_ttl_seconds,
+)
 
-    client = db.get(User, client_id)
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
 
-    # Get all policies for the client
+def _is_client(db: Session, agent_email: str, client_id: int) -> bool:
+    return db.execute(
+        select(PolicyShare.id).where(
+            PolicyShare.shared_with_email == agent_email,
+            PolicyShare.role_label == "broker",
+            PolicyShare.accepted == True,  # noqa: E712
+            PolicyShare.owner_id == client_id,
+        ).limit(1)
+    ).first() is not None
+
+
+def _build_client_summary(db: Session, client_id: int, today: date) -> dict:
+    """Policies, gaps, coverage summary and renewals for a client (everything but the score)."""
     policies = db.execute(
-        select(Policy).where(Policy.user_id == client_id)
+        select(Policy)
+        .where(Policy.user_id == client_id)
+        .options(selectinload(Policy.contacts), selectinload(Policy.exposure))
     ).scalars().all()
+    preload_details(db, policies)
 
     # Build full policy dicts for gap analysis
     policy_dicts = []
     policy_list = []
+    renewals = []
     for p in policies:
-        contacts = db.execute(select(Contact).where(Contact.policy_id == p.id)).scalars().all()
-        details = db.execute(select(PolicyDetail).where(PolicyDetail.policy_id == p.id)).scalars().all()
-        d = _policy_to_dict(p, contacts, details)
-        policy_dicts.append(d)
-        exposure_name = None
-        if p.exposure_id:
-            exp = db.get(Exposure, p.exposure_id)
-            if exp:
-                exposure_name = exp.name
+        policy_dicts.append(_policy_to_dict(p, p.contacts, policy_details(p)))
         policy_list.append({
             "id": p.id,
             "carrier": p.carrier,
@@ -183,11 +227,38 @@ def client_summary(client_id: int, agent: User = Depends(require_agent), db: Ses
             "premium_amount": p.premium_amount,
             "renewal_date": str(p.renewal_date) if p.renewal_date else None,
             "exposure_id": p.exposure_id,
-            "exposure_name": exposure_name,
+            "exposure_name": p.exposure.name if p.exposure else None,
             "status": p.status or "active",
         })
+        if p.renewal_date and p.renewal_date >= today:
+            renewals.append({
+                "policy_id": p.id,
+                "carrier": p.carrier,
+                "policy_type": p.policy_type,
+                "renewal_date": str(p.renewal_date),
+            })
+    renewals.sort(key=lambda r: r["renewal_date"])
+
+    return {
+        "policies": policy_list,
+        "gaps": analyze_coverage_gaps(policy_dicts),
+        "summary": get_coverage_summary(policy_dicts),
+        "upcoming_renewals": renewals,
+    }
+
+
+@router.get("/clients/{client_id}/summary")
+def client_summary(client_id: int, agent: User = Depends(require_agent), db: Session = Depends(get_db)):
+    # Verify agent has access to this client
+    if not _is_client(db, agent.email, client_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No access to this client")
 
-    # Coverage score
+    client = db.get(User, client_id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    # Scores are rewritten on every recalculation without bumping the data
+    # version, so the score is read fresh rather than cached
     score_row = db.execute(
         select(CoverageScore.score_total).where(
             CoverageScore.user_id == client_id,
@@ -195,28 +266,15 @@ def client_summary(client_id: int, agent: User = Depends(require_agent), db: Ses
         )
     ).scalar()
 
-    # Gap analysis
-    gaps = analyze_coverage_gaps(policy_dicts)
-    summary = get_coverage_summary(policy_dicts)
-
-    # Upcoming renewals
     today = datetime.now().date()
-    renewals = []
-    for p in policies:
-        if p.renewal_date and p.renewal_date >= today:
-            renewals.append({
-                "policy_id": p.id,
-                "carrier": p.carrier,
-                "policy_type": p.policy_type,
-                "renewal_date": str(p.renewal_date),
-            })
-    renewals.sort(key=lambda r: r["renewal_date"])
+    key = (client_id, get_data_version(db, client_id), today)
+    cached = summary_cache.get(key)
+    if cached is None:
+        cached = _build_client_summary(db, client_id, today)
+        summary_cache.put(key, cached)
 
     return {
         "client": {"id": client.id, "email": client.email},
         "protection_score": score_row,
-        "policies": policy_list,
-        "gaps": gaps,
-        "summary": summary,
-        "upcoming_renewals": renewals,
+        **cached,
     }
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 
@@ -6,6 +8,7 @@ from .auth import get_current_user
 from .db import get_db
 from .models import User
 from .models_features import AuditLog
+from .pagination import NEXT_CURSOR_HEADER, apply_keyset, page_rows
 
 router = APIRouter(prefix="/audit", tags=["audit"])
 
@@ -17,23 +20,26 @@ def health():
 
 @router.get("")
 def list_audit(
+    response: Response,
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    total = db.execute(
-        select(func.count(AuditLog.id)).where(AuditLog.user_id == user.id)
-    ).scalar() or 0
-
-    offset = (page - 1) * limit
-    rows = db.execute(
-        select(AuditLog)
-        .where(AuditLog.user_id == user.id)
-        .order_by(AuditLog.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-    ).scalars().all()
+    """Newest first. Pass ``cursor`` (from ``next_cursor``) instead of ``page`` to skip the
+    OFFSET scan on deep pages; cursor pages don't count ``total``."""
+    stmt = select(AuditLog).where(AuditLog.user_id == user.id)
+    if cursor:
+        total = None
+    else:
+        total = db.execute(
+            select(func.count(AuditLog.id)).where(AuditLog.user_id == user.id)
+        ).scalar() or 0
+        stmt = stmt.offset((page - 1) * limit)
+
+    stmt = apply_keyset(stmt, [AuditLog.created_at, AuditLog.id], cursor, limit, [datetime.fromisoformat, int])
+    rows = page_rows(response, db.execute(stmt).scalars().all(), limit, key=lambda r: (r.created_at, r.id))
 
     return {
         "items": [
@@ -51,4 +57,5 @@ def list_audit(
         "total": total,
         "page": page,
         "limit": limit,
+        "next_cursor": response.headers.get(NEXT_CURSOR_HEADER),
     }
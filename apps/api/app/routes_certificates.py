@@ -2,7 +2,7 @@ import io
 from datetime import date, timedelta
 
 import pdfplumber
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
 from sqlalchemy import select, delete
 from sqlalchemy.orm import Session
 
@@ -13,6 +13,7 @@ from .models import Policy, User
 from .models_features import Certificate, CertificateReminder
 from .schemas import CertificateCreate, CertificateUpdate
 from .audit_helper import log_action
+from .pagination import MAX_PAGE_SIZE, apply_keyset, page_rows, page_size
 
 router = APIRouter(prefix="/certificates", tags=["certificates"])
 
@@ -29,17 +30,22 @@ def ensure_certificate_reminders(certificate_id: int, expiration_date: date | No
             db.add(CertificateReminder(certificate_id=certificate_id, remind_at=remind_at))
 
 
-def _update_status(cert: Certificate, today: date):
-    """Auto-update status based on expiration date."""
-    if not cert.expiration_date:
-        return
-    days_until = (cert.expiration_date - today).days
+def certificate_status(expiration_date: date | None, status: str, today: date) -> str:
+    """Status as of ``today``: expired/expiring follow the expiration date, anything else is as stored.
+
+    Reads derive it rather than writing it back; the nightly batch (batch.py)
+    brings the stored column up to date.
+    """
+    if not expiration_date:
+        return status
+    days_until = (expiration_date - today).days
     if days_until < 0:
-        cert.status = "expired"
-    elif days_until <= 30:
-        cert.status = "expiring"
-    elif cert.status in ("expired", "expiring"):
-        cert.status = "active"
+        return "expired"
+    if days_until <= 30:
+        return "expiring"
+    if status in ("expired", "expiring"):
+        return "active"
+    return status
 
 
 def _enrich(cert: Certificate, db: Session, policy_map: dict[int, Policy] | None = None) -> dict:
@@ -68,7 +74,7 @@ def _enrich(cert: Certificate, db: Session, policy_map: dict[int, Policy] | None
         "minimum_coverage": cert.minimum_coverage,
         "effective_date": str(cert.effective_date) if cert.effective_date else None,
         "expiration_date": str(cert.expiration_date) if cert.expiration_date else None,
-        "status": cert.status,
+        "status": certificate_status(cert.expiration_date, cert.status, date.today()),
         "notes": cert.notes,
         "created_at": str(cert.created_at),
         "policy_carrier": policy_carrier,
@@ -89,17 +95,23 @@ def create_certificate(payload: CertificateCreate, db: Session = Depends(get_db)
 
 
 @router.get("")
-def list_certificates(direction: str | None = None, policy_id: int | None = None, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def list_certificates(
+    response: Response,
+    direction: str | None = None,
+    policy_id: int | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    limit = page_size(limit, cursor)
     q = select(Certificate).where(Certificate.user_id == user.id)
     if direction:
         q = q.where(Certificate.direction == direction)
     if policy_id is not None:
         q = q.where(Certificate.policy_id == policy_id)
-    certs = db.execute(q.order_by(Certificate.id.desc())).scalars().all()
-    today = date.today()
-    for c in certs:
-        _update_status(c, today)
-    db.commit()
+    q = apply_keyset(q, [Certificate.id], cursor, limit, [int])
+    certs = page_rows(response, db.execute(q).scalars().all(), limit, key=lambda c: (c.id,))
 
     # Batch-load linked policies to avoid N+1
     linked_policy_ids = {c.policy_id for c in certs if c.policy_id}
@@ -1,11 +1,14 @@
 import io
 import json
 import logging
+import re
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Literal
 
 import openai
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import select
@@ -15,16 +18,20 @@ from .auth import get_current_user
 from .config import settings
 from .coverage_taxonomy import analyze_coverage_gaps, get_coverage_summary
 from .db import get_db
+from .gap_cache import cached, gap_key
 from .models import User, Policy, Contact, PolicyDetail, CoverageItem, Exposure
 from .models_chat import Conversation, ChatMessage
 from .models_documents import Document
 from .models_features import Claim
 from .models_profile import UserProfile
+from .pagination import MAX_PAGE_SIZE, apply_keyset, page_rows, page_size
+from .policy_details import policy_details, preload_details
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 logger = logging.getLogger(__name__)
 
+CHAT_MODEL = "gpt-4o"
 MAX_HISTORY_MESSAGES = 20
 MAX_DOC_CHARS = 15_000
 MAX_DOCS = 5
@@ -55,7 +62,7 @@ def _policy_to_dict(p: Policy) -> dict:
         ],
         "details": [
             {"field_name": d.field_name, "field_value": d.field_value}
-            for d in (p.details or [])
+            for d in policy_details(p)
         ],
         "coverage_items": [
             {"item_type": ci.item_type, "description": ci.description, "limit": ci.limit}
@@ -157,7 +164,12 @@ def _cache_document_text(doc: Document, db: Session) -> str | None:
 
 
 def _build_chat_context(user: User, db: Session) -> str:
-    """Assemble full context block from user's data for the system prompt."""
+    """Assemble full context block from user's data for the system prompt.
+
+    Sections run from least to most likely to change (profile, document text,
+    policies, claims, then the derived summary and gaps) so that an edit only
+    invalidates the tail of the provider's cached prompt prefix.
+    """
     sections = []
 
     # 1. User profile
@@ -189,18 +201,42 @@ def _build_chat_context(user: User, db: Session) -> str:
         if flags:
             sections.append(f"- Profile flags: {', '.join(flags)}")
 
-    # 2. All policies with eager-loaded relationships
+    # 2. All policies with eager-loaded relationships (stable order)
     policies = db.execute(
         select(Policy)
         .where(Policy.user_id == user.id)
         .options(
             selectinload(Policy.contacts),
-            selectinload(Policy.details),
             selectinload(Policy.coverage_items),
             selectinload(Policy.exposure),
         )
+        .order_by(Policy.id)
     ).scalars().all()
+    preload_details(db, policies)
+
+    # 3. Document text (cached, lazy-extracted)
+    if policies:
+        docs = db.execute(
+            select(Document)
+            .where(Document.policy_id.in_([p.id for p in policies]))
+            .order_by(Document.created_at.desc())
+            .limit(MAX_DOCS)
+        ).scalars().all()
+
+        doc_texts = []
+        for doc in docs:
+            text = _cache_document_text(doc, db)
+            if text:
+                truncated = text[:MAX_DOC_CHARS]
+                policy = next((p for p in policies if p.id == doc.policy_id), None)
+                carrier = policy.carrier if policy else "Unknown"
+                doc_texts.append(f"### Document: {doc.filename} (Policy: {carrier})\n{truncated}")
+
+        if doc_texts:
+            sections.append("\n## POLICY DOCUMENT TEXT")
+            sections.extend(doc_texts)
 
+    # 4. Policies
     policy_dicts = [_policy_to_dict(p) for p in policies]
 
     sections.append("\n## INSURANCE POLICIES")
@@ -211,10 +247,30 @@ def _build_chat_context(user: User, db: Session) -> str:
     else:
         sections.append("No policies on file.")
 
-    # 3. Coverage summary
+    # 5. Claims history
+    claims = db.execute(
+        select(Claim).where(
+            Claim.policy_id.in_([p.id for p in policies])
+        ).order_by(Claim.id)
+    ).scalars().all() if policies else []
+
+    if claims:
+        sections.append("\n## CLAIMS HISTORY")
+        for c in claims:
+            policy = next((p for p in policies if p.id == c.policy_id), None)
+            carrier = policy.carrier if policy else "Unknown"
+            sections.append(f"- Claim #{c.claim_number} ({carrier})")
+            sections.append(f"  Status: {c.status} | Filed: {c.date_filed}")
+            if c.amount_claimed:
+                sections.append(f"  Amount claimed: {_format_money(c.amount_claimed)}")
+            if c.amount_paid:
+                sections.append(f"  Amount paid: {_format_money(c.amount_paid)}")
+            sections.append(f"  Description: {c.description}")
+
+    # 6. Coverage summary
     if policy_dicts:
         summary = get_coverage_summary(policy_dicts)
-        sections.append("## COVERAGE SUMMARY")
+        sections.append("\n## COVERAGE SUMMARY")
         sections.append(f"- Total policies: {summary.get('total_policies', 0)}")
         sections.append(f"- Policy types: {', '.join(summary.get('policy_types', []))}")
         sections.append(f"- Total coverage: {_format_money(summary.get('total_coverage'))}")
@@ -226,7 +282,7 @@ def _build_chat_context(user: User, db: Session) -> str:
         if missing:
             sections.append(f"- Missing categories: {', '.join(missing)}")
 
-    # 4. Gap analysis
+    # 7. Gap analysis
     if policy_dicts:
         user_context = None
         if profile:
@@ -238,7 +294,9 @@ def _build_chat_context(user: User, db: Session) -> str:
                 "owns_business": profile.owns_business,
                 "high_net_worth": profile.high_net_worth,
             }
-        gaps = analyze_coverage_gaps(policy_dicts, user_context)
+        today = datetime.now().date()
+        gaps = cached(gap_key(db, user.id, today, "chat"),
+                      lambda: analyze_coverage_gaps(policy_dicts, user_context, today))
         if gaps:
             sections.append("\n## COVERAGE GAPS")
             for g in gaps:
@@ -247,52 +305,10 @@ def _build_chat_context(user: User, db: Session) -> str:
                     if g.get("recommendation"):
                         sections.append(f"  Recommendation: {g['recommendation']}")
 
-    # 5. Claims history
-    claims = db.execute(
-        select(Claim).where(
-            Claim.policy_id.in_([p.id for p in policies])
-        )
-    ).scalars().all() if policies else []
-
-    if claims:
-        sections.append("\n## CLAIMS HISTORY")
-        for c in claims:
-            policy = next((p for p in policies if p.id == c.policy_id), None)
-            carrier = policy.carrier if policy else "Unknown"
-            sections.append(f"- Claim #{c.claim_number} ({carrier})")
-            sections.append(f"  Status: {c.status} | Filed: {c.date_filed}")
-            if c.amount_claimed:
-                sections.append(f"  Amount claimed: {_format_money(c.amount_claimed)}")
-            if c.amount_paid:
-                sections.append(f"  Amount paid: {_format_money(c.amount_paid)}")
-            sections.append(f"  Description: {c.description}")
-
-    # 6. Document text (cached, lazy-extracted)
-    if policies:
-        docs = db.execute(
-            select(Document)
-            .where(Document.policy_id.in_([p.id for p in policies]))
-            .order_by(Document.created_at.desc())
-            .limit(MAX_DOCS)
-        ).scalars().all()
-
-        doc_texts = []
-        for doc in docs:
-            text = _cache_document_text(doc, db)
-            if text:
-                truncated = text[:MAX_DOC_CHARS]
-                policy = next((p for p in policies if p.id == doc.policy_id), None)
-                carrier = policy.carrier if policy else "Unknown"
-                doc_texts.append(f"### Document: {doc.filename} (Policy: {carrier})\n{truncated}")
-
-        if doc_texts:
-            sections.append("\n## POLICY DOCUMENT TEXT")
-            sections.extend(doc_texts)
-
     return "\n".join(sections)
 
 
-SYSTEM_PROMPT_TEMPLATE = """You are Covrabl's friendly insurance assistant. Talk like a knowledgeable friend, not a robot.
+_ASSISTANT_INSTRUCTIONS = """You are Covrabl's friendly insurance assistant. Talk like a knowledgeable friend, not a robot.
 
 TONE:
 - Warm, conversational, and brief — like texting with a helpful friend who knows insurance
@@ -309,9 +325,45 @@ RESPONSE RULES:
 - Never dump all policy details. Keep it scannable
 - If you don't know, say so briefly and suggest who to call
 - You're NOT a licensed agent — for changes, point them to their agent/broker
-- Today's date: {today}
-
-{context}"""
+"""
+
+# The prompt is laid out from most to least stable so provider-side prefix
+# caching can reuse as much of it as possible between turns and users:
+#   1. static instructions (identical for every user)
+#   2. the user's data (changes only when they edit something)
+#   3. today's date, then the conversation history
+# Anything volatile placed earlier would invalidate everything after it.
+
+TOOLS_INSTRUCTIONS = _ASSISTANT_INSTRUCTIONS + """
+DATA ACCESS:
+- You do NOT have the user's full data up front. Use the tools to look things up
+- Use get_policy for limits, deductibles, premiums, contacts and coverage details
+- Use search_documents for policy wording ("is X covered/excluded?")
+- Use list_gaps for "what am I missing?" questions and get_claims for claims history
+- Only call the tools you need; many questions need just one
+"""
+
+POLICY_INDEX_TEMPLATE = """## POLICY INDEX
+{policy_index}"""
+
+DATE_NOTE_TEMPLATE = "Today's date: {today}"
+
+
+def _build_prompt_messages(mode: str, user: User, db: Session, today: str, history: list[dict]) -> list[dict]:
+    """System layers followed by the conversation history, ready for the API."""
+    if mode == "tools":
+        # Small prompt: policy index only, details are fetched through tools
+        from .chat_tools import build_policy_index
+        instructions = TOOLS_INSTRUCTIONS
+        user_data = POLICY_INDEX_TEMPLATE.format(policy_index=build_policy_index(user, db))
+    else:
+        instructions = _ASSISTANT_INSTRUCTIONS
+        user_data = _build_chat_context(user, db)
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "system", "content": user_data},
+        {"role": "system", "content": DATE_NOTE_TEMPLATE.format(today=today)},
+    ] + history
 
 
 # ── Request/Response Models ──────────────────────────
@@ -320,6 +372,152 @@ RESPONSE RULES:
 class ChatSendRequest(BaseModel):
     message: str
     conversation_id: int | None = None
+    mode: Literal["context", "tools"] | None = None  # defaults to settings.chat_mode
+
+
+# ── Streaming ────────────────────────────────────────
+
+
+_cache_totals = {"turns": 0, "prompt_tokens": 0, "cached_tokens": 0}
+_cache_totals_lock = threading.Lock()
+
+
+def _add_usage(usage: dict | None, chunk_usage) -> None:
+    """Fold the usage block from a stream's final chunk into ``usage``."""
+    if usage is None or chunk_usage is None:
+        return
+    details = getattr(chunk_usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        cached = details.get("cached_tokens") or 0
+    else:
+        cached = getattr(details, "cached_tokens", 0) or 0
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + (chunk_usage.prompt_tokens or 0)
+    usage["cached_tokens"] = usage.get("cached_tokens", 0) + cached
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + (chunk_usage.completion_tokens or 0)
+
+
+def _log_prompt_cache(conv_id: int, mode: str, usage: dict) -> None:
+    """Log cached prompt tokens for one turn plus the running hit rate for this process."""
+    prompt = usage.get("prompt_tokens", 0)
+    if not prompt:
+        return
+    cached = usage.get("cached_tokens", 0)
+    with _cache_totals_lock:
+        _cache_totals["turns"] += 1
+        _cache_totals["prompt_tokens"] += prompt
+        _cache_totals["cached_tokens"] += cached
+        overall = _cache_totals["cached_tokens"] / _cache_totals["prompt_tokens"]
+    logger.info(
+        "Chat usage conv=%s mode=%s prompt=%d cached=%d (%.0f%%) completion=%d | process cache rate %.0f%%",
+        conv_id, mode, prompt, cached, 100 * cached / prompt, usage.get("completion_tokens", 0), 100 * overall,
+    )
+
+
+def _stream_completion(client: openai.OpenAI, messages: list[dict], usage: dict | None = None):
+    """Stream a plain completion, yielding text chunks. Token usage is added to ``usage``."""
+    stream = client.chat.completions.create(
+        model=CHAT_MODEL,
+        max_tokens=2048,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    for chunk in stream:
+        _add_usage(usage, chunk.usage)
+        delta = chunk.choices[0].delta if chunk.choices else None
+        if delta and delta.content:
+            yield delta.content
+
+
+def _stream_with_tools(client: openai.OpenAI, messages: list[dict], user_id: int, usage: dict | None = None):
+    """Run the tool-calling loop, yielding answer text as it streams.
+
+    Each round streams the model's reply; tool calls are accumulated from the
+    deltas, executed against a fresh session, and fed back for the next round.
+    The final round disables tools so the model always ends with an answer.
+    Token usage is summed over all rounds into ``usage``.
+    """
+    from .chat_tools import TOOL_SPECS, MAX_TOOL_ROUNDS, run_tool
+    from .db import SessionLocal
+
+    tool_db = SessionLocal()
+    try:
+        user = tool_db.get(User, user_id)
+        for round_no in range(MAX_TOOL_ROUNDS + 1):
+            stream = client.chat.completions.create(
+                model=CHAT_MODEL,
+                max_tokens=2048,
+                messages=messages,
+                tools=TOOL_SPECS,
+                tool_choice="auto" if round_no < MAX_TOOL_ROUNDS else "none",
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            calls: dict[int, dict] = {}
+            for chunk in stream:
+                _add_usage(usage, chunk.usage)
+                delta = chunk.choices[0].delta if chunk.choices else None
+                if not delta:
+                    continue
+                if delta.content:
+                    yield delta.content
+                for tc in delta.tool_calls or []:
+                    call = calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+                    if tc.id:
+                        call["id"] = tc.id
+                    if tc.function and tc.function.name:
+                        call["name"] += tc.function.name
+                    if tc.function and tc.function.arguments:
+                        call["arguments"] += tc.function.arguments
+
+            if not calls:
+                return
+
+            ordered = [calls[i] for i in sorted(calls)]
+            messages.append({
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                    for c in ordered
+                ],
+            })
+            for c in ordered:
+                logger.debug("Chat tool call: %s(%s)", c["name"], c["arguments"])
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": c["id"],
+                    "content": run_tool(c["name"], c["arguments"], user, tool_db),
+                })
+    finally:
+        tool_db.close()
+
+
+def _save_assistant_message(conv_id: int, content: str):
+    from .db import SessionLocal
+    save_db = SessionLocal()
+    try:
+        assistant_msg = ChatMessage(
+            conversation_id=conv_id,
+            role="assistant",
+            content=content,
+        )
+        save_db.add(assistant_msg)
+        save_db.commit()
+    except Exception as e:
+        logger.error("Failed to save assistant message: %s", e)
+        save_db.rollback()
+    finally:
+        save_db.close()
+
+
+def _replay_cached(conv_id: int, answer: str):
+    """Send a cached answer through the same SSE events as a live reply."""
+    yield f"data: {json.dumps({'type': 'conversation_id', 'id': conv_id})}\n\n"
+    for part in re.findall(r"\s*\S+\s*", answer):
+        yield f"data: {json.dumps({'type': 'text', 'content': part})}\n\n"
+    _save_assistant_message(conv_id, answer)
+    yield f"data: {json.dumps({'type': 'done'})}\n\n"
 
 
 # ── Endpoints ────────────────────────────────────────
@@ -368,55 +566,51 @@ def chat_send(body: ChatSendRequest, user: User = Depends(get_current_user), db:
 
     messages = [{"role": m.role, "content": m.content} for m in recent]
 
-    # Build system prompt with context
-    context = _build_chat_context(user, db)
-    system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
-        today=datetime.now().strftime("%Y-%m-%d"),
-        context=context,
-    )
-
+    mode = body.mode or settings.chat_mode
+    today = datetime.now().strftime("%Y-%m-%d")
     conv_id = conversation.id
+    user_id = user.id
+
+    # Standalone opening questions can be answered from the cache; follow-ups
+    # depend on the conversation so they always go to the model.
+    cache_version = None
+    if settings.chat_cache_enabled and len(history_rows) == 1:
+        from .chat_cache import answer_cache
+        from .data_version import get_data_version
+        cache_version = f"{get_data_version(db, user_id)}:{today}"
+        cached = answer_cache.get(user_id, mode, cache_version, body.message)
+        if cached is not None:
+            return StreamingResponse(_replay_cached(conv_id, cached), media_type="text/event-stream")
+
+    oai_messages = _build_prompt_messages(mode, user, db, today, messages)
 
     def generate():
         # First event: send conversation_id
         yield f"data: {json.dumps({'type': 'conversation_id', 'id': conv_id})}\n\n"
 
         full_response = ""
+        usage: dict = {}
         try:
             client = openai.OpenAI(api_key=settings.openai_api_key)
-            oai_messages = [{"role": "system", "content": system_prompt}] + messages
-            stream = client.chat.completions.create(
-                model="gpt-4o",
-                max_tokens=2048,
-                messages=oai_messages,
-                stream=True,
-            )
-            for chunk in stream:
-                delta = chunk.choices[0].delta if chunk.choices else None
-                if delta and delta.content:
-                    full_response += delta.content
-                    yield f"data: {json.dumps({'type': 'text', 'content': delta.content})}\n\n"
+            if mode == "tools":
+                chunks = _stream_with_tools(client, oai_messages, user_id, usage)
+            else:
+                chunks = _stream_completion(client, oai_messages, usage)
+            for content in chunks:
+                full_response += content
+                yield f"data: {json.dumps({'type': 'text', 'content': content})}\n\n"
+            _log_prompt_cache(conv_id, mode, usage)
         except Exception as e:
             logger.error("Chat streaming error: %s", e)
             yield f"data: {json.dumps({'type': 'error', 'content': 'Sorry, something went wrong. Please try again.'})}\n\n"
+        else:
+            if cache_version is not None and full_response:
+                from .chat_cache import answer_cache
+                answer_cache.put(user_id, mode, cache_version, body.message, full_response)
 
         # Save assistant response
         if full_response:
-            from .db import SessionLocal
-            save_db = SessionLocal()
-            try:
-                assistant_msg = ChatMessage(
-                    conversation_id=conv_id,
-                    role="assistant",
-                    content=full_response,
-                )
-                save_db.add(assistant_msg)
-                save_db.commit()
-            except Exception as e:
-                logger.error("Failed to save assistant message: %s", e)
-                save_db.rollback()
-            finally:
-                save_db.close()
+            _save_assistant_message(conv_id, full_response)
 
         yield f"data: {json.dumps({'type': 'done'})}\n\n"
 
@@ -424,12 +618,20 @@ def chat_send(body: ChatSendRequest, user: User = Depends(get_current_user), db:
 
 
 @router.get("/conversations")
-def list_conversations(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    rows = db.execute(
-        select(Conversation)
-        .where(Conversation.user_id == user.id)
-        .order_by(Conversation.updated_at.desc())
-    ).scalars().all()
+def list_conversations(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    # Most recently active first; all of them unless a limit/cursor is given
+    limit = page_size(limit, cursor)
+    stmt = apply_keyset(
+        select(Conversation).where(Conversation.user_id == user.id),
+        [Conversation.updated_at, Conversation.id], cursor, limit, [datetime.fromisoformat, int],
+    )
+    rows = page_rows(response, db.execute(stmt).scalars().all(), limit, key=lambda c: (c.updated_at, c.id))
 
     return [
         {
@@ -4,17 +4,20 @@ Tracks and displays changes between policy versions.
 """
 
 import json
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
 
-from .auth import get_current_user
-from .db import get_db
+from .auth import get_current_user, get_current_user_async
+from .db import get_db, get_async_db
 from .models import Policy, User
-from .models_features import PolicyDelta, DeltaExplanation
+from .models_features import PolicyDelta, DeltaExplanation, UserPortfolioStats
 from .config import settings
+from .pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, apply_keyset, page_rows
 
 router = APIRouter(tags=["deltas"])
 
@@ -176,22 +179,31 @@ class DeltaListResponse(BaseModel):
 # ═══════════════════════════════════════════════════════════════
 
 @router.get("/deltas")
-def list_all_deltas(
+async def list_all_deltas(
+    response: Response,
     acknowledged: Optional[bool] = None,
     severity: Optional[str] = None,
     page: int = 1,
-    limit: int = 50,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
+    limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async)
 ):
-    """List all deltas for the current user across all policies."""
-    # Get user's policy IDs
-    policy_ids = db.execute(
-        select(Policy.id).where(Policy.user_id == user.id)
-    ).scalars().all()
+    """List all deltas for the current user across all policies, newest first.
 
-    if not policy_ids:
-        return {"items": [], "total": 0, "unacknowledged_count": 0}
+    Pass ``cursor`` (from ``next_cursor``) instead of ``page`` to page without
+    OFFSET; cursor pages don't count ``total``.
+    """
+    policy_ids = select(Policy.id).where(Policy.user_id == user.id)
+
+    if cursor:
+        total = None
+    else:
+        total = (await db.execute(
+            select(func.count(PolicyDelta.id)).where(PolicyDelta.policy_id.in_(policy_ids))
+        )).scalar()
+        if not total:
+            return {"items": [], "total": 0, "unacknowledged_count": 0, "next_cursor": None}
 
     # Build query
     query = select(PolicyDelta).where(PolicyDelta.policy_id.in_(policy_ids))
@@ -200,31 +212,30 @@ def list_all_deltas(
         query = query.where(PolicyDelta.is_acknowledged == acknowledged)
     if severity:
         query = query.where(PolicyDelta.severity == severity)
+    if not cursor:
+        query = query.offset((page - 1) * limit)
+
+    unacknowledged_count = (await db.execute(
+        select(UserPortfolioStats.unacknowledged_deltas).where(UserPortfolioStats.user_id == user.id)
+    )).scalar() or 0
+
+    query = apply_keyset(query, [PolicyDelta.created_at, PolicyDelta.id], cursor, limit, [datetime.fromisoformat, int])
+    deltas = page_rows(response, (await db.execute(query)).scalars().all(), limit,
+                       key=lambda d: (d.created_at, d.id))
+
+    # Policy info and explanations for the whole page in two queries
+    policies, explanations = {}, {}
+    if deltas:
+        policies = {p.id: p for p in (await db.execute(
+            select(Policy).where(Policy.id.in_({d.policy_id for d in deltas}))
+        )).scalars()}
+        explanations = {e.delta_id: e.explanation for e in (await db.execute(
+            select(DeltaExplanation).where(DeltaExplanation.delta_id.in_([d.id for d in deltas]))
+        )).scalars()}
 
-    query = query.order_by(PolicyDelta.created_at.desc())
-
-    # Count total and unacknowledged
-    total_query = select(PolicyDelta).where(PolicyDelta.policy_id.in_(policy_ids))
-    total = len(db.execute(total_query).scalars().all())
-
-    unack_query = select(PolicyDelta).where(
-        PolicyDelta.policy_id.in_(policy_ids),
-        PolicyDelta.is_acknowledged == False
-    )
-    unacknowledged_count = len(db.execute(unack_query).scalars().all())
-
-    # Paginate
-    offset = (page - 1) * limit
-    deltas = db.execute(query.offset(offset).limit(limit)).scalars().all()
-
-    # Build response with policy info
     items = []
     for d in deltas:
-        policy = db.get(Policy, d.policy_id)
-        explanation = db.execute(
-            select(DeltaExplanation).where(DeltaExplanation.delta_id == d.id)
-        ).scalar_one_or_none()
-
+        policy = policies.get(d.policy_id)
         items.append({
             "id": d.id,
             "policy_id": d.policy_id,
@@ -238,10 +249,15 @@ def list_all_deltas(
             "created_at": str(d.created_at),
             "policy_carrier": policy.carrier if policy else None,
             "policy_type": policy.policy_type if policy else None,
-            "explanation": explanation.explanation if explanation else None,
+            "explanation": explanations.get(d.id),
         })
 
-    return {"items": items, "total": total, "unacknowledged_count": unacknowledged_count}
+    return {
+        "items": items,
+        "total": total,
+        "unacknowledged_count": unacknowledged_count,
+        "next_cursor": response.headers.get(NEXT_CURSOR_HEADER),
+    }
 
 
 @router.get("/policies/{policy_id}/deltas")
@@ -8,8 +8,9 @@ from sqlalchemy.orm import Session
 
 from .auth import get_current_user
 from .db import get_db
-from .models import Policy, Contact, CoverageItem, PolicyDetail, User
+from .models import Policy, Contact, CoverageItem, User
 from .models_features import Premium, Claim
+from .policy_details import details_by_policy
 
 router = APIRouter(prefix="/export", tags=["export"])
 
@@ -66,7 +67,7 @@ def export_single_policy(policy_id: int, db: Session = Depends(get_db), user: Us
     writer.writerow([])
 
     # Details
-    details = db.execute(select(PolicyDetail).where(PolicyDetail.policy_id == policy_id)).scalars().all()
+    details = details_by_policy(db, [policy_id])[policy_id]
     writer.writerow(["DETAILS"])
     writer.writerow(["Field", "Value"])
     for d in details:
@@ -1,13 +1,16 @@
 from collections import defaultdict
+from datetime import date, datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session, selectinload
 
 from .auth import get_current_user
 from .coverage_taxonomy import analyze_coverage_gaps, get_coverage_summary
 from .db import get_db
+from .gap_cache import cached, gap_key, not_modified
 from .models import User, Policy, Exposure
+from .policy_details import policy_details, preload_details
 from .schemas import ExposureCreate, ExposureUpdate, ExposureOut
 
 router = APIRouter(prefix="/exposures", tags=["exposures"])
@@ -57,17 +60,34 @@ def list_exposures(db: Session = Depends(get_db), user: User = Depends(get_curre
 
 
 @router.get("/{exposure_id}")
-def get_exposure(exposure_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def get_exposure(
+    exposure_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
     exposure = db.get(Exposure, exposure_id)
     if not exposure or exposure.user_id != user.id:
         raise HTTPException(status_code=404, detail="Exposure not found")
 
-    # Get linked policies with contacts and details eagerly loaded
+    # Exposures and their policies are the user's data, so the data version covers them
+    today = datetime.now().date()
+    key = gap_key(db, user.id, today, "exposure", exposure_id)
+    unchanged = not_modified(request, response, key)
+    if unchanged is not None:
+        return unchanged
+    return cached(key, lambda: _exposure_detail(db, exposure, today))
+
+
+def _exposure_detail(db: Session, exposure: Exposure, today: date) -> dict:
+    # Get linked policies with contacts eagerly loaded (details from details_json)
     policies = db.execute(
-        select(Policy).where(Policy.exposure_id == exposure_id)
-        .options(selectinload(Policy.contacts), selectinload(Policy.details))
+        select(Policy).where(Policy.exposure_id == exposure.id)
+        .options(selectinload(Policy.contacts))
         .order_by(Policy.id.desc())
     ).unique().scalars().all()
+    preload_details(db, policies)
 
     # Build policy dicts for gap analysis
     policy_dicts = []
@@ -80,7 +100,7 @@ def get_exposure(exposure_id: int, db: Session = Depends(get_db), user: User = D
             "renewal_date": str(p.renewal_date) if p.renewal_date else None,
             "created_at": str(p.created_at) if p.created_at else None,
             "contacts": [{"role": c.role, "name": c.name, "phone": c.phone} for c in p.contacts],
-            "details": [{"field_name": d.field_name, "field_value": d.field_value} for d in p.details],
+            "details": [{"field_name": d.field_name, "field_value": d.field_value} for d in policy_details(p)],
         })
         policy_list.append({
             "id": p.id, "carrier": p.carrier, "policy_type": p.policy_type,
@@ -90,7 +110,7 @@ def get_exposure(exposure_id: int, db: Session = Depends(get_db), user: User = D
             "renewal_date": str(p.renewal_date) if p.renewal_date else None,
         })
 
-    gaps = analyze_coverage_gaps(policy_dicts) if policy_dicts else []
+    gaps = analyze_coverage_gaps(policy_dicts, today=today) if policy_dicts else []
     summary = get_coverage_summary(policy_dicts) if policy_dicts else {}
 
     return {
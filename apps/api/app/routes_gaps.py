@@ -3,15 +3,24 @@ Gap Analysis API routes.
 Analyzes user's policies and identifies coverage gaps.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
 
-from .auth import get_current_user
-from .db import get_db
+from .auth import get_current_user, get_current_user_async
+from .db import get_db, get_async_db
 from .models import Policy, Contact, User
 from .models_profile import UserProfile
-from .coverage_taxonomy import analyze_coverage_gaps, get_coverage_summary
+from .coverage_taxonomy import (
+    analyze_coverage_gaps, analyze_policy_gaps, get_coverage_summary, summarize_coverage_by_type,
+)
+from .gap_cache import cached, gap_cache, gap_key, not_modified
+from .policy_details import policy_details, preload_details
+from .portfolio_stats import get_stats
+from .snapshots import load_snapshot
 
 router = APIRouter(prefix="/gaps", tags=["gap-analysis"])
 
@@ -21,6 +30,10 @@ def _build_user_context(db: Session, user_id: int) -> dict:
     profile = db.execute(
         select(UserProfile).where(UserProfile.user_id == user_id)
     ).scalar_one_or_none()
+    return _user_context(profile)
+
+
+def _user_context(profile: UserProfile | None) -> dict:
     if not profile:
         return {}
     return {
@@ -34,23 +47,45 @@ def _build_user_context(db: Session, user_id: int) -> dict:
 
 
 @router.get("")
-def get_gap_analysis(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def get_gap_analysis(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
     """
     Analyze the user's policies and return identified coverage gaps.
+    Cached per data version and day; a matching If-None-Match gets a 304.
     """
-    policies = db.execute(
-        select(Policy).where(Policy.user_id == user.id)
-        .options(selectinload(Policy.contacts), selectinload(Policy.details))
-    ).unique().scalars().all()
+    today = datetime.now().date()
+    key = await db.run_sync(gap_key, user.id, today, "portfolio")
+    unchanged = not_modified(request, response, key)
+    if unchanged is not None:
+        return unchanged
+
+    result = gap_cache.get(key)
+    if result is None:
+        result = await db.run_sync(_portfolio_gaps, user.id, today)
+        gap_cache.put(key, result)
+    return result
 
-    policy_data = _serialize_policies(policies)
-    user_context = _build_user_context(db, user.id)
-    gaps = analyze_coverage_gaps(policy_data, user_context)
-    summary = get_coverage_summary(policy_data)
 
+def _portfolio_gaps(db: Session, user_id: int, today: date) -> dict:
+    """GET /gaps: gaps and coverage summary over all of a user's policies (also the chat tools' gap list).
+
+    Served from the nightly batch's snapshot while it is current (see snapshots.py).
+    """
+    stored = load_snapshot(db, user_id, "gaps", today)
+    if stored is not None:
+        return stored
+    return _gap_payload(_load_policies_eager(db, user_id), _build_user_context(db, user_id), today)
+
+
+def _gap_payload(policies: list[Policy], user_context: dict, today: date) -> dict:
+    policy_data = _serialize_policies(policies)
     return {
-        "gaps": gaps,
-        "summary": summary,
+        "gaps": analyze_coverage_gaps(policy_data, user_context, today),
+        "summary": get_coverage_summary(policy_data),
         "policy_count": len(policies)
     }
 
@@ -59,20 +94,9 @@ def get_gap_analysis(db: Session = Depends(get_db), user: User = Depends(get_cur
 def get_coverage_summary_only(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     """
     Get just the coverage summary without gap analysis.
-    Lighter endpoint for dashboard widgets.
+    Lighter endpoint for dashboard widgets: one lookup in user_portfolio_stats.
     """
-    policies = db.execute(
-        select(Policy).where(Policy.user_id == user.id)
-    ).scalars().all()
-
-    policy_data = [{
-        "id": p.id,
-        "policy_type": p.policy_type,
-        "coverage_amount": p.coverage_amount,
-        "premium_amount": p.premium_amount,
-    } for p in policies]
-
-    return get_coverage_summary(policy_data)
+    return summarize_coverage_by_type(get_stats(db, user.id)["coverage_by_type"])
 
 
 def _serialize_policies(policies: list[Policy]) -> list[dict]:
@@ -87,38 +111,54 @@ def _serialize_policies(policies: list[Policy]) -> list[dict]:
         "premium_amount": p.premium_amount,
         "renewal_date": str(p.renewal_date) if p.renewal_date else None,
         "created_at": str(p.created_at) if p.created_at else None,
-        "details": [{"field_name": d.field_name, "field_value": d.field_value} for d in p.details],
+        "details": [{"field_name": d.field_name, "field_value": d.field_value} for d in policy_details(p)],
         "contacts": [{"role": c.role, "phone": c.phone, "email": c.email} for c in p.contacts],
     } for p in policies]
 
 
 def _load_policies_eager(db: Session, user_id: int) -> list[Policy]:
     """Load all user policies with contacts and details eagerly."""
-    return db.execute(
+    policies = db.execute(
         select(Policy).where(Policy.user_id == user_id)
-        .options(selectinload(Policy.contacts), selectinload(Policy.details))
+        .options(selectinload(Policy.contacts))
+        .order_by(Policy.id)  # gaps come out in policy order; the batch loads in the same order
     ).unique().scalars().all()
+    preload_details(db, policies)
+    return policies
 
 
 @router.get("/business/{business_name}")
 def get_business_entity_gaps(
     business_name: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     """Analyze coverage gaps scoped to a single business entity (by business_name)."""
     from urllib.parse import unquote
-    from .models_features import Certificate
 
     decoded_name = unquote(business_name)
+    today = datetime.now().date()
+    key = gap_key(db, user.id, today, "business", decoded_name)
+    unchanged = not_modified(request, response, key)
+    if unchanged is not None:
+        return unchanged
+    return cached(key, lambda: _business_gaps(db, user.id, decoded_name, today))
+
+
+def _business_gaps(db: Session, user_id: int, decoded_name: str, today: date) -> dict:
+    from .models_features import Certificate
+    from .routes_certificates import certificate_status
 
     policies = db.execute(
         select(Policy).where(
-            Policy.user_id == user.id,
+            Policy.user_id == user_id,
             Policy.business_name == decoded_name,
         )
-        .options(selectinload(Policy.contacts), selectinload(Policy.details))
+        .options(selectinload(Policy.contacts))
     ).unique().scalars().all()
+    preload_details(db, policies)
 
     if not policies:
         raise HTTPException(status_code=404, detail="No policies found for this business entity")
@@ -153,15 +193,15 @@ def get_business_entity_gaps(
                 "notes": c.notes,
             })
 
-    user_context = _build_user_context(db, user.id)
-    gaps = analyze_coverage_gaps(policy_data, user_context)
+    user_context = _build_user_context(db, user_id)
+    gaps = analyze_coverage_gaps(policy_data, user_context, today)
     summary = get_coverage_summary(policy_data)
 
     # Certificates linked to this entity's policies
     policy_ids = [p.id for p in policies]
     certificates = db.execute(
         select(Certificate).where(
-            Certificate.user_id == user.id,
+            Certificate.user_id == user_id,
             Certificate.policy_id.in_(policy_ids),
         )
     ).scalars().all()
@@ -175,7 +215,7 @@ def get_business_entity_gaps(
         "carrier": cert.carrier,
         "coverage_types": cert.coverage_types,
         "coverage_amount": cert.coverage_amount,
-        "status": cert.status,
+        "status": certificate_status(cert.expiration_date, cert.status, today),
         "expiration_date": str(cert.expiration_date) if cert.expiration_date else None,
     } for cert in certificates]
 
@@ -190,23 +230,28 @@ def get_business_entity_gaps(
 
 
 @router.get("/policy/{policy_id}")
-def get_policy_gaps(policy_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    """Get gaps specific to a single policy."""
+def get_policy_gaps(
+    policy_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Get gaps specific to a single policy, evaluated on that policy alone."""
     policy = db.execute(
         select(Policy).where(Policy.id == policy_id, Policy.user_id == user.id)
     ).scalar_one_or_none()
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
 
-    policies = _load_policies_eager(db, user.id)
-    policy_data = _serialize_policies(policies)
-    user_context = _build_user_context(db, user.id)
-    gaps = analyze_coverage_gaps(policy_data, user_context)
+    today = datetime.now().date()
+    key = gap_key(db, user.id, today, "policy", policy_id)
+    unchanged = not_modified(request, response, key)
+    if unchanged is not None:
+        return unchanged
+    return cached(key, lambda: _policy_gaps(db, policy, today))
 
-    policy_gaps = [
-        g for g in gaps
-        if g.get("policy_id") == policy_id
-        or (g.get("id") and f"_{policy_id}" in str(g.get("id", "")))
-    ]
 
-    return {"gaps": policy_gaps, "policy_id": policy_id}
+def _policy_gaps(db: Session, policy: Policy, today: date) -> dict:
+    preload_details(db, [policy])
+    return {"gaps": analyze_policy_gaps(_serialize_policies([policy])[0], today), "policy_id": policy.id}
@@ -0,0 +1,65 @@
+"""
+Health and connection-pool telemetry routes.
+
+``/health`` is the public liveness probe. The others expose pool, replica,
+audit journal and queue state, so they are internal: they need the
+``X-Health-Token`` header to match ``settings.health_token``, and answer 404
+while no token is configured.
+"""
+
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy import text
+
+from .audit_writer import audit_writer
+from .config import settings
+from .score_queue import score_queue
+from .db import engine, async_engine, replica_engines, async_replica_engines, writer_engine, async_writer_engine
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+def require_health_token(x_health_token: str = Header(default="")):
+    if not settings.health_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_health_token.encode(), settings.health_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid health token")
+
+
+@router.get("")
+def health():
+    return {"status": "ok"}
+
+
+@router.get("/db", dependencies=[Depends(require_health_token)])
+async def db_health():
+    """Pool usage and checkout wait stats for every engine (per worker process)."""
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    pools = [engine.pool, async_engine.pool]
+    pools += [e.pool for e in replica_engines] + [e.pool for e in async_replica_engines]
+    pools += [e.pool for e in (writer_engine, async_writer_engine) if e is not None]
+    return {pool.stats.name: pool.stats.snapshot(pool) for pool in pools}
+
+
+@router.get("/audit", dependencies=[Depends(require_health_token)])
+def audit_health():
+    """Buffered audit writer state for this worker process."""
+    return {
+        "running": audit_writer.running,
+        "pending": audit_writer.pending(),
+        "flushed": audit_writer.flushed,
+        "flush_errors": audit_writer.flush_errors,
+    }
+
+
+@router.get("/scores", dependencies=[Depends(require_health_token)])
+def scores_health():
+    """Background coverage score queue state for this worker process."""
+    return {
+        "running": score_queue.running,
+        "pending": score_queue.pending(),
+        "computed": score_queue.computed,
+        "errors": score_queue.errors,
+    }
@@ -9,13 +9,14 @@ from collections import defaultdict
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, field_validator
 from typing import Optional
 import re
 
 from .auth import get_current_user
-from .db import get_db
+from .db import get_db, get_async_db
 from .models import Policy, Contact, User
 from .models_features import EmergencyCard
 
@@ -247,14 +248,14 @@ def delete_emergency_card(db: Session = Depends(get_db), user: User = Depends(ge
 # ═══════════════════════════════════════════════════════════════
 
 @router.get("/ice/{access_code}")
-def get_emergency_card_public(access_code: str, db: Session = Depends(get_db)):
+async def get_emergency_card_public(access_code: str, db: AsyncSession = Depends(get_async_db)):
     """
     Public endpoint to view an emergency card.
     Returns card metadata (to check if PIN required) without sensitive data.
     """
-    card = db.execute(
+    card = (await db.execute(
         select(EmergencyCard).where(EmergencyCard.access_code == access_code)
-    ).scalar_one_or_none()
+    )).scalar_one_or_none()
 
     if not card:
         raise HTTPException(status_code=404, detail="Emergency card not found")
@@ -273,7 +274,7 @@ def get_emergency_card_public(access_code: str, db: Session = Depends(get_db)):
         }
 
     # No PIN - return full data
-    return _build_emergency_card_data(card, db)
+    return await db.run_sync(lambda session: _build_emergency_card_data(card, session))
 
 
 @router.post("/ice/{access_code}/verify")
@@ -11,8 +11,8 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, BackgroundTasks
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
@@ -21,6 +21,7 @@ from .db import get_db
 from .models import Policy, User
 from .models_features import InboundAddress, InboundEmail, PolicyDraft
 from .config import settings
+from .pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, apply_keyset, page_rows, page_size
 
 router = APIRouter(tags=["inbound"])
 
@@ -389,18 +390,26 @@ async def receive_inbound_email(
 
 @router.get("/inbound/drafts")
 def list_drafts(
+    response: Response,
     status: Optional[str] = "pending",
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    """List policy drafts for the current user."""
+    """List policy drafts for the current user, newest first.
+
+    All of them unless ``limit``/``cursor`` is given; paginated responses carry
+    ``next_cursor`` and no ``total`` (use /inbound/drafts/count).
+    """
+    limit = page_size(limit, cursor)
     query = select(PolicyDraft).where(PolicyDraft.user_id == user.id)
 
     if status:
         query = query.where(PolicyDraft.status == status)
 
-    query = query.order_by(PolicyDraft.created_at.desc())
-    drafts = db.execute(query).scalars().all()
+    query = apply_keyset(query, [PolicyDraft.created_at, PolicyDraft.id], cursor, limit, [datetime.fromisoformat, int])
+    drafts = page_rows(response, db.execute(query).scalars().all(), limit, key=lambda d: (d.created_at, d.id))
 
     items = []
     for d in drafts:
@@ -417,7 +426,28 @@ def list_drafts(
             "created_at": str(d.created_at),
         })
 
-    return {"items": items, "total": len(items)}
+    return {
+        "items": items,
+        "total": len(items) if limit is None else None,
+        "next_cursor": response.headers.get(NEXT_CURSOR_HEADER),
+    }
+
+
+# Registered before /inbound/drafts/{draft_id}, which would otherwise match "count"
+@router.get("/inbound/drafts/count")
+def count_pending_drafts(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Get count of pending drafts for dashboard notification."""
+    count = db.execute(
+        select(func.count(PolicyDraft.id)).where(
+            PolicyDraft.user_id == user.id,
+            PolicyDraft.status == "pending"
+        )
+    ).scalar()
+
+    return {"count": count}
 
 
 @router.get("/inbound/drafts/{draft_id}")
@@ -535,19 +565,3 @@ def reject_draft(
     db.commit()
 
     return {"ok": True}
-
-
-@router.get("/inbound/drafts/count")
-def count_pending_drafts(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
-):
-    """Get count of pending drafts for dashboard notification."""
-    count = len(db.execute(
-        select(PolicyDraft).where(
-            PolicyDraft.user_id == user.id,
-            PolicyDraft.status == "pending"
-        )
-    ).scalars().all())
-
-    return {"count": count}
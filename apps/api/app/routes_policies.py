@@ -1,41 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
 from typing import List
 from collections import defaultdict
 
-from .auth import get_current_user
-from .db import get_db
+from .auth import get_current_user, get_current_user_async
+from .db import get_db, get_async_db
 from .models import Policy, Contact, CoverageItem, PolicyDetail, User, Exposure
 from .models_features import Premium, PolicyShare
 from .schemas import PolicyCreate, PolicyUpdate, PolicyOut, BusinessGroupRename
 from .audit_helper import log_action
 from .routes_reminders import ensure_reminders
+from .pagination import MAX_PAGE_SIZE, apply_keyset, page_rows, page_size
+from .policy_details import policy_details, preload_details
 
 router = APIRouter(prefix="/policies", tags=["policies"])
 
 
 @router.get("")
-def list_policies(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    # Eager load contacts, details, and exposure in a single query
-    policies = db.execute(
+async def list_policies(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    # Newest first; all policies unless a limit/cursor is given (next page cursor in X-Next-Cursor)
+    limit = page_size(limit, cursor)
+    # Eager load contacts and exposure; details come with the policy row (details_json)
+    stmt = (
         select(Policy)
         .where(Policy.user_id == user.id)
         .options(
             selectinload(Policy.contacts),
-            selectinload(Policy.details),
             selectinload(Policy.exposure),
         )
-        .order_by(Policy.id.desc())
-    ).unique().scalars().all()
+    )
+    stmt = apply_keyset(stmt, [Policy.id], cursor, limit, [int])
+    policies = page_rows(response, (await db.execute(stmt)).unique().scalars().all(), limit, key=lambda p: (p.id,))
+    await db.run_sync(preload_details, policies)
 
     # Batch load shares for all policies in one query
     policy_ids = [p.id for p in policies]
     shares_map: dict[int, list[str]] = defaultdict(list)
     if policy_ids:
-        shares = db.execute(
+        shares = (await db.execute(
             select(PolicyShare).where(PolicyShare.policy_id.in_(policy_ids))
-        ).scalars().all()
+        )).scalars().all()
         for s in shares:
             shares_map[s.policy_id].append(s.shared_with_email)
 
@@ -51,7 +63,7 @@ def list_policies(db: Session = Depends(get_db), user: User = Depends(get_curren
                     "email": c.email,
                 }
 
-        key_details = {d.field_name: d.field_value for d in p.details}
+        key_details = {d.field_name: d.field_value for d in policy_details(p)}
 
         result.append({
             "id": p.id,
@@ -142,9 +154,9 @@ def compare_policies(ids: str = Query(...), db: Session = Depends(get_db), user:
         .options(
             selectinload(Policy.contacts),
             selectinload(Policy.coverage_items),
-            selectinload(Policy.details),
         )
     ).unique().scalars().all()
+    preload_details(db, policies)
 
     policy_map = {p.id: p for p in policies}
     for pid in id_list:
@@ -174,7 +186,7 @@ def compare_policies(ids: str = Query(...), db: Session = Depends(get_db), user:
             },
             "contacts": [{"id": c.id, "role": c.role, "name": c.name, "company": c.company, "phone": c.phone, "email": c.email} for c in policy.contacts],
             "coverage_items": [{"id": ci.id, "item_type": ci.item_type, "description": ci.description, "limit": ci.limit} for ci in policy.coverage_items],
-            "details": [{"id": d.id, "field_name": d.field_name, "field_value": d.field_value} for d in policy.details],
+            "details": [{"id": d.id, "field_name": d.field_name, "field_value": d.field_value} for d in policy_details(policy)],
             "premiums": [{"id": p.id, "amount": p.amount, "frequency": p.frequency, "due_date": str(p.due_date), "paid_date": str(p.paid_date) if p.paid_date else None} for p in premiums],
         })
 
@@ -187,9 +199,9 @@ def create_policy(payload: PolicyCreate, db: Session = Depends(get_db), user: Us
     from .routes_billing import get_policy_limit, get_effective_plan
     limit = get_policy_limit(user)
     active_count = db.execute(
-        select(Policy).where(Policy.user_id == user.id, Policy.status == "active")
-    ).scalars().all()
-    if len(active_count) >= limit:
+        select(func.count(Policy.id)).where(Policy.user_id == user.id, Policy.status == "active")
+    ).scalar()
+    if active_count >= limit:
         plan = get_effective_plan(user)
         raise HTTPException(
             status_code=403,
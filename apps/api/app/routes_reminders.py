@@ -2,12 +2,14 @@ from datetime import date, datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select, delete
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
 
 from .auth import get_current_user
 from .db import get_db
 from .models import Policy, User
 from .models_features import RenewalReminder, Premium, Certificate
+from .snapshots import load_snapshot
 
 
 def to_date(val) -> date | None:
@@ -70,30 +72,51 @@ def active_reminders(db: Session = Depends(get_db), user: User = Depends(get_cur
 
 @router.get("/smart")
 def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    """Generate contextual reminders: overdue premiums, upcoming renewals, annual reviews."""
+    """Generate contextual reminders: overdue premiums, upcoming renewals, annual reviews.
+
+    Served from the nightly batch's snapshot while it is current (see snapshots.py).
+    """
     today = date.today()
-    alerts = []
+    alerts = load_snapshot(db, user.id, "smart_reminders", today)
+    if alerts is None:
+        alerts = build_smart_reminders(db, [user.id], today)[user.id]
+    return alerts
+
+
+def build_smart_reminders(db: Session | Connection, user_ids: list[int], today: date) -> dict[int, list[dict]]:
+    """GET /reminders/smart's alerts for each of ``user_ids``, in three queries whatever their number."""
+    alerts: dict[int, list[dict]] = {uid: [] for uid in user_ids}
 
     policies = db.execute(
-        select(Policy).where(Policy.user_id == user.id)
-    ).scalars().all()
+        select(Policy.id, Policy.user_id, Policy.nickname, Policy.carrier, Policy.renewal_date, Policy.created_at)
+        .where(Policy.user_id.in_(user_ids))
+        .order_by(Policy.id)
+    ).all()
+
+    # Each policy's first unpaid premium past due, and first due within 7 days
+    overdue_by_policy, upcoming_by_policy = {}, {}
+    for premium in db.execute(
+        select(Premium.policy_id, Premium.amount, Premium.due_date)
+        .join(Policy, Premium.policy_id == Policy.id)
+        .where(Policy.user_id.in_(user_ids))
+        .where(Premium.paid_date == None)  # noqa: E711
+        .where(Premium.due_date <= today + timedelta(days=7))
+        .order_by(Premium.due_date, Premium.id)
+    ):
+        found = overdue_by_policy if premium.due_date < today else upcoming_by_policy
+        found.setdefault(premium.policy_id, premium)
 
     for p in policies:
         label = p.nickname or p.carrier
+        user_alerts = alerts[p.user_id]
 
         # Overdue premium (unpaid and past due)
-        overdue = db.execute(
-            select(Premium)
-            .where(Premium.policy_id == p.id)
-            .where(Premium.paid_date == None)  # noqa: E711
-            .where(Premium.due_date < today)
-            .order_by(Premium.due_date)
-        ).scalars().first()
+        overdue = overdue_by_policy.get(p.id)
         if overdue:
             due = to_date(overdue.due_date)
             if due:
                 days_late = (today - due).days
-                alerts.append({
+                user_alerts.append({
                     "type": "overdue_payment",
                     "severity": "high" if days_late > 14 else "medium",
                     "policy_id": p.id,
@@ -103,19 +126,12 @@ def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_curr
                 })
 
         # Upcoming premium (due within 7 days)
-        upcoming_prem = db.execute(
-            select(Premium)
-            .where(Premium.policy_id == p.id)
-            .where(Premium.paid_date == None)  # noqa: E711
-            .where(Premium.due_date >= today)
-            .where(Premium.due_date <= today + timedelta(days=7))
-            .order_by(Premium.due_date)
-        ).scalars().first()
+        upcoming_prem = upcoming_by_policy.get(p.id)
         if upcoming_prem:
             due = to_date(upcoming_prem.due_date)
             if due:
                 days_until = (due - today).days
-                alerts.append({
+                user_alerts.append({
                     "type": "upcoming_payment",
                     "severity": "low",
                     "policy_id": p.id,
@@ -129,7 +145,7 @@ def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_curr
         if renewal:
             days_to_renewal = (renewal - today).days
             if 0 < days_to_renewal <= 30:
-                alerts.append({
+                user_alerts.append({
                     "type": "renewal",
                     "severity": "medium" if days_to_renewal <= 14 else "low",
                     "policy_id": p.id,
@@ -138,7 +154,7 @@ def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_curr
                     "action": "Review policy before renewal",
                 })
             elif days_to_renewal <= 0 and days_to_renewal > -30:
-                alerts.append({
+                user_alerts.append({
                     "type": "expired",
                     "severity": "high",
                     "policy_id": p.id,
@@ -152,7 +168,7 @@ def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_curr
         if created:
             days_old = (today - created).days
             if days_old > 335 and days_old % 365 < 30:
-                alerts.append({
+                user_alerts.append({
                     "type": "annual_review",
                     "severity": "low",
                     "policy_id": p.id,
@@ -163,8 +179,11 @@ def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_curr
 
     # Certificate expiration alerts
     certificates = db.execute(
-        select(Certificate).where(Certificate.user_id == user.id)
-    ).scalars().all()
+        select(Certificate.user_id, Certificate.policy_id, Certificate.counterparty_name,
+               Certificate.direction, Certificate.expiration_date)
+        .where(Certificate.user_id.in_(user_ids))
+        .order_by(Certificate.id)
+    ).all()
     for cert in certificates:
         exp = to_date(cert.expiration_date)
         if not exp:
@@ -172,7 +191,7 @@ def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_curr
         days_until = (exp - today).days
         label = f"{cert.counterparty_name} ({cert.direction} COI)"
         if days_until < 0 and days_until > -90:
-            alerts.append({
+            alerts[cert.user_id].append({
                 "type": "certificate_expired",
                 "severity": "high",
                 "policy_id": cert.policy_id or 0,
@@ -182,7 +201,7 @@ def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_curr
             })
         elif 0 <= days_until <= 90:
             sev = "high" if days_until <= 30 else "medium" if days_until <= 60 else "low"
-            alerts.append({
+            alerts[cert.user_id].append({
                 "type": "certificate_expiring",
                 "severity": sev,
                 "policy_id": cert.policy_id or 0,
@@ -193,7 +212,8 @@ def smart_reminders(db: Session = Depends(get_db), user: User = Depends(get_curr
 
     # Sort by severity
     severity_order = {"high": 0, "medium": 1, "low": 2}
-    alerts.sort(key=lambda a: severity_order.get(a["severity"], 3))
+    for user_alerts in alerts.values():
+        user_alerts.sort(key=lambda a: severity_order.get(a["severity"], 3))
     return alerts
 
 
@@ -5,17 +5,24 @@ Calculates and returns coverage scores by category.
 
 import json
 from datetime import datetime
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .auth import get_current_user
-from .db import get_db
-from .models import Policy, PolicyDetail, Contact, User
+from .auth import get_current_user, get_current_user_async
+from .data_version import get_data_version
+from .db import get_db, get_async_db
+from .models import Policy, Contact, User
 from .models_features import CoverageScore
+from .policy_details import details_by_policy
+from .score_queue import score_queue
 
 router = APIRouter(prefix="/coverage-scores", tags=["scores"])
 
+CATEGORIES = ["auto", "home", "life", "umbrella", "general_liability", "professional_liability", "commercial_property", "cyber"]
+PLACEHOLDER_CARRIER = "Pending extraction..."  # policies still being extracted don't count
+
 
 # ═══════════════════════════════════════════════════════════════
 # Scoring weights per category
@@ -70,6 +77,19 @@ SCORING_WEIGHTS = {
     },
 }
 
+# Weight of each category in the overall score
+CATEGORY_WEIGHTS = {
+    "auto": 25,
+    "home": 25,
+    "life": 20,
+    "umbrella": 15,
+    "renters": 15,  # Alternative to home
+    "general_liability": 20,
+    "professional_liability": 15,
+    "commercial_property": 15,
+    "cyber": 15,
+}
+
 # Thresholds for adequate coverage
 ADEQUACY_THRESHOLDS = {
     "auto_liability": 100000,
@@ -220,25 +240,12 @@ def calculate_category_score(policies: list[dict], category: str, all_details: d
 
 def calculate_overall_score(category_scores: dict) -> dict:
     """Calculate weighted overall score from category scores."""
-    # Weight categories by importance
-    category_weights = {
-        "auto": 25,
-        "home": 25,
-        "life": 20,
-        "umbrella": 15,
-        "renters": 15,  # Alternative to home
-        "general_liability": 20,
-        "professional_liability": 15,
-        "commercial_property": 15,
-        "cyber": 15,
-    }
-
     total_weight = 0
     weighted_sum = 0
     all_insights = []
 
     for cat, data in category_scores.items():
-        weight = category_weights.get(cat, 10)
+        weight = CATEGORY_WEIGHTS.get(cat, 10)
         if data["score"] > 0:  # Only count categories with policies
             weighted_sum += data["score"] * weight
             total_weight += weight
@@ -253,15 +260,14 @@ def calculate_overall_score(category_scores: dict) -> dict:
     }
 
 
-@router.get("")
-def get_coverage_scores(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user)
-):
-    """Get all coverage scores for the current user."""
+def _score_user(db: Session, user_id: int) -> dict:
+    """Calculate every category score for a user and store them in CoverageScore rows."""
+    # Read first: a change committed while we compute gets a newer stamp, so these rows read as stale
+    version = get_data_version(db, user_id)
+
     # Get user's policies
     policies = db.execute(
-        select(Policy).where(Policy.user_id == user.id)
+        select(Policy).where(Policy.user_id == user_id)
     ).scalars().all()
 
     # Skip placeholder policies
@@ -276,22 +282,19 @@ def get_coverage_scores(
             "created_at": str(p.created_at) if p.created_at else None,
         }
         for p in policies
-        if p.carrier != "Pending extraction..."
+        if p.carrier != PLACEHOLDER_CARRIER
     ]
 
-    # Get all policy details
-    all_details = {}
-    for p in policies:
-        details = db.execute(
-            select(PolicyDetail).where(PolicyDetail.policy_id == p.id)
-        ).scalars().all()
-        all_details[p.id] = {d.field_name.lower(): d.field_value for d in details}
+    # Details of all policies: from details_json, at most one query for the rest
+    all_details = {p.id: {} for p in policies}
+    for pid, details in details_by_policy(db, list(all_details)).items():
+        for d in details:
+            all_details[pid][d.field_name.lower()] = d.field_value
 
     # Calculate scores for each category
-    categories = ["auto", "home", "life", "umbrella", "general_liability", "professional_liability", "commercial_property", "cyber"]
     category_scores = {}
 
-    for cat in categories:
+    for cat in CATEGORIES:
         category_scores[cat] = calculate_category_score(policy_list, cat, all_details)
 
     # Check for renters as alternative to home
@@ -308,52 +311,27 @@ def get_coverage_scores(
     # Calculate overall score
     overall = calculate_overall_score(category_scores)
 
-    # Save scores to database for caching
-    for cat, data in category_scores.items():
-        existing = db.execute(
-            select(CoverageScore).where(
-                CoverageScore.user_id == user.id,
-                CoverageScore.category == cat
-            )
-        ).scalar_one_or_none()
-
-        if existing:
-            existing.score_total = data["score"]
-            existing.score_breakdown = json.dumps(data["breakdown"])
-            existing.insights = json.dumps(data["insights"])
-            existing.last_calculated = datetime.now()
+    # Save scores: update the user's rows in place (one query for all), drop categories that no longer apply
+    existing = {}
+    for row in db.execute(
+        select(CoverageScore).where(CoverageScore.user_id == user_id).order_by(CoverageScore.id)
+    ).scalars():
+        if row.category in existing:
+            db.delete(row)  # duplicate from a concurrent first computation
         else:
-            score = CoverageScore(
-                user_id=user.id,
-                category=cat,
-                score_total=data["score"],
-                score_breakdown=json.dumps(data["breakdown"]),
-                insights=json.dumps(data["insights"]),
-            )
-            db.add(score)
-
-    # Save overall score
-    overall_existing = db.execute(
-        select(CoverageScore).where(
-            CoverageScore.user_id == user.id,
-            CoverageScore.category == "overall"
-        )
-    ).scalar_one_or_none()
-
-    if overall_existing:
-        overall_existing.score_total = overall["score"]
-        overall_existing.score_breakdown = json.dumps(overall["breakdown"])
-        overall_existing.insights = json.dumps(overall["insights"])
-        overall_existing.last_calculated = datetime.now()
-    else:
-        score = CoverageScore(
-            user_id=user.id,
-            category="overall",
-            score_total=overall["score"],
-            score_breakdown=json.dumps(overall["breakdown"]),
-            insights=json.dumps(overall["insights"]),
-        )
-        db.add(score)
+            existing[row.category] = row
+    for cat, data in {**category_scores, "overall": overall}.items():
+        row = existing.pop(cat, None)
+        if row is None:
+            row = CoverageScore(user_id=user_id, category=cat)
+            db.add(row)
+        row.score_total = data["score"]
+        row.score_breakdown = json.dumps(data["breakdown"])
+        row.insights = json.dumps(data["insights"])
+        row.last_calculated = datetime.now()
+        row.data_version = version
+    for row in existing.values():
+        db.delete(row)
 
     db.commit()
 
@@ -364,21 +342,61 @@ def get_coverage_scores(
     }
 
 
+def _stored_scores(db: Session, user_id: int) -> tuple[dict | None, bool]:
+    """The user's stored scores in the response shape, and whether they predate the user's data.
+
+    (None, True) if there are none yet.
+    """
+    rows = db.execute(
+        select(CoverageScore).where(CoverageScore.user_id == user_id).order_by(CoverageScore.id)
+    ).scalars().all()
+    by_category = {r.category: r for r in rows}
+    if "overall" not in by_category:
+        return None, True
+    version = get_data_version(db, user_id)
+    stale = any(r.data_version != version for r in by_category.values())
+
+    def unpack(row: CoverageScore) -> dict:
+        return {
+            "score": row.score_total,
+            "breakdown": json.loads(row.score_breakdown) if row.score_breakdown else {},
+            "insights": json.loads(row.insights) if row.insights else [],
+        }
+
+    policy_count = db.execute(
+        select(func.count(Policy.id)).where(Policy.user_id == user_id, Policy.carrier != PLACEHOLDER_CARRIER)
+    ).scalar()
+    return {
+        "overall": unpack(by_category["overall"]),
+        "categories": {cat: unpack(by_category[cat]) for cat in [*CATEGORIES, "renters"] if cat in by_category},
+        "policy_count": policy_count,
+    }, stale
+
+
+@router.get("")
+async def get_coverage_scores(
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async)
+):
+    """Get all coverage scores for the current user (stored; recomputed in the background after changes)."""
+    scores, stale = await db.run_sync(_stored_scores, user.id)
+    if scores is None:
+        # First view: nothing stored to serve yet
+        return await db.run_sync(_score_user, user.id)
+    if stale and not score_queue.enqueue([user.id]):
+        return await db.run_sync(_score_user, user.id)
+    return scores
+
+
 @router.post("/recalculate")
 def recalculate_scores(
+    response: Response,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    """Force recalculation of coverage scores."""
-    # Delete existing scores
-    existing = db.execute(
-        select(CoverageScore).where(CoverageScore.user_id == user.id)
-    ).scalars().all()
-
-    for score in existing:
-        db.delete(score)
-
-    db.commit()
-
-    # Recalculate
-    return get_coverage_scores(db=db, user=user)
+    """Queue a recalculation of the user's coverage scores and return the stored ones meanwhile (202)."""
+    scores, _ = _stored_scores(db, user.id)
+    if scores is None or not score_queue.enqueue([user.id], immediate=True):
+        return _score_user(db, user.id)
+    response.status_code = 202
+    return scores
@@ -1,6 +1,6 @@
 from datetime import date
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
@@ -10,6 +10,7 @@ from .email import send_share_email
 from .models import Policy, User
 from .models_features import PolicyShare
 from .audit_helper import log_action
+from .pagination import MAX_PAGE_SIZE, apply_keyset, page_rows, page_size
 from .schemas import ShareCreate, ShareOut, BulkShareCreate, BulkShareResult
 
 router = APIRouter(tags=["sharing"])
@@ -120,9 +121,17 @@ def list_shares(policy_id: int, db: Session = Depends(get_db), user: User = Depe
 
 
 @router.get("/policies/shared-with-me")
-def shared_with_me(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+def shared_with_me(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    # Most recently shared first; all shares unless a limit/cursor is given
+    limit = page_size(limit, cursor)
     today = date.today()
-    rows = db.execute(
+    stmt = (
         select(PolicyShare, Policy)
         .join(Policy, PolicyShare.policy_id == Policy.id)
         .where(PolicyShare.shared_with_email == user.email)
@@ -130,7 +139,9 @@ def shared_with_me(db: Session = Depends(get_db), user: User = Depends(get_curre
         .where(
             (PolicyShare.expires_at.is_(None)) | (PolicyShare.expires_at >= today)
         )
-    ).all()
+    )
+    stmt = apply_keyset(stmt, [PolicyShare.id], cursor, limit, [int])
+    rows = page_rows(response, db.execute(stmt).all(), limit, key=lambda row: (row[0].id,))
 
     return [
         {
@@ -0,0 +1,332 @@
+"""
+Batch coverage scoring with NumPy.
+
+``_score_user`` (routes_scores.py) scores one user at a time, walking the
+policy dicts once per category. Agents only saw a client's score once the
+client had opened their own dashboard. This module scores many users in one
+pass, for the nightly batch and agent books:
+
+1. load every policy of the batch as columns (user index, type code, coverage,
+   created day) plus the auto policies' ``coverage_type`` detail,
+2. reduce per user and category with ``bincount`` / ``maximum.at``,
+3. apply the ``calculate_category_score`` rules to whole arrays, then the
+   weighted overall score.
+
+Results are the dicts ``_score_user`` returns, exactly: same breakdowns,
+insights, rounding (round-half-even, truncating partial credit) and renters
+handling. ``store()`` writes them as CoverageScore rows stamped with the
+users' data versions, so GET /coverage-scores serves them as current.
+
+    python -m app.score_batch                  # every user
+    python -m app.score_batch --user 12 40     # some users
+    python -m app.score_batch --dry-run        # compute and time only
+
+Needs numpy (requirements.txt); the API itself doesn't import this module.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+
+from .models import Policy, PolicyDetail, User
+from .models_features import CoverageScore, UserDataVersion
+from .routes_scores import (
+    ADEQUACY_THRESHOLDS, CATEGORIES, CATEGORY_WEIGHTS, PLACEHOLDER_CARRIER, SCORING_WEIGHTS,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Type codes: the scored categories, then renters; anything else is -1
+_TYPES = [*CATEGORIES, "renters"]
+_CODE = {name: i for i, name in enumerate(_TYPES)}
+_NO_DATE = -1
+
+
+@dataclass
+class PolicyColumns:
+    """A batch of users' policies (placeholders excluded), one array entry per policy."""
+    user_ids: np.ndarray  # the batch's users, sorted; rows below index into it
+    user: np.ndarray  # index into user_ids
+    type_code: np.ndarray
+    coverage: np.ndarray  # coverage_amount, None as 0
+    created: np.ndarray  # created_at as a date ordinal, _NO_DATE if missing
+    comprehensive: np.ndarray  # auto policies: what their coverage_type detail says
+    collision: np.ndarray
+    uninsured: np.ndarray
+
+
+def load(conn: Connection, user_ids: Iterable[int]) -> PolicyColumns:
+    users = np.array(sorted(set(user_ids)), dtype=np.int64)
+    ids = users.tolist()
+    rows = conn.execute(
+        select(Policy.id, Policy.user_id, Policy.policy_type, Policy.coverage_amount, Policy.created_at)
+        .where(Policy.user_id.in_(ids), Policy.carrier != PLACEHOLDER_CARRIER)
+        .order_by(Policy.id)
+    ).all()
+    n = len(rows)
+    policy_ids, owners, types, coverages, created = zip(*rows) if rows else ((),) * 5
+
+    # Last coverage_type detail of each auto policy wins, as in the per-user path's dict
+    coverage_type = {}
+    for pid, value in conn.execute(
+        select(PolicyDetail.policy_id, PolicyDetail.field_value)
+        .join(Policy, Policy.id == PolicyDetail.policy_id)
+        .where(
+            Policy.user_id.in_(ids), Policy.carrier != PLACEHOLDER_CARRIER,
+            func.lower(Policy.policy_type) == "auto", func.lower(PolicyDetail.field_name) == "coverage_type",
+        )
+        .order_by(PolicyDetail.id)
+    ):
+        coverage_type[pid] = (value or "").lower()
+    texts = [coverage_type.get(pid, "") for pid in policy_ids]
+
+    return PolicyColumns(
+        user_ids=users,
+        user=np.searchsorted(users, np.fromiter(owners, np.int64, n)),
+        type_code=np.fromiter((_CODE.get(t.lower(), -1) for t in types), np.int8, n),
+        coverage=np.fromiter((c or 0 for c in coverages), np.int64, n),
+        created=np.fromiter((c.toordinal() if c else _NO_DATE for c in created), np.int64, n),
+        comprehensive=np.fromiter(("comprehensive" in t for t in texts), bool, n),
+        collision=np.fromiter(("collision" in t for t in texts), bool, n),
+        uninsured=np.fromiter(("uninsured" in t for t in texts), bool, n),
+    )
+
+
+def _truncated(weight: int, ratio: np.ndarray) -> np.ndarray:
+    # int(weight * ratio) per element
+    return np.trunc(weight * ratio).astype(np.int64)
+
+
+class _Category:
+    """Breakdown columns and insight masks of one category for every user in the batch.
+
+    Only meaningful for users with a policy of the category; the others score 0.
+    """
+
+    def __init__(self, name: str, has_policy: np.ndarray):
+        self.name = name
+        self.has_policy = has_policy
+        self.parts: list[tuple[str, np.ndarray]] = []
+        self.insights: list[tuple[str, np.ndarray]] = []
+
+    def part(self, key: str, values):
+        self.parts.append((key, np.broadcast_to(np.asarray(values, dtype=np.int64), self.has_policy.shape)))
+
+    def insight(self, text: str, mask: np.ndarray):
+        # Users without a policy get only the "No ... policy found" insight (added when assembling)
+        self.insights.append((text, mask))
+
+    def scores(self) -> np.ndarray:
+        total_weight = sum(SCORING_WEIGHTS[self.name].values())
+        points = sum((values for _, values in self.parts), np.zeros(self.has_policy.shape, np.int64))
+        points = np.where(self.has_policy, points, 0)  # without a policy only has_policy (0) counts
+        return np.rint(points / total_weight * 100).astype(np.int64)
+
+
+def compute(cols: PolicyColumns, today: date | None = None) -> dict[int, dict]:
+    """Every user's category and overall scores, as ``_score_user`` returns them."""
+    today = today or date.today()
+    n_users = len(cols.user_ids)
+
+    def count(mask):
+        return np.bincount(cols.user[mask], minlength=n_users)
+
+    def max_coverage(mask):
+        out = np.zeros(n_users, np.int64)
+        present = count(mask) > 0
+        if present.any():
+            out[present] = np.iinfo(np.int64).min  # so negative amounts stay exact, like max()
+            np.maximum.at(out, cols.user[mask], cols.coverage[mask])
+        return out
+
+    categories = []
+    for name in CATEGORIES:
+        weights = SCORING_WEIGHTS[name]
+        is_type = cols.type_code == _CODE[name]
+        has = count(is_type) > 0
+        cat = _Category(name, has)
+        cat.part("has_policy", weights["has_policy"])
+        best = max_coverage(is_type)
+
+        if name == "auto":
+            threshold = ADEQUACY_THRESHOLDS["auto_liability"]
+            ok = best >= threshold
+            cat.part("liability_adequate",
+                     np.where(ok, weights["liability_adequate"], _truncated(weights["liability_adequate"], best / threshold)))
+            cat.insight("Consider increasing liability to $100k+", ~ok)
+            flags = {key: count(is_type & col) > 0 for key, col in (
+                ("comprehensive", cols.comprehensive), ("collision", cols.collision),
+                ("uninsured_motorist", cols.uninsured),
+            )}
+            for key, flag in flags.items():
+                cat.part(key, np.where(flag, weights[key], int(weights[key] * 0.5)))
+            cat.insight("Verify uninsured motorist coverage", ~flags["uninsured_motorist"])
+
+        elif name == "home":
+            ok = best >= ADEQUACY_THRESHOLDS["home_dwelling"]
+            cat.part("dwelling_adequate", np.where(ok, weights["dwelling_adequate"], int(weights["dwelling_adequate"] * 0.5)))
+            cat.insight("Review dwelling coverage amount", ~ok)
+            cat.part("liability", weights["liability"])
+            cat.part("property", weights["property"])
+            newest = np.full(n_users, _NO_DATE, np.int64)
+            np.maximum.at(newest, cols.user[is_type], cols.created[is_type])
+            dated = newest != _NO_DATE
+            recent = dated & ((today.toordinal() - newest) / 365 <= 2)
+            cat.part("recent_review", np.where(
+                dated, np.where(recent, weights["recent_review"], 0), int(weights["recent_review"] * 0.5)))
+            cat.insight("Policy hasn't been reviewed in 2+ years", dated & ~recent)
+
+        elif name == "life":
+            weight = weights["coverage_adequate"]
+            cat.part("coverage_adequate", np.select(
+                [best >= 500000, best >= 250000], [weight, int(weight * 0.7)], int(weight * 0.4)))
+            cat.insight("Consider increasing life coverage", best < 250000)
+            cat.part("term_appropriate", weights["term_appropriate"])
+
+        elif name == "umbrella":
+            threshold = ADEQUACY_THRESHOLDS["umbrella_limit"]
+            ok = best >= threshold
+            cat.part("limit_adequate", np.where(ok, weights["limit_adequate"], _truncated(weights["limit_adequate"], best / threshold)))
+            cat.insight("Consider $1M+ umbrella coverage", ~ok)
+
+        elif name == "general_liability":
+            threshold = ADEQUACY_THRESHOLDS["gl_per_occurrence"]
+            ok = best >= threshold
+            cat.part("limit_adequate", np.where(
+                ok, weights["limit_adequate"], _truncated(weights["limit_adequate"], np.minimum(1.0, best / threshold))))
+            cat.insight("Consider $1M+ per-occurrence GL limit", ~ok)
+            cat.part("aggregate_adequate", weights["aggregate_adequate"])
+
+        else:  # professional_liability, commercial_property, cyber
+            threshold = ADEQUACY_THRESHOLDS.get(f"{name}_limit", ADEQUACY_THRESHOLDS.get(name, 1000000))
+            if "limit_adequate" in weights:
+                weight = weights["limit_adequate"]
+                partial = np.where(best > 0, _truncated(weight, np.minimum(1.0, best / threshold)), int(weight * 0.5))
+                cat.part("limit_adequate", np.where(best >= threshold, weight, partial))
+            if "coverage_adequate" in weights:
+                weight = weights["coverage_adequate"]
+                cat.part("coverage_adequate", np.where(best > 0, weight, int(weight * 0.5)))
+        categories.append(cat)
+
+    # Renters stands in for home: a flat 70 when the user has renters but no home policy
+    renters = (count(cols.type_code == _CODE["renters"]) > 0) & ~categories[CATEGORIES.index("home")].has_policy
+
+    scores = np.stack([cat.scores() for cat in categories] + [np.where(renters, 70, 0)], axis=1)
+    present = np.ones_like(scores, dtype=bool)
+    present[:, -1] = renters
+    weights = np.array([CATEGORY_WEIGHTS.get(name, 10) for name in _TYPES], np.int64)
+    counted = present & (scores > 0)
+    weighted_sum = (scores * weights * counted).sum(axis=1)
+    total_weight = (weights * counted).sum(axis=1)
+    overall = np.where(total_weight > 0, np.rint(weighted_sum / np.maximum(total_weight, 1)), 0).astype(np.int64)
+    policy_count = np.bincount(cols.user, minlength=n_users)
+
+    # Assemble the dicts; plain lists are much faster to index than arrays here
+    columns = [(
+        cat.name, cat.has_policy.tolist(), scores[:, i].tolist(),
+        [(key, values.tolist()) for key, values in cat.parts],
+        [(text, mask.tolist()) for text, mask in cat.insights],
+    ) for i, cat in enumerate(categories)]
+    renters_list, overall_list, count_list = renters.tolist(), overall.tolist(), policy_count.tolist()
+    results = {}
+    for u, user_id in enumerate(cols.user_ids.tolist()):
+        category_scores = {}
+        insights_all = []
+        for name, has, cat_scores, parts, insights in columns:
+            if has[u]:
+                breakdown = {key: values[u] for key, values in parts}
+                insights = [text for text, mask in insights if mask[u]]
+            else:
+                breakdown, insights = {"has_policy": 0}, [f"No {name} policy found"]
+            category_scores[name] = {"score": cat_scores[u], "breakdown": breakdown, "insights": insights}
+            insights_all.extend(insights)
+        if renters_list[u]:
+            category_scores["renters"] = {"score": 70, "breakdown": {"has_policy": 70}, "insights": []}
+        results[user_id] = {
+            "overall": {
+                "score": overall_list[u],
+                "breakdown": {name: data["score"] for name, data in category_scores.items()},
+                "insights": insights_all[:5],
+            },
+            "categories": category_scores,
+            "policy_count": count_list[u],
+        }
+    return results
+
+
+def data_versions(conn: Connection, user_ids: list[int]) -> dict[int, str]:
+    """Current data version stamp per user ("0" for never written, as get_data_version)."""
+    stamps = dict(conn.execute(
+        select(UserDataVersion.user_id, UserDataVersion.stamp).where(UserDataVersion.user_id.in_(user_ids))
+    ).all())
+    return {uid: stamps.get(uid) or "0" for uid in user_ids}
+
+
+def store(conn: Connection, results: dict[int, dict], versions: dict[int, str]):
+    """Replace the users' CoverageScore rows with ``results`` and refresh their portfolio stats."""
+    from .portfolio_stats import refresh
+
+    user_ids = list(results)
+    now = datetime.now()
+    rows = [
+        {
+            "user_id": uid, "category": category, "score_total": data["score"],
+            "score_breakdown": json.dumps(data["breakdown"]), "insights": json.dumps(data["insights"]),
+            "last_calculated": now, "data_version": versions[uid],
+        }
+        for uid, result in results.items()
+        for category, data in [*result["categories"].items(), ("overall", result["overall"])]
+    ]
+    conn.execute(delete(CoverageScore).where(CoverageScore.user_id.in_(user_ids)))
+    if rows:
+        conn.execute(insert(CoverageScore), rows)
+    refresh(conn, user_ids)  # core statements bypass the stats flush hooks
+
+
+def score_users(conn: Connection, user_ids: list[int], dry_run: bool = False, today: date | None = None) -> dict[int, dict]:
+    """Load, compute and (unless ``dry_run``) store one batch. Returns the results."""
+    versions = data_versions(conn, user_ids)  # before reading policies: a concurrent change leaves the rows stale
+    results = compute(load(conn, user_ids), today)
+    if not dry_run:
+        store(conn, results, versions)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.score_batch")
+    parser.add_argument("--user", type=int, nargs="*", help="only these user ids")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="users per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="compute without storing")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from .db import engine
+
+    with engine.connect() as conn:
+        user_ids = args.user or list(conn.execute(select(User.id).order_by(User.id)).scalars())
+    start = time.perf_counter()
+    for i in range(0, len(user_ids), args.batch_size):
+        batch = user_ids[i:i + args.batch_size]
+        with engine.begin() as conn:
+            score_users(conn, batch, dry_run=args.dry_run)
+        logger.info("Scored %d/%d users", min(i + args.batch_size, len(user_ids)), len(user_ids))
+    elapsed = time.perf_counter() - start
+    rate = len(user_ids) / elapsed * 60 if elapsed else 0
+    print(f"Scored {len(user_ids)} users in {elapsed:.1f}s ({rate:,.0f} users/min)"
+          f"{' (dry run, nothing stored)' if args.dry_run else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Background coverage score recomputation.
+
+GET /coverage-scores serves the stored ``coverage_scores`` rows; scores are
+recomputed here, off the request path:
+
+- A commit that changes a user's policies or policy details queues the user.
+  The job runs ``score_debounce_ms`` after the user's last such commit, so a
+  burst of edits (an extraction writing dozens of details) costs one
+  recompute, but never later than ``score_max_delay_ms`` after the first.
+- POST /coverage-scores/recalculate queues the user with no delay.
+- Every score row records the data version (see data_version.py) it was
+  computed from. A GET that finds rows from an older version serves them and
+  queues the user. That covers what this worker's hook can't see: other
+  workers' writes (queued over there, but a GET may land here first) and
+  jobs lost when a worker exited before running them.
+
+One thread per worker runs the jobs, one user at a time, each in its own
+session. ``stop()`` runs whatever is still queued.
+"""
+
+import logging
+import threading
+import time
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .data_version import _owner_id
+from .models import Policy, PolicyDetail
+
+logger = logging.getLogger(__name__)
+
+_INFO_KEY = "score_users"
+
+
+class ScoreQueue:
+    def __init__(self, debounce_ms: int, max_delay_ms: int):
+        self.debounce = debounce_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.computed = 0
+        self.errors = 0
+        self._due: dict[int, float] = {}  # user_id -> monotonic time to run
+        self._first: dict[int, float] = {}  # user_id -> when first queued (caps the debounce)
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._due)
+
+    def start(self):
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="score-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        """Stop the thread, then run every queued job."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        with self._cond:
+            self._cond.notify_all()
+        thread.join(timeout)
+        self.run_due(everything=True)
+
+    def enqueue(self, user_ids: Iterable[int], immediate: bool = False) -> bool:
+        """Queue recomputes. False (nothing queued) if the queue isn't running."""
+        if not self.running:
+            return False
+        now = time.monotonic()
+        with self._cond:
+            for uid in user_ids:
+                first = self._first.setdefault(uid, now)
+                current = self._due.get(uid)
+                if immediate or current is None or current > now:  # never push back a job that's due
+                    self._due[uid] = now if immediate else min(now + self.debounce, first + self.max_delay)
+            self._cond.notify_all()
+        return True
+
+    def run_due(self, everything: bool = False) -> int:
+        """Run the jobs that are due (or all of them). Returns how many ran."""
+        now = time.monotonic()
+        with self._cond:
+            users = [uid for uid, due in self._due.items() if everything or due <= now]
+            for uid in users:
+                del self._due[uid]
+                self._first.pop(uid, None)
+        for uid in users:
+            self._compute(uid)
+        return len(users)
+
+    def _run(self):
+        while self._thread is not None:
+            with self._cond:
+                if not self._due:
+                    self._cond.wait()
+                else:
+                    self._cond.wait(max(0.0, min(self._due.values()) - time.monotonic()))
+            self.run_due()
+
+    def _compute(self, user_id: int):
+        from .db import SessionLocal
+        from .routes_scores import _score_user
+
+        try:
+            with SessionLocal() as db:
+                _score_user(db, user_id)
+            self.computed += 1
+        except Exception:
+            self.errors += 1
+            logger.exception("Coverage score recompute for user %d failed", user_id)
+
+
+score_queue = ScoreQueue(debounce_ms=settings.score_debounce_ms, max_delay_ms=settings.score_max_delay_ms)
+
+
+# ── Session hooks ────────────────────────────────────
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_score_users(session: Session, flush_context):
+    # After the flush so details added through a relationship have their policy_id
+    users = session.info.setdefault(_INFO_KEY, set())
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, (Policy, PolicyDetail)):
+            users.add(_owner_id(session, obj))
+    for obj in session.dirty:
+        if isinstance(obj, (Policy, PolicyDetail)) and session.is_modified(obj, include_collections=False):
+            users.add(_owner_id(session, obj))
+    users.discard(None)
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_committed(session: Session):
+    users = session.info.pop(_INFO_KEY, None)
+    if users:
+        score_queue.enqueue(users)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session):
+    session.info.pop(_INFO_KEY, None)
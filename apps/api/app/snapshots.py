@@ -0,0 +1,66 @@
+"""
+Per-user results precomputed by the nightly batch (see batch.py).
+
+A snapshot is one user's JSON payload of one kind (the GET /gaps body, the
+GET /reminders/smart alerts), stamped with the user's data version, the day
+it was computed for and a hash of the code that computes it. Read paths serve
+a snapshot only while all three still hold and compute as before otherwise,
+so a snapshot is never stale, at worst missing: users who changed something
+since the batch ran, or who signed up after it, get the live computation.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models_features import UserDataVersion, UserSnapshot
+
+# Source files each kind's payload is computed by; editing one retires its snapshots
+SOURCES = {
+    "gaps": ("coverage_taxonomy.py", "gap_engine.py", "routes_gaps.py"),
+    "smart_reminders": ("routes_reminders.py",),
+}
+
+CODE_VERSIONS = {
+    kind: hashlib.sha1(b"".join((Path(__file__).parent / name).read_bytes() for name in names)).hexdigest()[:16]
+    for kind, names in SOURCES.items()
+}
+
+
+def load_snapshot(db: Session, user_id: int, kind: str, today: date) -> Any | None:
+    """The user's ``kind`` payload if one was computed for ``today`` from their current data, else None."""
+    current = (
+        select(UserDataVersion.stamp).where(UserDataVersion.user_id == user_id).scalar_subquery()
+    )
+    payload = db.execute(
+        select(UserSnapshot.payload).where(
+            UserSnapshot.user_id == user_id,
+            UserSnapshot.kind == kind,
+            UserSnapshot.computed_for == today,
+            UserSnapshot.code_version == CODE_VERSIONS[kind],
+            UserSnapshot.data_version == func.coalesce(current, "0"),
+        )
+    ).scalar()
+    return json.loads(payload) if payload is not None else None
+
+
+def store_snapshots(conn: Connection, kind: str, payloads: dict[int, Any], versions: dict[int, str], today: date):
+    """Replace the users' ``kind`` snapshots with ``payloads`` (``versions``: data versions read before computing)."""
+    user_ids = list(payloads)
+    if not user_ids:
+        return
+    now = datetime.now()
+    conn.execute(delete(UserSnapshot).where(UserSnapshot.kind == kind, UserSnapshot.user_id.in_(user_ids)))
+    conn.execute(insert(UserSnapshot), [
+        {
+            "user_id": uid, "kind": kind, "data_version": versions[uid], "code_version": CODE_VERSIONS[kind],
+            "computed_for": today, "payload": json.dumps(payload), "computed_at": now,
+        }
+        for uid, payload in payloads.items()
+    ])
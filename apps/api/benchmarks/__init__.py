@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the Covrabl API.
+
+Run from apps/api, e.g. ``python -m benchmarks.chat_modes``. Each script seeds a
+throwaway SQLite database unless DATABASE_URL is already set.
+"""
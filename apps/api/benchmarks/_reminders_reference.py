@@ -0,0 +1,142 @@
+"""
+GET /reminders/smart as it was before the batch (two premium queries per
+policy), kept verbatim as the reference benchmarks/nightly_batch.py checks
+build_smart_reminders against.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Policy, User
+from app.models_features import Premium, Certificate
+from app.routes_reminders import to_date
+
+
+def smart_reminders(db: Session, user: User):
+    """Generate contextual reminders: overdue premiums, upcoming renewals, annual reviews."""
+    today = date.today()
+    alerts = []
+
+    policies = db.execute(
+        select(Policy).where(Policy.user_id == user.id)
+    ).scalars().all()
+
+    for p in policies:
+        label = p.nickname or p.carrier
+
+        # Overdue premium (unpaid and past due)
+        overdue = db.execute(
+            select(Premium)
+            .where(Premium.policy_id == p.id)
+            .where(Premium.paid_date == None)  # noqa: E711
+            .where(Premium.due_date < today)
+            .order_by(Premium.due_date)
+        ).scalars().first()
+        if overdue:
+            due = to_date(overdue.due_date)
+            if due:
+                days_late = (today - due).days
+                alerts.append({
+                    "type": "overdue_payment",
+                    "severity": "high" if days_late > 14 else "medium",
+                    "policy_id": p.id,
+                    "title": f"Overdue payment: {label}",
+                    "description": f"${overdue.amount / 100:.2f} was due {due} ({days_late} days ago)",
+                    "action": "Mark as paid or make payment",
+                })
+
+        # Upcoming premium (due within 7 days)
+        upcoming_prem = db.execute(
+            select(Premium)
+            .where(Premium.policy_id == p.id)
+            .where(Premium.paid_date == None)  # noqa: E711
+            .where(Premium.due_date >= today)
+            .where(Premium.due_date <= today + timedelta(days=7))
+            .order_by(Premium.due_date)
+        ).scalars().first()
+        if upcoming_prem:
+            due = to_date(upcoming_prem.due_date)
+            if due:
+                days_until = (due - today).days
+                alerts.append({
+                    "type": "upcoming_payment",
+                    "severity": "low",
+                    "policy_id": p.id,
+                    "title": f"Payment due soon: {label}",
+                    "description": f"${upcoming_prem.amount / 100:.2f} due in {days_until} day{'s' if days_until != 1 else ''} ({due})",
+                    "action": "Review payment",
+                })
+
+        # Renewal within 30 days
+        renewal = to_date(p.renewal_date)
+        if renewal:
+            days_to_renewal = (renewal - today).days
+            if 0 < days_to_renewal <= 30:
+                alerts.append({
+                    "type": "renewal",
+                    "severity": "medium" if days_to_renewal <= 14 else "low",
+                    "policy_id": p.id,
+                    "title": f"Renewal approaching: {label}",
+                    "description": f"Renews in {days_to_renewal} days ({renewal}). Shop for better rates now.",
+                    "action": "Review policy before renewal",
+                })
+            elif days_to_renewal <= 0 and days_to_renewal > -30:
+                alerts.append({
+                    "type": "expired",
+                    "severity": "high",
+                    "policy_id": p.id,
+                    "title": f"Policy may have expired: {label}",
+                    "description": f"Renewal date was {renewal} ({abs(days_to_renewal)} days ago)",
+                    "action": "Verify policy status with carrier",
+                })
+
+        # Annual review (policy older than 11 months without update)
+        created = to_date(p.created_at)
+        if created:
+            days_old = (today - created).days
+            if days_old > 335 and days_old % 365 < 30:
+                alerts.append({
+                    "type": "annual_review",
+                    "severity": "low",
+                    "policy_id": p.id,
+                    "title": f"Annual review: {label}",
+                    "description": "It's been about a year. Review coverage, limits, and beneficiaries.",
+                    "action": "Review policy details",
+                })
+
+    # Certificate expiration alerts
+    certificates = db.execute(
+        select(Certificate).where(Certificate.user_id == user.id)
+    ).scalars().all()
+    for cert in certificates:
+        exp = to_date(cert.expiration_date)
+        if not exp:
+            continue
+        days_until = (exp - today).days
+        label = f"{cert.counterparty_name} ({cert.direction} COI)"
+        if days_until < 0 and days_until > -90:
+            alerts.append({
+                "type": "certificate_expired",
+                "severity": "high",
+                "policy_id": cert.policy_id or 0,
+                "title": f"COI expired: {label}",
+                "description": f"Expired {abs(days_until)} days ago. Request updated certificate.",
+                "action": "Request updated COI",
+            })
+        elif 0 <= days_until <= 90:
+            sev = "high" if days_until <= 30 else "medium" if days_until <= 60 else "low"
+            alerts.append({
+                "type": "certificate_expiring",
+                "severity": sev,
+                "policy_id": cert.policy_id or 0,
+                "title": f"COI expiring: {label}",
+                "description": f"Expires in {days_until} days.",
+                "action": "Request renewal or updated COI",
+            })
+
+    # Sort by severity
+    severity_order = {"high": 0, "medium": 1, "low": 2}
+    alerts.sort(key=lambda a: severity_order.get(a["severity"], 3))
+    return alerts
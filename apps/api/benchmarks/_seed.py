@@ -0,0 +1,116 @@
+"""Synthetic data shared by the benchmark scripts."""
+
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+
+def use_temp_database() -> str:
+    """Point the app at a throwaway SQLite file (and audit journal). Must run before importing app.*"""
+    if not os.environ.get("DATABASE_URL"):
+        fd, path = tempfile.mkstemp(prefix="covrabl_bench_", suffix=".db")
+        os.close(fd)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("AUDIT_JOURNAL_DIR", tempfile.mkdtemp(prefix="covrabl_audit_"))
+    return os.environ["DATABASE_URL"]
+
+
+def create_schema():
+    import main  # noqa: F401 — registers every model and the flush hooks
+    from app.db import engine
+    from app.migrations import migrate
+    migrate(engine)
+
+
+POLICY_TYPES = ["auto", "home", "life", "umbrella", "renters", "health", "general_liability", "cyber"]
+CARRIERS = ["State Farm", "Allstate", "Progressive", "GEICO", "Liberty Mutual", "Chubb", "Travelers"]
+DETAIL_FIELDS = [
+    ("coverage_type", "comprehensive, collision, uninsured motorist"),
+    ("liability_limit", "$100,000/$300,000"),
+    ("roadside_assistance", "included"),
+    ("dwelling_coverage", "$450,000"),
+    ("water_backup", "excluded — sewer backup and sump pump overflow not covered"),
+    ("flood_zone", "X"),
+    ("year_built", "1994"),
+    ("beneficiary", "Jane Doe"),
+]
+
+
+def seed_portfolios(
+    db,
+    n_users: int,
+    policies_per_user: int = 6,
+    details_per_policy: int = 6,
+    contacts_per_policy: int = 2,
+    seed: int = 42,
+) -> list[int]:
+    """Bulk-insert users with policies, contacts and details. Returns the user ids."""
+    from sqlalchemy import insert, select, func
+    from app.models import User, Policy, Contact, PolicyDetail
+
+    rng = random.Random(seed)
+    today = date.today()
+    first_user = (db.execute(select(func.max(User.id))).scalar() or 0) + 1
+
+    users = [
+        {"id": first_user + i, "email": f"bench{first_user + i}@example.com", "hashed_password": "x"}
+        for i in range(n_users)
+    ]
+    db.execute(insert(User), users)
+
+    first_policy = (db.execute(select(func.max(Policy.id))).scalar() or 0) + 1
+    policies, contacts, details = [], [], []
+    pid = first_policy
+    for u in users:
+        for _ in range(policies_per_user):
+            ptype = rng.choice(POLICY_TYPES)
+            policies.append({
+                "id": pid,
+                "user_id": u["id"],
+                "scope": "business" if ptype in ("general_liability", "cyber") else "personal",
+                "policy_type": ptype,
+                "carrier": rng.choice(CARRIERS),
+                "policy_number": f"P-{pid:08d}",
+                "status": "active",
+                "coverage_amount": rng.choice([None, 50_000, 100_000, 300_000, 1_000_000]),
+                "deductible": rng.choice([None, 500, 1000, 2500]),
+                "premium_amount": rng.randint(300, 4000),
+                "renewal_date": today + timedelta(days=rng.randint(-20, 365)),
+            })
+            for c in range(contacts_per_policy):
+                contacts.append({
+                    "policy_id": pid,
+                    "role": "claims" if c == 0 else "agent",
+                    "name": f"Contact {c}",
+                    "phone": "(800) 555-0100" if rng.random() > 0.2 else None,
+                })
+            for name, value in rng.sample(DETAIL_FIELDS, min(details_per_policy, len(DETAIL_FIELDS))):
+                details.append({"policy_id": pid, "field_name": name, "field_value": value})
+            pid += 1
+
+    for table, rows in ((Policy, policies), (Contact, contacts), (PolicyDetail, details)):
+        for i in range(0, len(rows), 5000):
+            db.execute(insert(table), rows[i:i + 5000])
+    db.commit()
+    return [u["id"] for u in users]
+
+
+@contextmanager
+def timed(label: str, results: dict | None = None):
+    start = time.perf_counter()
+    yield
+    elapsed = (time.perf_counter() - start) * 1000
+    if results is not None:
+        results[label] = elapsed
+    print(f"{label:<40} {elapsed:10.2f} ms")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
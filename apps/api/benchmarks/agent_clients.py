@@ -0,0 +1,150 @@
+"""
+Benchmark GET /agent/clients on a large book of business.
+
+    python -m benchmarks.agent_clients [--clients 10000] [--policies 10] [--legacy]
+
+Seeds one agent with N clients (10 policies each by default, all shared with the
+agent as broker, most with an overall score), then times the endpoint through
+the app: a first page, a deep page via cursor, sorted and filtered pages, and
+the full unpaginated list. The target is under 100 ms per page. --legacy also
+times the old per-client loop and checks both return the same rows.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+TARGET_MS = 100
+
+
+def _seed(db, n_clients: int, policies_per_client: int) -> int:
+    from sqlalchemy import insert, select
+    from app.models import User, Policy
+    from app.models_features import PolicyShare, CoverageScore
+    from app.portfolio_stats import refresh
+
+    agent_id, = seed_portfolios(db, 1, policies_per_user=0)
+    agent = db.get(User, agent_id)
+    agent.role = "agent"
+    client_ids = seed_portfolios(db, n_clients, policies_per_user=policies_per_client,
+                                 details_per_policy=0, contacts_per_policy=0)
+    rng = random.Random(3)
+    shares = [
+        {"policy_id": pid, "owner_id": uid, "shared_with_email": agent.email,
+         "permission": "view", "role_label": "broker", "accepted": True}
+        for pid, uid in db.execute(select(Policy.id, Policy.user_id).where(Policy.user_id.in_(client_ids)))
+    ]
+    scores = [
+        {"user_id": uid, "category": "overall", "score_total": rng.randint(0, 100)}
+        for uid in client_ids if rng.random() < 0.9
+    ]
+    for model, rows in ((PolicyShare, shares), (CoverageScore, scores)):
+        for i in range(0, len(rows), 5000):
+            db.execute(insert(model), rows[i:i + 5000])
+    refresh(db.connection(), client_ids)  # bulk inserts bypass the stats flush hooks
+    db.commit()
+    return agent_id
+
+
+def _legacy_list_clients(db, agent_email: str) -> list[dict]:
+    """The per-client loop /agent/clients used before (1 + 4 queries per client)."""
+    from sqlalchemy import select, func
+    from app.models import User, Policy
+    from app.models_features import CoverageScore
+    from app.routes_agent import _client_ids_query
+
+    clients = []
+    for cid in db.execute(_client_ids_query(agent_email)).scalars().all():
+        user = db.get(User, cid)
+        policy_count = db.execute(select(func.count(Policy.id)).where(Policy.user_id == cid)).scalar() or 0
+        score = db.execute(select(CoverageScore.score_total).where(
+            CoverageScore.user_id == cid, CoverageScore.category == "overall")).scalar()
+        today = datetime.now().date()
+        next_renewal = db.execute(select(func.min(Policy.renewal_date)).where(
+            Policy.user_id == cid, Policy.renewal_date >= today)).scalar()
+        clients.append({"id": user.id, "email": user.email, "policy_count": policy_count,
+                        "protection_score": score, "next_renewal": str(next_renewal) if next_renewal else None})
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--policies", type=int, default=10, help="policies per client")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--legacy", action="store_true", help="also time the old per-client loop")
+    args = parser.parse_args()
+
+    create_schema()
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.auth import create_access_token
+    from app.db import SessionLocal, engine
+    from app.models import User
+    from app.query_stats import capture_queries
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    agent_id = _seed(db, args.clients, args.policies)
+    print(f"seeded {args.clients} clients / {args.clients * args.policies} policies "
+          f"in {time.perf_counter() - start:.1f}s")
+    agent_email = db.get(User, agent_id).email
+    db.close()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+
+    headers = {"Authorization": f"Bearer {create_access_token(agent_id)}"}
+    with TestClient(app_main.app) as client:
+        def timed_get(params: dict) -> tuple[float, int, object]:
+            times = []
+            for _ in range(args.repeat):
+                with capture_queries() as stats:
+                    t0 = time.perf_counter()
+                    r = client.get("/agent/clients", params=params, headers=headers)
+                    times.append((time.perf_counter() - t0) * 1000)
+                r.raise_for_status()
+            return statistics.median(times), stats.count, r
+
+        first = client.get("/agent/clients", params={"limit": 50}, headers=headers)
+        cursor = first.headers["X-Next-Cursor"]
+        for _ in range(args.clients // 50 // 2 - 1):  # walk to the middle of the book
+            cursor = client.get("/agent/clients", params={"limit": 50, "cursor": cursor},
+                                headers=headers).headers["X-Next-Cursor"]
+
+        cases = [
+            ("first page (50, by email)", {"limit": 50}),
+            ("middle page via cursor", {"limit": 50, "cursor": cursor}),
+            ("top scores", {"limit": 50, "sort": "protection_score", "order": "desc"}),
+            ("most policies", {"limit": 50, "sort": "policy_count", "order": "desc"}),
+            ("renewing in 30 days", {"limit": 50, "sort": "next_renewal", "renewal_within_days": 30}),
+            ("email filter", {"limit": 50, "q": "bench1"}),
+            ("all clients (no limit)", {}),
+        ]
+        print(f"{'request':<30} {'median ms':>10} {'queries':>8} {'rows':>6}")
+        for label, params in cases:
+            ms, queries, r = timed_get(params)
+            flag = "" if ms < TARGET_MS or "limit" not in params else f"  over {TARGET_MS} ms target"
+            print(f"{label:<30} {ms:10.1f} {queries:8d} {len(r.json()):6d}{flag}")
+
+        if args.legacy:
+            new = client.get("/agent/clients", headers=headers).json()
+            db = SessionLocal()
+            with capture_queries() as stats:
+                t0 = time.perf_counter()
+                old = _legacy_list_clients(db, agent_email)
+                ms = (time.perf_counter() - t0) * 1000
+            db.close()
+            print(f"{'legacy loop (all clients)':<30} {ms:10.1f} {stats.count:8d} {len(old):6d}")
+            same = sorted(old, key=lambda c: c["id"]) == sorted(new, key=lambda c: c["id"])
+            print("legacy and current results match" if same else "MISMATCH between legacy and current results")
+
+
+if __name__ == "__main__":
+    main()
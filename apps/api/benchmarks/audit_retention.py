@@ -0,0 +1,160 @@
+"""
+Audit log retention: archive correctness and the effect on /audit.
+
+    python -m benchmarks.audit_retention [--rows 200000] [--months 36] [--keep 12]
+
+Seeds --rows audit entries spread evenly over the last --months months (most
+for one heavy user, the rest across 50 others), times GET /audit for the heavy
+user (first page with its total, and a cursor page), then runs the retention
+job keeping --keep months and times the same requests again.
+
+Checks that every removed row is in exactly one archive file with the same
+contents, that no kept row was archived, and that a second run finds nothing.
+Exits non-zero if any check fails.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+
+def _seed(db, rows: int, months: int) -> int:
+    from sqlalchemy import insert
+    from app.models_features import AuditLog
+
+    user_ids = seed_portfolios(db, 51, policies_per_user=0)
+    heavy = user_ids[0]
+    rng = random.Random(5)
+    end = datetime.now()
+    span = timedelta(days=months * 30.4).total_seconds()
+    batch = []
+    for i in range(rows):
+        batch.append({
+            "user_id": heavy if rng.random() < 0.6 else rng.choice(user_ids[1:]),
+            "action": rng.choice(["created", "updated", "deleted"]),
+            "entity_type": "policy",
+            "entity_id": i,
+            "details": json.dumps({"n": i}) if i % 5 == 0 else None,
+            "created_at": end - timedelta(seconds=rng.random() * span),
+        })
+        if len(batch) == 5000:
+            db.execute(insert(AuditLog), batch)
+            batch = []
+    if batch:
+        db.execute(insert(AuditLog), batch)
+    db.commit()
+    return heavy
+
+
+def _time_audit(client, headers, repeat: int) -> tuple[float, float]:
+    first = client.get("/audit", params={"limit": 20}, headers=headers)
+    first.raise_for_status()
+    cursor = first.json()["next_cursor"]
+
+    def median(params):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            client.get("/audit", params=params, headers=headers).raise_for_status()
+            times.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(times)
+    return median({"limit": 20}), median({"limit": 20, "cursor": cursor})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--months", type=int, default=36, help="history spread over this many months")
+    parser.add_argument("--keep", type=int, default=12, help="retention in months")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    create_schema()
+    from sqlalchemy import select, func
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.audit_retention import add_months, month_start, run_retention
+    from app.auth import create_access_token
+    from app.db import SessionLocal, engine
+    from app.models_features import AuditLog
+    from app.config import settings
+
+    db = SessionLocal()
+    t0 = time.perf_counter()
+    heavy = _seed(db, args.rows, args.months)
+    db.close()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    print(f"seeded {args.rows} audit rows over {args.months} months in {time.perf_counter() - t0:.1f}s")
+
+    cutoff = add_months(month_start(date.today()), -args.keep)
+    with engine.connect() as conn:
+        snapshot = {r.id: r for r in conn.execute(select(AuditLog.__table__))}
+    expired_ids = {i for i, r in snapshot.items() if r.created_at < datetime.combine(cutoff, datetime.min.time())}
+
+    headers = {"Authorization": f"Bearer {create_access_token(heavy)}"}
+    archive_dir = tempfile.mkdtemp(prefix="covrabl_archive_")
+    failures = 0
+    with TestClient(app_main.app) as client:
+        before = _time_audit(client, headers, args.repeat)
+
+        t0 = time.perf_counter()
+        results = run_retention(engine, args.keep, archive_dir, settings.audit_partitions_ahead)
+        elapsed = time.perf_counter() - t0
+        archived = sum(count for _, count, _ in results)
+        size = sum(os.path.getsize(p) for _, _, p in results if p)
+        print(f"retention: {len(results)} month(s), {archived} rows archived in {elapsed:.1f}s "
+              f"({size / 1024:.0f} KiB gzip)")
+
+        after = _time_audit(client, headers, args.repeat)
+        print(f"\n{'GET /audit median ms':<28} {'before':>8} {'after':>8}")
+        print(f"{'first page (with total)':<28} {before[0]:8.1f} {after[0]:8.1f}")
+        print(f"{'cursor page':<28} {before[1]:8.1f} {after[1]:8.1f}\n")
+
+    seen: dict[int, dict] = {}
+    for _, _, path in results:
+        if not path:
+            continue
+        with gzip.open(path, "rt") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["id"] in seen:
+                    failures += 1
+                    print(f"row {record['id']} archived twice")
+                seen[record["id"]] = record
+    with engine.connect() as conn:
+        remaining = set(conn.execute(select(AuditLog.id)).scalars())
+        left_expired = conn.execute(
+            select(func.count(AuditLog.id)).where(AuditLog.created_at < datetime.combine(cutoff, datetime.min.time()))
+        ).scalar()
+    mismatched = [i for i, rec in seen.items()
+                  if i not in snapshot or rec["action"] != snapshot[i].action or rec["details"] != snapshot[i].details]
+    checks = [
+        ("every expired row archived", set(seen) == expired_ids),
+        ("archived rows match the database", not mismatched),
+        ("expired rows removed", left_expired == 0 and not (remaining & expired_ids)),
+        ("kept rows untouched", remaining == set(snapshot) - expired_ids),
+        ("second run archives nothing", not run_retention(engine, args.keep, archive_dir,
+                                                          settings.audit_partitions_ahead)),
+    ]
+    for label, ok in checks:
+        failures += not ok
+        print(f"{label:<36} {'ok' if ok else 'FAILED'}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Write-endpoint latency with synchronous vs buffered audit logging, plus a crash check.
+
+    python -m benchmarks.audit_writes [--ops 300] [--rtt-ms 0] [--crash-check]
+
+Times create / update / delete of a policy through the app (each writes one
+audit entry) in three modes: the old synchronous INSERT + flush in the request
+transaction, the buffered writer with an fsync'd journal, and the buffered
+writer without fsync. --rtt-ms adds that much sleep to every statement, to
+approximate a database across the network (SQLite in a temp file is local).
+After each mode it checks that audit_logs holds exactly one row per request.
+
+--crash-check kills a child process after it has committed entries: some of
+its journal segments not yet inserted, one inserted but not yet deleted, and
+an entry journaled by a transaction that never got to commit. A new writer
+must recover every committed entry exactly once and skip the other.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from ._seed import use_temp_database, create_schema, seed_portfolios, percentile
+
+use_temp_database()
+
+
+def _audit_count(db_engine) -> int:
+    from sqlalchemy import select, func
+    from app.models_features import AuditLog
+    with db_engine.connect() as conn:
+        return conn.execute(select(func.count(AuditLog.id))).scalar()
+
+
+def _add_latency(db_engine, rtt_ms: float):
+    from sqlalchemy import event
+
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def _sleep(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(rtt_ms / 1000)
+
+
+def _run_ops(client, headers, ops: int) -> dict[str, list[float]]:
+    times = {"create": [], "update": [], "delete": []}
+    payload = {"scope": "personal", "policy_type": "auto", "carrier": "GEICO", "policy_number": "A-1"}
+    for i in range(ops):
+        t0 = time.perf_counter()
+        r = client.post("/policies", json=payload | {"policy_number": f"A-{i}"}, headers=headers)
+        times["create"].append((time.perf_counter() - t0) * 1000)
+        r.raise_for_status()
+        pid = r.json()["id"]
+        t0 = time.perf_counter()
+        client.put(f"/policies/{pid}", json={"nickname": "car"}, headers=headers).raise_for_status()
+        times["update"].append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        client.delete(f"/policies/{pid}", headers=headers).raise_for_status()
+        times["delete"].append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def _crash_child(journal_dir: str, entries: int):
+    """Commit entries through sessions, insert one segment without deleting it, then die."""
+    create_schema()
+    from app.audit_helper import log_action
+    from app.audit_writer import audit_writer, make_entry
+    from app.db import SessionLocal
+
+    audit_writer.journal_dir = journal_dir
+    audit_writer.batch_size = 50
+    audit_writer._run = lambda: None  # no background flushes: this test decides what gets inserted
+    audit_writer.start()
+    db = SessionLocal()
+    uid, = seed_portfolios(db, 1, policies_per_user=0)
+    db.commit()
+    for i in range(entries):
+        log_action(db, uid, "created", "policy", i)
+        if i % 7 == 6 or i == entries - 1:
+            db.commit()
+    log_action(db, uid, "created", "policy", -1)
+    db.rollback()  # rolled back: must not be recorded
+    # Journaled ahead of a commit the crash prevented (its transaction id was never recorded)
+    audit_writer.write([make_entry(uid, "created", "policy", -2, None)], "0" * 32)
+    inserted = audit_writer._insert(audit_writer._sealed[0])  # inserted, but the process dies before deleting the file
+    print(inserted, flush=True)
+    os._exit(1)
+
+
+def _crash_check(entries: int) -> bool:
+    from app.audit_writer import audit_writer
+    from app.db import engine
+
+    journal_dir = tempfile.mkdtemp(prefix="covrabl_audit_")
+    env = os.environ | {"PYTHONPATH": os.getcwd()}
+    child = subprocess.run(
+        [sys.executable, "-m", "benchmarks.audit_writes", "--crash-child", journal_dir, "--ops", str(entries)],
+        env=env, capture_output=True,
+    )
+    left = len(os.listdir(journal_dir))
+    before = _audit_count(engine)
+    audit_writer.journal_dir = journal_dir
+    audit_writer.start()
+    audit_writer.stop()
+    recovered = _audit_count(engine) - before
+    inserted = int(child.stdout.split()[-1]) if child.stdout.strip() else 0
+    ok = child.returncode == 1 and inserted and recovered + inserted == entries and not os.listdir(journal_dir)
+    print(f"crash check: child exit {child.returncode}, {left} segment file(s) left, {inserted} entries "
+          f"inserted before the crash + {recovered} recovered = {recovered + inserted}/{entries} "
+          f"{'ok' if ok else 'FAILED'}")
+    if not ok and child.stderr:
+        print(child.stderr.decode()[-2000:])
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=300, help="create/update/delete cycles per mode")
+    parser.add_argument("--rtt-ms", type=float, default=0, help="simulated per-statement round-trip")
+    parser.add_argument("--crash-check", action="store_true")
+    parser.add_argument("--crash-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.crash_child:
+        _crash_child(args.crash_child, args.ops)
+        return
+
+    create_schema()
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.audit_writer import audit_writer
+    from app.auth import create_access_token
+    from app.db import SessionLocal, engine, writer_engine
+    from app.models import User
+
+    if args.rtt_ms:
+        for e in {engine, writer_engine or engine, app_main.async_engine.sync_engine}:
+            _add_latency(e, args.rtt_ms)
+
+    db = SessionLocal()
+    uid, = seed_portfolios(db, 1, policies_per_user=0)
+    db.get(User, uid).plan = "pro"
+    db.commit()
+    db.close()
+    headers = {"Authorization": f"Bearer {create_access_token(uid)}"}
+
+    failures = 0
+    print(f"{'mode':<22} {'op':<7} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    with TestClient(app_main.app) as client:
+        for mode in ("synchronous", "buffered + fsync", "buffered, no fsync"):
+            audit_writer.stop()
+            if mode != "synchronous":
+                audit_writer.fsync = mode == "buffered + fsync"
+                audit_writer.start()
+            before = _audit_count(engine)
+            _run_ops(client, headers, min(args.ops, 20))  # warm up
+            times = _run_ops(client, headers, args.ops)
+            audit_writer.stop()  # flushes what's left
+            written = _audit_count(engine) - before
+            expected = 3 * (args.ops + min(args.ops, 20))
+            for op, values in times.items():
+                print(f"{mode:<22} {op:<7} {percentile(values, 50):8.2f} {percentile(values, 95):8.2f} "
+                      f"{statistics.fmean(values):8.2f}")
+            if written != expected:
+                failures += 1
+                print(f"  {written} audit rows written, expected {expected}")
+
+    if args.crash_check and not _crash_check(entries=200):
+        failures += 1
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
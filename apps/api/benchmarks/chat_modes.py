@@ -0,0 +1,100 @@
+"""
+Compare prompt size and latency of the two chat modes.
+
+    python -m benchmarks.chat_modes [--policies 12] [--live]
+
+Offline it measures prompt construction time and prompt tokens for the full
+context mode versus the tool-calling mode (index prompt + the tool result a
+typical small question needs). With --live and OPENAI_API_KEY set it also sends
+each question through both modes and reports time-to-first-token and total time.
+"""
+
+import argparse
+import os
+import time
+
+from ._seed import use_temp_database, create_schema, seed_portfolios, percentile
+
+use_temp_database()
+
+QUESTIONS = [
+    "What's my auto deductible?",
+    "Who do I call to file a claim on my home policy?",
+    "Am I covered for water backup?",
+    "What gaps do I have?",
+]
+
+
+def count_tokens(text: str) -> int:
+    try:
+        import tiktoken
+        return len(tiktoken.encoding_for_model("gpt-4o").encode(text))
+    except Exception:
+        return len(text) // 4  # rough average for English prose
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--policies", type=int, default=12)
+    parser.add_argument("--details", type=int, default=8)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    create_schema()
+    from datetime import datetime
+    from app.db import SessionLocal
+    from app.models import User, Policy
+    from app.routes_chat import _build_prompt_messages, _stream_completion, _stream_with_tools
+    from app.chat_tools import run_tool
+
+    db = SessionLocal()
+    user_id = seed_portfolios(db, 1, policies_per_user=args.policies, details_per_policy=args.details)[0]
+    user = db.get(User, user_id)
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    start = time.perf_counter()
+    context_prompt = _build_prompt_messages("context", user, db, today, [])
+    context_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    tools_prompt = _build_prompt_messages("tools", user, db, today, [])
+    index_ms = (time.perf_counter() - start) * 1000
+
+    first_policy = db.query(Policy.id).filter(Policy.user_id == user_id).first()[0]
+    start = time.perf_counter()
+    tool_result = run_tool("get_policy", f'{{"policy_id": {first_policy}}}', user, db)
+    tool_ms = (time.perf_counter() - start) * 1000
+
+    ctx_tokens = sum(count_tokens(m["content"]) for m in context_prompt)
+    tools_tokens = sum(count_tokens(m["content"]) for m in tools_prompt) + count_tokens(tool_result)
+    print(f"{'mode':<10} {'build ms':>10} {'prompt tokens':>14}")
+    print(f"{'context':<10} {context_ms:10.2f} {ctx_tokens:14d}")
+    print(f"{'tools':<10} {index_ms + tool_ms:10.2f} {tools_tokens:14d}   (index + one get_policy call)")
+    print(f"token reduction: {100 * (1 - tools_tokens / max(ctx_tokens, 1)):.1f}%")
+
+    if not args.live:
+        return
+    if not os.environ.get("OPENAI_API_KEY"):
+        raise SystemExit("--live needs OPENAI_API_KEY")
+
+    import openai
+    client = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    for mode, prompt in (("context", context_prompt), ("tools", tools_prompt)):
+        firsts, totals = [], []
+        for q in QUESTIONS:
+            messages = prompt + [{"role": "user", "content": q}]
+            chunks = _stream_with_tools(client, messages, user_id) if mode == "tools" else _stream_completion(client, messages)
+            start = time.perf_counter()
+            first = None
+            for _ in chunks:
+                if first is None:
+                    first = time.perf_counter() - start
+            totals.append((time.perf_counter() - start) * 1000)
+            firsts.append((first or 0) * 1000)
+        print(f"{mode:<10} ttft p50 {percentile(firsts, 50):8.0f} ms   total p50 {percentile(totals, 50):8.0f} ms   "
+              f"total p95 {percentile(totals, 95):8.0f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Memory regression check for the count paths.
+
+    python -m benchmarks.count_memory [--sizes 200 2000 20000]
+
+For each size N it seeds a user with N policies, N policy deltas and N pending
+inbound drafts, then measures peak Python allocations (tracemalloc) while
+serving GET /deltas, GET /inbound/drafts/count and POST /policies (whose plan
+limit check counts active policies). With COUNT queries the peak stays flat as
+N grows; loading the rows to len() them, as these endpoints used to, grows
+linearly — the "rows loaded" column shows what that costs at each N.
+
+Exits non-zero if any endpoint's peak at the largest N exceeds twice its peak
+at the smallest N (plus a small allowance for noise).
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+SLACK_KIB = 256
+
+
+def _seed_user(db, n: int) -> int:
+    from sqlalchemy import insert, select
+    from app.models import User, Policy
+    from app.models_features import PolicyDelta, PolicyDraft
+    from app.portfolio_stats import refresh
+
+    uid, = seed_portfolios(db, 1, policies_per_user=n, details_per_policy=0, contacts_per_policy=0, seed=n)
+    db.get(User, uid).plan = "pro"
+    policy_ids = db.execute(select(Policy.id).where(Policy.user_id == uid)).scalars().all()
+    for model, rows in (
+        (PolicyDelta, [{"policy_id": pid, "field_key": "premium_amount", "old_value": "100", "new_value": "120",
+                        "delta_type": "increased", "severity": "info"} for pid in policy_ids]),
+        (PolicyDraft, [{"user_id": uid, "carrier": "Chubb", "status": "pending"} for _ in range(n)]),
+    ):
+        for i in range(0, len(rows), 5000):
+            db.execute(insert(model), rows[i:i + 5000])
+    refresh(db.connection(), [uid])  # bulk inserts bypass the stats flush hooks
+    db.commit()
+    return uid
+
+
+def _check(name: str, response):
+    # Past the plan limit POST /policies is refused, which still exercises the count
+    if response.status_code not in (200, 201, 403):
+        raise SystemExit(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+
+
+def _peak_kib(fn) -> float:
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    fn()
+    return (tracemalloc.get_traced_memory()[1] - before) / 1024
+
+
+def _rows_loaded_kib(db, uid: int) -> float:
+    """Peak for loading the user's deltas as ORM objects, the old way of counting them."""
+    from sqlalchemy import select
+    from app.models import Policy
+    from app.models_features import PolicyDelta
+
+    def load():
+        db.execute(select(PolicyDelta).where(
+            PolicyDelta.policy_id.in_(select(Policy.id).where(Policy.user_id == uid))
+        )).scalars().all()
+        db.expunge_all()
+    return _peak_kib(load)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 20000])
+    args = parser.parse_args()
+
+    create_schema()
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.auth import create_access_token
+    from app.db import SessionLocal
+
+    new_policy = {"scope": "personal", "policy_type": "auto", "carrier": "GEICO", "policy_number": "NEW-1"}
+    endpoints = {
+        "GET /deltas": lambda c, h: c.get("/deltas", headers=h),
+        "GET /inbound/drafts/count": lambda c, h: c.get("/inbound/drafts/count", headers=h),
+        "POST /policies (limit check)": lambda c, h: c.post("/policies", json=new_policy, headers=h),
+    }
+    peaks: dict[str, list[float]] = {name: [] for name in endpoints}
+    loaded: list[float] = []
+
+    tracemalloc.start()
+    with TestClient(app_main.app) as client:
+        for n in args.sizes:
+            db = SessionLocal()
+            uid = _seed_user(db, n)
+            headers = {"Authorization": f"Bearer {create_access_token(uid)}"}
+            for name, call in endpoints.items():
+                call(client, headers)  # warm up (first-request imports, statement caches)
+                peaks[name].append(_peak_kib(lambda: _check(name, call(client, headers))))
+            loaded.append(_rows_loaded_kib(db, uid))
+            db.close()
+    tracemalloc.stop()
+
+    print(f"{'peak KiB':<30}" + "".join(f"{f'N={n}':>12}" for n in args.sizes))
+    failures = 0
+    for name, values in peaks.items():
+        grows = values[-1] > 2 * values[0] + SLACK_KIB
+        failures += grows
+        print(f"{name:<30}" + "".join(f"{v:12.0f}" for v in values) + ("  GROWS" if grows else ""))
+    print(f"{'(rows loaded to count)':<30}" + "".join(f"{v:12.0f}" for v in loaded))
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
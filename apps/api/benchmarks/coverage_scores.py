@@ -0,0 +1,146 @@
+"""
+GET /coverage-scores: recompute on every view vs stored rows with background recompute.
+
+    python -m benchmarks.coverage_scores [--users 50] [--policies 40] [--repeat 50] [--burst 20]
+
+Seeds --users portfolios, then for one user times GET /coverage-scores served
+from the stored rows against recomputing on every view (the old behaviour,
+still what happens when the background queue is off), counting write
+statements per request.
+
+Checks that a GET writes nothing once scores are stored, that a burst of
+--burst policy edits is recomputed once after the debounce and the result
+matches a fresh computation, that /recalculate queues (202) and runs without
+the debounce, and that with the queue stopped a stale GET recomputes inline.
+Exits non-zero if any check fails.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+os.environ.setdefault("SCORE_DEBOUNCE_MS", "300")
+
+
+def _count_writes(engines, counter: dict):
+    from sqlalchemy import event
+
+    def _writes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            counter["writes"] += 1
+
+    for e in engines:
+        event.listen(e, "before_cursor_execute", _writes)
+
+
+def _median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def _wait_idle(queue, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while queue.pending() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    time.sleep(0.05)  # let a job that was just popped finish
+    return not queue.pending()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--policies", type=int, default=40, help="policies per user")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=20, help="policy edits in the burst check")
+    args = parser.parse_args()
+
+    create_schema()
+    from sqlalchemy import select
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.auth import create_access_token
+    from app.db import SessionLocal, engine, writer_engine
+    from app.models import Policy
+    from app.routes_scores import _score_user
+    from app.score_queue import score_queue
+
+    db = SessionLocal()
+    uid = seed_portfolios(db, args.users, policies_per_user=args.policies, details_per_policy=8)[0]
+    policy_ids = list(db.execute(select(Policy.id).where(Policy.user_id == uid).order_by(Policy.id)).scalars())
+    db.close()
+    headers = {"Authorization": f"Bearer {create_access_token(uid)}"}
+
+    counter = {"writes": 0}
+    _count_writes({engine, writer_engine or engine, app_main.async_engine.sync_engine}, counter)
+
+    def fresh_scores():
+        with SessionLocal() as s:
+            return _score_user(s, uid)
+
+    def get():
+        r = client.get("/coverage-scores", headers=headers)
+        r.raise_for_status()
+        return r.json()
+
+    checks = []
+    with TestClient(app_main.app) as client:
+        first = get()
+        checks.append(("first view computes and stores", first == fresh_scores()))
+
+        counter["writes"] = 0
+        stored_ms = _median_ms(get, args.repeat)
+        checks.append(("GET with stored scores writes nothing", counter["writes"] == 0))
+        counter["writes"] = 0
+        recompute_ms = _median_ms(fresh_scores, args.repeat)
+        recompute_writes = counter["writes"] / args.repeat
+
+        computed = score_queue.computed
+        for i in range(args.burst):
+            pid = policy_ids[i % len(policy_ids)]
+            client.put(f"/policies/{pid}", json={"coverage_amount": 2_000_000 + i}, headers=headers).raise_for_status()
+        served_during_burst = get()
+        idle = _wait_idle(score_queue)
+        after_burst = get()
+        checks.append((f"burst of {args.burst} edits recomputed once",
+                       idle and score_queue.computed - computed == 1))
+        checks.append(("recomputed scores match a fresh computation", after_burst == fresh_scores()))
+        checks.append(("GET during the burst served stored scores", served_during_burst == first))
+
+        computed = score_queue.computed
+        t0 = time.perf_counter()
+        r = client.post("/coverage-scores/recalculate", headers=headers)
+        queued_ok = r.status_code == 202
+        while score_queue.computed == computed and time.perf_counter() - t0 < 5:
+            time.sleep(0.005)
+        recalc_ms = (time.perf_counter() - t0) * 1000
+        checks.append(("/recalculate queues (202) and runs undebounced",
+                       queued_ok and score_queue.computed - computed == 1 and recalc_ms < score_queue.debounce * 1000))
+
+        score_queue.stop()
+        client.put(f"/policies/{policy_ids[0]}", json={"coverage_amount": 5_000_000}, headers=headers).raise_for_status()
+        checks.append(("queue off: stale GET recomputes inline", get() == fresh_scores()))
+
+    print(f"{'GET /coverage-scores':<36} {'median ms':>10} {'writes/req':>11}")
+    print(f"{'recompute on every view':<36} {recompute_ms:10.2f} {recompute_writes:11.1f}")
+    print(f"{'stored rows':<36} {stored_ms:10.2f} {0:11.1f}")
+    print(f"/recalculate to recomputed: {recalc_ms:.0f} ms (debounce {score_queue.debounce * 1000:.0f} ms)\n")
+
+    failures = 0
+    for label, ok in checks:
+        failures += not ok
+        print(f"{label:<48} {'ok' if ok else 'FAILED'}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Exclusion keyword scan in gap analysis: every keyword vs the per-policy-type table.
+
+    python -m benchmarks.exclusion_scan [--policies 2000] [--details 10 50 200] [--repeat 5]
+
+Builds policies of every type whose details are long free text (as extracted
+from documents), sprinkled with exclusion keywords, keyword fragments and
+overlapping phrases ("surface water backup"), and for each --details size
+times the exclusion scan the old way (every exclusion's applies_to checked
+and every keyword lowercased and tested against the policy's text) and with
+coverage_taxonomy.find_exclusions, plus the whole analyze_coverage_gaps call.
+
+Checks that both find the same exclusions for every policy. Exits non-zero
+if they ever differ. Needs no database.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+WORDS = ["coverage", "limit", "deductible", "dwelling", "premises", "occurrence", "endorsement", "insured",
+         "water", "backup", "surface", "earth", "act", "use", "business", "flo", "sewe", "mold-free", "uber-like",
+         "maintenance", "intent", "tremors", "fungus", "delivery", "commercial", "livery", "spore", "$500,000"]
+PHRASES = ["surface water backup", "Flood damage excluded", "EARTH MOVEMENT", "sump pump failure", "sewer",
+           "lack of maintenance", "Rideshare endorsement", "criminal act", "wear and tear", "Mold", "seismic"]
+TYPES = ["home", "renters", "auto", "umbrella", "life", "Home", "AUTO"]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    parts = [rng.choice(WORDS) for _ in range(words)]
+    if rng.random() < 0.3:
+        parts.insert(rng.randrange(len(parts) + 1), rng.choice(PHRASES))
+    return " ".join(parts)
+
+
+def _policies(n: int, details: int, seed: int = 3) -> list[dict]:
+    rng = random.Random(seed)
+    return [{
+        "id": i,
+        "policy_type": rng.choice(TYPES),
+        "carrier": rng.choice(["Chubb", "Lyft Mutual", "Acme"]),
+        "coverage_amount": rng.choice([None, 100_000, 500_000]),
+        "details": [{"field_name": rng.choice(["exclusions", "notes", "endorsements"]),
+                     "field_value": _text(rng, rng.randint(5, 40))} for _ in range(details)],
+        "contacts": [],
+    } for i in range(n)]
+
+
+def _text_of(policy: dict) -> str:
+    # Same text analyze_coverage_gaps builds
+    text = " ".join(f"{d.get('field_name', '')} {d.get('field_value', '')}" for d in policy.get("details", [])).lower()
+    return text + f" {policy.get('carrier', '')} {policy.get('notes', '')}".lower()
+
+
+def _legacy(ptype: str, text: str) -> list[str]:
+    from app.coverage_taxonomy import EXCLUSION_KEYWORDS
+
+    found = []
+    for excl_id, info in EXCLUSION_KEYWORDS.items():
+        if ptype not in info.get("applies_to", []):
+            continue
+        for keyword in info["keywords"]:
+            if keyword.lower() in text:
+                found.append(excl_id)
+                break
+    return found
+
+
+def _median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--policies", type=int, default=2000)
+    parser.add_argument("--details", type=int, nargs="+", default=[10, 50, 200], help="details per policy")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.coverage_taxonomy import analyze_coverage_gaps, find_exclusions
+
+    failures = 0
+    print(f"{'details/policy':>14} {'text KiB':>9} {'keywords ms':>12} {'table ms':>11} {'speedup':>8} "
+          f"{'gaps total ms':>14}")
+    for details in args.details:
+        policies = _policies(args.policies, details)
+        texts = [((p["policy_type"] or "").lower(), _text_of(p)) for p in policies]
+        mismatched = [i for i, (ptype, text) in enumerate(texts) if _legacy(ptype, text) != find_exclusions(ptype, text)]
+        failures += bool(mismatched)
+        for i in mismatched[:3]:
+            print(f"  policy {i}: keywords {_legacy(*texts[i])} table {find_exclusions(*texts[i])}")
+
+        legacy_ms = _median_ms(lambda: [_legacy(pt, t) for pt, t in texts], args.repeat)
+        table_ms = _median_ms(lambda: [find_exclusions(pt, t) for pt, t in texts], args.repeat)
+        total_ms = _median_ms(lambda: analyze_coverage_gaps(policies), args.repeat)
+        size_kib = sum(len(t) for _, t in texts) / 1024
+        print(f"{details:>14} {size_kib:9.0f} {legacy_ms:12.1f} {table_ms:11.1f} {legacy_ms / table_ms:7.1f}x "
+              f"{total_ms:14.1f}")
+
+    print(f"\nsame exclusions for every policy: {'FAILED' if failures else 'ok'}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Gap endpoints: recomputed, served from the gap cache, and revalidated with If-None-Match.
+
+    python -m benchmarks.gap_etags [--users 20] [--policies 40] [--repeat 30]
+
+Seeds --users portfolios, puts some of the first user's policies under a
+business name and an exposure (through the API, as users do), then for
+GET /gaps, /gaps/business/{name}, /gaps/policy/{id} and /exposures/{id}
+times three kinds of request, counting SQL statements for each:
+- a cold one, with the gap cache cleared before each request
+- a cached one
+- a poll that sends the ETag back and gets a 304
+
+Checks:
+- cached bodies match cold ones
+- a matching If-None-Match gets an empty 304 with the same ETag
+- a policy edit changes every ETag, and the new bodies match a fresh computation
+- a new certificate changes the business entity's ETag
+- the next day's request gets a new ETag and a recomputed body
+- the chat gap tool reads the same cache entry as GET /gaps
+- /gaps/policy/{id} returns exactly /gaps's gaps with that policy_id
+
+Exits non-zero if any check fails.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+
+def _count_statements(engines, counter: dict):
+    from sqlalchemy import event
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    for e in engines:
+        event.listen(e, "before_cursor_execute", _count)
+
+
+class _Tomorrow(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.now(tz) + timedelta(days=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--policies", type=int, default=40, help="policies per user")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    create_schema()
+    from sqlalchemy import select
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app import routes_gaps
+    from app.auth import create_access_token
+    from app.chat_tools import _tool_list_gaps
+    from app.db import SessionLocal, engine, writer_engine
+    from app.gap_cache import gap_cache
+    from app.models import Policy, User
+
+    db = SessionLocal()
+    uid = seed_portfolios(db, args.users, policies_per_user=args.policies, details_per_policy=8)[0]
+    policy_ids = list(db.execute(select(Policy.id).where(Policy.user_id == uid).order_by(Policy.id)).scalars())
+    db.close()
+    headers = {"Authorization": f"Bearer {create_access_token(uid)}"}
+
+    counter = {"statements": 0}
+    _count_statements({engine, writer_engine or engine, app_main.async_engine.sync_engine}, counter)
+
+    checks = []
+    rows = []
+    with TestClient(app_main.app) as client:
+        def get(path, **extra):
+            r = client.get(path, headers={**headers, **extra})
+            assert r.status_code in (200, 304), (path, r.status_code, r.text)
+            return r
+
+        exposure_id = client.post("/exposures", json={"name": "Lake house", "exposure_type": "property"},
+                                  headers=headers).json()["id"]
+        for pid in policy_ids[:6]:
+            client.put(f"/policies/{pid}", json={"business_name": "Acme LLC"}, headers=headers).raise_for_status()
+        for pid in policy_ids[6:12]:
+            client.put(f"/policies/{pid}", json={"exposure_id": exposure_id}, headers=headers).raise_for_status()
+        paths = ["/gaps", "/gaps/business/Acme%20LLC", f"/gaps/policy/{policy_ids[0]}", f"/exposures/{exposure_id}"]
+
+        def timed(path, clear=False, **extra):
+            times, statements = [], 0
+            for _ in range(args.repeat):
+                if clear:
+                    gap_cache.clear()
+                counter["statements"] = 0
+                t0 = time.perf_counter()
+                r = get(path, **extra)
+                times.append((time.perf_counter() - t0) * 1000)
+                statements += counter["statements"]
+            return r, statistics.median(times), statements / args.repeat
+
+        tags = {}
+        for path in paths:
+            cold, cold_ms, cold_q = timed(path, clear=True)
+            warm, warm_ms, warm_q = timed(path)
+            tag = warm.headers.get("etag")
+            poll, poll_ms, poll_q = timed(path, **{"If-None-Match": tag})
+            tags[path] = tag
+            rows.append((path, cold_ms, cold_q, warm_ms, warm_q, poll_ms, poll_q))
+            checks.append((f"{path}: cached body matches", warm.json() == cold.json()))
+            checks.append((f"{path}: If-None-Match gets a 304",
+                           poll.status_code == 304 and not poll.content and poll.headers.get("etag") == tag))
+
+        client.put(f"/policies/{policy_ids[0]}", json={"coverage_amount": 12_345}, headers=headers).raise_for_status()
+        after = {path: get(path, **{"If-None-Match": tags[path]}) for path in paths}
+        gap_cache.clear()
+        fresh = {path: get(path).json() for path in paths}
+        checks.append(("policy edit changes every ETag",
+                       all(r.status_code == 200 and r.headers.get("etag") != tags[p] for p, r in after.items())))
+        checks.append(("bodies after the edit match a fresh computation",
+                       all(after[p].json() == fresh[p] for p in paths)))
+
+        business = paths[1]
+        tag = get(business).headers.get("etag")
+        client.post("/certificates", json={"direction": "received", "policy_id": policy_ids[0],
+                                           "counterparty_name": "Landlord", "counterparty_type": "landlord"},
+                    headers=headers).raise_for_status()
+        r = get(business, **{"If-None-Match": tag})
+        checks.append(("new certificate changes the business ETag",
+                       r.status_code == 200 and len(r.json()["certificates"]) == 1))
+
+        tag = get("/gaps").headers.get("etag")
+        routes_gaps.datetime = _Tomorrow
+        try:
+            r = get("/gaps", **{"If-None-Match": tag})
+            with SessionLocal() as s:
+                tomorrow = routes_gaps._portfolio_gaps(s, uid, _Tomorrow.now().date())
+        finally:
+            routes_gaps.datetime = datetime
+        checks.append(("next day: new ETag and recomputed gaps",
+                       r.status_code == 200 and r.headers.get("etag") != tag and r.json() == tomorrow
+                       and tomorrow != get("/gaps").json()))
+
+        served = get("/gaps").json()
+        with SessionLocal() as s:
+            user = s.get(User, uid)
+            counter["statements"] = 0
+            tool = _tool_list_gaps({}, user, s)
+            tool_statements = counter["statements"]
+        policy_gaps = get(paths[2]).json()["gaps"]
+        checks.append(("/gaps/policy matches /gaps for that policy",
+                       policy_gaps == [g for g in served["gaps"] if g.get("policy_id") == policy_ids[0]]))
+        checks.append(("chat gap tool reads the /gaps cache entry",
+                       tool_statements <= 1 and [g["name"] for g in tool["gaps"]] == [g["name"] for g in served["gaps"]]))
+
+    print(f"{'endpoint':<28} {'cold ms':>8} {'stmts':>6} {'cached ms':>10} {'stmts':>6} {'304 ms':>7} {'stmts':>6}")
+    for path, cold_ms, cold_q, warm_ms, warm_q, poll_ms, poll_q in rows:
+        label = path if len(path) <= 28 else path[:25] + "..."
+        print(f"{label:<28} {cold_ms:8.2f} {cold_q:6.1f} {warm_ms:10.2f} {warm_q:6.1f} {poll_ms:7.2f} {poll_q:6.1f}")
+    print()
+
+    failures = 0
+    for label, ok in checks:
+        failures += not ok
+        print(f"{label:<52} {'ok' if ok else 'FAILED'}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
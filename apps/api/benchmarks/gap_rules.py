@@ -0,0 +1,135 @@
+"""
+Gap analysis: the rule engine (app.gap_engine) vs the function it replaced.
+
+    python -m benchmarks.gap_rules [--portfolios 2000] [--sizes 5 50 500] [--repeat 5]
+
+Generates portfolios with awkward data: mixed-case, unknown and missing
+policy types, renewal dates as ISO strings, dates, datetimes, garbage and
+past/near/far days, created_at as strings and datetimes, None/zero/small
+coverage, placeholder carriers, claims contacts with and without phones,
+detail text with exclusion keywords, repeated policy ids, and every
+combination of user_context flags.
+
+Checks that the engine returns exactly what the old analyze_coverage_gaps
+(kept in benchmarks/_gaps_reference.py) does for every portfolio, and that
+evaluate_policy returns exactly the full analysis's gaps with that
+policy_id (counting how often the old "_{id}" substring filter of
+/gaps/policy/{id} got it wrong). Then times both per --sizes portfolio size,
+and a one-policy evaluation against analysing the portfolio and filtering,
+and prints where the engine spends its time per rule. Exits non-zero on any
+difference. Needs no database.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+TYPES = ["auto", "Auto", "home", "HOME", "renters", "life", "umbrella", "liability", "health", "dental", "vision",
+         "disability", "general_liability", "bop", "cyber", "epli", "workers_comp", "professional_liability",
+         "commercial_property", "pet", "", None]
+FLAGS = ["has_vehicle", "is_homeowner", "is_renter", "has_dependents", "high_net_worth", "owns_business"]
+DETAIL_VALUES = ["$500 deductible", "Flood damage excluded", "sewer backup endorsement", "uber driver", "mold limit",
+                 "criminal act", "wear and tear", "earth movement", "n/a", ""]
+
+
+def _date_value(rng: random.Random, today: date):
+    day = today + timedelta(days=rng.choice([-400, -1, 0, 1, 14, 15, 30, 31, 200, rng.randint(-50, 60)]))
+    return rng.choice([day.isoformat(), day, datetime.combine(day, datetime.min.time()), "not a date",
+                       f"{day.year}-{day.month}-{day.day}", "", None])
+
+
+def _policy(rng: random.Random, pid: int, today: date) -> dict:
+    created = today - timedelta(days=rng.choice([10, 1094, 1095, 1096, 2000, rng.randint(0, 4000)]))
+    policy = {
+        "id": rng.choice([pid, pid, pid, pid // 2]),  # now and then an id repeats
+        "policy_type": rng.choice(TYPES),
+        "carrier": rng.choice(["Acme", "Pending extraction...", "Lyft Mutual", None]),
+        "coverage_amount": rng.choice([None, 0, 25_000, 99_999, 100_000, 300_000, 1_000_000]),
+        "renewal_date": _date_value(rng, today),
+        "created_at": rng.choice([created.isoformat(), datetime.combine(created, datetime.min.time()), None, "??"]),
+        "details": [{"field_name": rng.choice(["exclusions", "notes", "uninsured_motorist"]),
+                     "field_value": rng.choice(DETAIL_VALUES)} for _ in range(rng.randint(0, 6))],
+        "contacts": [{"role": rng.choice(["claims", "customer_service", "agent"]),
+                      "phone": rng.choice([None, "", "555-0100"])} for _ in range(rng.randint(0, 2))],
+    }
+    if rng.random() < 0.1:
+        policy["notes"] = "Earthquake not covered"
+    if rng.random() < 0.05:
+        del policy["carrier"]
+    return policy
+
+
+def _portfolio(rng: random.Random, size: int, today: date) -> tuple[list[dict], dict]:
+    context = {flag: True for flag in FLAGS if rng.random() < 0.3}
+    return [_policy(rng, i, today) for i in range(size)], context
+
+
+def _median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--portfolios", type=int, default=2000, help="random portfolios compared")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 500], help="policies per timed portfolio")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.gap_engine import engine
+    from ._gaps_reference import analyze_coverage_gaps as reference
+
+    rng = random.Random(11)
+    today = datetime.now().date()
+    mismatched = scoped_mismatched = substring_wrong = 0
+    for _ in range(args.portfolios):
+        policies, context = _portfolio(rng, rng.choice([0, 1, 2, 3, 5, 8, 20]), today)
+        full = engine.evaluate(policies, context)
+        if full != reference(policies, context):
+            mismatched += 1
+            if mismatched <= 3:
+                print(f"differs for {context} with {len(policies)} policies")
+        # Policy-scoped evaluation assumes ids are unique, as they are in the database
+        policies = [{**p, "id": i + 1} for i, p in enumerate(policies)]
+        full = engine.evaluate(policies, context)
+        for p in policies:
+            expected = [g for g in full if g.get("policy_id") == p["id"]]
+            scoped_mismatched += engine.evaluate_policy(p) != expected
+            substring_wrong += expected != [g for g in full if g.get("policy_id") == p["id"]
+                                            or (g.get("id") and f"_{p['id']}" in str(g.get("id", "")))]
+
+    print(f"{'policies':>8} {'reference ms':>13} {'engine ms':>10} {'speedup':>8} "
+          f"{'one policy: filter ms':>22} {'scoped ms':>10}")
+    timings: dict[str, float] = {}
+    for size in args.sizes:
+        portfolios = [_portfolio(rng, size, today) for _ in range(max(1, 2000 // size))]
+        old_ms = _median_ms(lambda: [reference(p, c) for p, c in portfolios], args.repeat)
+        new_ms = _median_ms(lambda: [engine.evaluate(p, c) for p, c in portfolios], args.repeat)
+        filter_ms = _median_ms(lambda: [[g for g in engine.evaluate(p, c) if g.get("policy_id") == p[0]["id"]]
+                                        for p, c in portfolios], args.repeat)
+        scoped_ms = _median_ms(lambda: [engine.evaluate_policy(p[0]) for p, c in portfolios], args.repeat)
+        print(f"{size:>8} {old_ms:13.1f} {new_ms:10.1f} {old_ms / new_ms:7.1f}x {filter_ms:22.1f} {scoped_ms:10.1f}")
+        for p, c in portfolios:
+            engine.evaluate(p, c, timings=timings)
+
+    total = sum(timings.values())
+    print(f"\n{'time per rule (timed runs)':<28} {'ms':>8} {'share':>6}")
+    for rule_id, seconds in sorted(timings.items(), key=lambda kv: -kv[1]):
+        print(f"{rule_id:<28} {seconds * 1000:8.1f} {seconds / total:6.0%}")
+
+    print(f"\nold /gaps/policy substring filter wrong for {substring_wrong} policies")
+    print(f"same gaps as the old function ({args.portfolios} portfolios): {'FAILED' if mismatched else 'ok'}")
+    print(f"evaluate_policy matches the full analysis: {'FAILED' if scoped_mismatched else 'ok'}")
+    if mismatched or scoped_mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
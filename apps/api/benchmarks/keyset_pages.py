@@ -0,0 +1,178 @@
+"""
+Keyset pagination across the list endpoints: correctness walk and deep-page timing.
+
+    python -m benchmarks.keyset_pages [--rows 20000] [--page 50]
+
+Seeds one user with --rows audit entries and policy deltas, plus a few hundred
+policies, certificates, drafts, conversations and shares. Half of the
+timestamped rows share a handful of timestamps, some written by the database's
+default, so ties and SQLite's two timestamp formats are both exercised.
+
+For each endpoint it walks every page by cursor and checks that together they
+return each row of the unpaginated (or offset-paged) listing exactly once, in
+the same order. Then it times /audit and /deltas on the first page, a deep
+OFFSET page and the same deep page by cursor; cursor pages should cost about
+the same at any depth. Exits non-zero if a walk is wrong.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+SMALL = 300  # rows seeded for the endpoints that were unpaginated
+
+
+def _bulk(db, model, rows: list[dict]):
+    from sqlalchemy import insert
+    for i in range(0, len(rows), 5000):
+        db.execute(insert(model), rows[i:i + 5000])
+
+
+def _stamps(n: int) -> list[dict]:
+    """created_at values for n rows: half distinct, half in 5 tied groups, a few left to the DB default."""
+    base = datetime(2026, 1, 1)
+    out = []
+    for i in range(n):
+        if i % 10 == 0:
+            out.append({})  # server default (CURRENT_TIMESTAMP)
+        elif i % 2:
+            out.append({"created_at": base + timedelta(seconds=i)})
+        else:
+            out.append({"created_at": base + timedelta(days=i % 5)})
+    return out
+
+
+def _seed(db, rows: int) -> int:
+    from sqlalchemy import select
+    from app.models import User, Policy
+    from app.models_chat import Conversation
+    from app.models_features import AuditLog, PolicyDelta, PolicyDraft, Certificate, PolicyShare
+    from app.portfolio_stats import refresh
+
+    uid, = seed_portfolios(db, 1, policies_per_user=SMALL, details_per_policy=1, contacts_per_policy=1)
+    other, = seed_portfolios(db, 1, policies_per_user=SMALL, details_per_policy=0, contacts_per_policy=0, seed=7)
+    email = db.get(User, uid).email
+    own = db.execute(select(Policy.id).where(Policy.user_id == uid)).scalars().all()
+    theirs = db.execute(select(Policy.id).where(Policy.user_id == other)).scalars().all()
+
+    _bulk(db, AuditLog, [{"user_id": uid, "action": "updated", "entity_type": "policy", "entity_id": i, **s}
+                         for i, s in enumerate(_stamps(rows))])
+    _bulk(db, PolicyDelta, [{"policy_id": own[i % len(own)], "field_key": "premium_amount", "old_value": "100",
+                             "new_value": "120", "delta_type": "increased", "severity": "info", **s}
+                            for i, s in enumerate(_stamps(rows))])
+    _bulk(db, PolicyDraft, [{"user_id": uid, "carrier": "Chubb", "status": "pending", **s}
+                            for s in _stamps(SMALL)])
+    _bulk(db, Conversation, [{"user_id": uid, "title": f"c{i}",
+                              **({"updated_at": s["created_at"]} if s else {})}
+                             for i, s in enumerate(_stamps(SMALL))])
+    _bulk(db, Certificate, [{"user_id": uid, "direction": "issued", "counterparty_name": f"Landlord {i}",
+                             "counterparty_type": "landlord"} for i in range(SMALL)])
+    _bulk(db, PolicyShare, [{"policy_id": pid, "owner_id": other, "shared_with_email": email,
+                             "permission": "view", "accepted": True} for pid in theirs])
+    refresh(db.connection(), [uid, other])  # bulk inserts bypass the stats flush hooks
+    db.commit()
+    return uid
+
+
+def _ids(body) -> list:
+    items = body["items"] if isinstance(body, dict) else body
+    return [item.get("share_id", item.get("id")) for item in items]
+
+
+def _walk(client, path: str, headers: dict, page: int) -> tuple[list, int]:
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": page} | ({"cursor": cursor} if cursor else {})
+        r = client.get(path, params=params, headers=headers)
+        r.raise_for_status()
+        ids += _ids(r.json())
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        body = r.json()
+        if isinstance(body, dict) and body.get("next_cursor") != cursor:
+            raise SystemExit(f"{path}: next_cursor in body and header differ")
+        if not cursor:
+            return ids, pages
+
+
+def _offset_all(client, path: str, headers: dict, limit: int) -> list:
+    ids, page = [], 1
+    while True:
+        r = client.get(path, params={"page": page, "limit": limit}, headers=headers)
+        r.raise_for_status()
+        batch = _ids(r.json())
+        ids += batch
+        if len(batch) < limit:
+            return ids
+        page += 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000, help="audit entries and deltas")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    create_schema()
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.auth import create_access_token
+    from app.db import SessionLocal, engine
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    uid = _seed(db, args.rows)
+    db.close()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    print(f"seeded {args.rows} audit rows and deltas in {time.perf_counter() - start:.1f}s")
+
+    headers = {"Authorization": f"Bearer {create_access_token(uid)}"}
+    failures = 0
+    with TestClient(app_main.app) as client:
+        print(f"{'endpoint':<28} {'rows':>7} {'pages':>6}  walk")
+        for path in ["/policies", "/certificates", "/inbound/drafts", "/chat/conversations",
+                     "/policies/shared-with-me", "/audit", "/deltas"]:
+            if path in ("/audit", "/deltas"):
+                expected = _offset_all(client, path, headers, 100)
+            else:
+                expected = _ids(client.get(path, headers=headers).json())
+            walked, pages = _walk(client, path, headers, min(args.page, 100))
+            ok = walked == expected and len(set(walked)) == len(walked)
+            failures += not ok
+            print(f"{path:<28} {len(expected):7d} {pages:6d}  {'ok' if ok else 'MISMATCH'}")
+
+        def median_ms(path: str, params: dict) -> float:
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                client.get(path, params=params, headers=headers).raise_for_status()
+                times.append((time.perf_counter() - t0) * 1000)
+            return statistics.median(times)
+
+        print(f"\n{'median ms':<28} {'first':>8} {'deep offset':>12} {'deep cursor':>12}")
+        deep = args.rows // args.page * 9 // 10  # a page 90% of the way through
+        for path in ["/audit", "/deltas"]:
+            limit = min(args.page, 100)
+            cursor_params = {"limit": limit, "page": deep - 1}
+            # the cursor a client would hold after reading page deep - 1
+            cursor = client.get(path, params=cursor_params, headers=headers).json()["next_cursor"]
+            first = median_ms(path, {"limit": limit})
+            by_offset = median_ms(path, {"limit": limit, "page": deep})
+            by_cursor = median_ms(path, {"limit": limit, "cursor": cursor})
+            print(f"{path + f' (page {deep})':<28} {first:8.1f} {by_offset:12.1f} {by_cursor:12.1f}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
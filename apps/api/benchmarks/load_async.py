@@ -0,0 +1,151 @@
+"""
+Load test for the hot read endpoints.
+
+    python -m benchmarks.load_async [--clients 500] [--duration 20] [--users 200]
+    python -m benchmarks.load_async --url http://localhost:8000 --token-file tokens.txt
+
+Without --url it seeds a throwaway database, starts uvicorn on it and drives
+each endpoint with N concurrent clients (one keep-alive connection each) for
+the given duration, reporting requests/s, p50 and p99 latency and errors.
+
+To compare against the threadpool (sync) handlers, start a server from a build
+before the async migration on the same database and point --url at it; pass
+--workers to match whatever the deployment runs.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from ._seed import use_temp_database, create_schema, seed_portfolios, percentile
+
+ENDPOINTS = ["/policies", "/gaps", "/coverage-scores", "/deltas", "/ice/{ice_code}"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _seed(n_users: int) -> tuple[list[str], list[str]]:
+    """Seed users with emergency cards; return (bearer tokens, ICE access codes)."""
+    create_schema()
+    from app.auth import create_access_token
+    from app.db import SessionLocal
+    from app.models_features import EmergencyCard
+
+    db = SessionLocal()
+    user_ids = seed_portfolios(db, n_users)
+    codes = []
+    for uid in user_ids:
+        code = f"BENCH{uid:06d}"
+        db.add(EmergencyCard(user_id=uid, access_code=code, holder_name=f"User {uid}", is_active=True))
+        codes.append(code)
+    db.commit()
+    db.close()
+    return [create_access_token(uid) for uid in user_ids], codes
+
+
+async def _wait_ready(url: str, timeout: float = 30.0):
+    import httpx
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url + "/docs")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise SystemExit(f"server at {url} did not come up")
+
+
+async def _drive(url: str, path: str, tokens: list[str], codes: list[str], clients: int, duration: float) -> dict:
+    import httpx
+
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def worker(i: int):
+        nonlocal errors
+        rng = random.Random(i)
+        async with httpx.AsyncClient(base_url=url, timeout=30.0) as client:
+            while time.monotonic() < deadline:
+                k = rng.randrange(len(tokens))
+                target = path.format(ice_code=codes[k]) if codes else path
+                start = time.perf_counter()
+                try:
+                    r = await client.get(target, headers={"Authorization": f"Bearer {tokens[k]}"})
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append((time.perf_counter() - start) * 1000)
+                if not ok:
+                    errors += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    elapsed = time.monotonic() - started
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+        "requests": len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--url", help="target an already running server instead of starting one")
+    parser.add_argument("--token-file", help="bearer tokens, one per line (with --url)")
+    parser.add_argument("--endpoints", nargs="*", default=ENDPOINTS)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = args.url.rstrip("/")
+        if not args.token_file:
+            raise SystemExit("--url needs --token-file")
+        with open(args.token_file) as f:
+            tokens = [line.strip() for line in f if line.strip()]
+        codes: list[str] = []
+        args.endpoints = [e for e in args.endpoints if "{ice_code}" not in e]
+    else:
+        use_temp_database()
+        tokens, codes = _seed(args.users)
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            env={**os.environ, "RAILWAY_ENVIRONMENT": "bench"},  # INFO logging, not DEBUG
+        )
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    try:
+        asyncio.run(_wait_ready(url))
+        print(f"{args.clients} clients x {args.duration:.0f}s against {url}")
+        print(f"{'endpoint':<22} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>8}")
+        for path in args.endpoints:
+            r = asyncio.run(_drive(url, path, tokens, codes, args.clients, args.duration))
+            print(f"{path:<22} {r['rps']:9.1f} {r['p50']:9.1f} {r['p99']:9.1f} {r['errors']:8d}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
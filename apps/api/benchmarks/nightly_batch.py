@@ -0,0 +1,254 @@
+"""
+Nightly batch (app.batch): what it stores, what the read paths then serve, and throughput.
+
+    python -m benchmarks.nightly_batch [--users 2000] [--policies 6] [--check 200] [--workers 1 2 4]
+                                       [--shard-size 250] [--repeat 20]
+
+Seeds --users portfolios plus premiums (paid, overdue, due this week, later),
+certificates (expired, expiring, far off, undated; stored statuses stale) and
+profiles for some users, bulk-inserted like data that never went through the
+API. Then:
+
+Checks:
+- build_smart_reminders returns the alerts the old per-policy /reminders/smart
+  did (benchmarks/_reminders_reference.py), for --check users
+- a dry run stores nothing
+- after the batch, /gaps and /reminders/smart bodies match a live computation
+  for --check users, and GET /certificates doesn't write
+- stored certificate statuses match what reads derive
+- an edited policy's stale snapshot isn't served
+- an interrupted run resumes with only its unfinished shards
+
+Times the batch per --workers count, and /gaps and /reminders/smart with and
+without a snapshot (gap cache cleared each request), counting SQL statements.
+Exits non-zero if any check fails.
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+
+def _seed_extras(db, user_ids: list[int], rng: random.Random):
+    from sqlalchemy import insert, select
+    from app.models import Policy
+    from app.models_features import Certificate, Premium
+    from app.models_profile import UserProfile
+
+    today = date.today()
+    premiums, certificates, profiles = [], [], []
+    for pid, uid in db.execute(select(Policy.id, Policy.user_id).where(Policy.user_id.in_(user_ids))):
+        for _ in range(rng.choice([0, 1, 2, 4])):
+            due = today + timedelta(days=rng.choice([-60, -15, -14, -1, 0, 1, 7, 8, 40, rng.randint(-30, 30)]))
+            premiums.append({"policy_id": pid, "amount": rng.randint(1000, 50000), "frequency": "monthly",
+                             "due_date": due, "paid_date": due if rng.random() < 0.4 else None})
+        if rng.random() < 0.15:
+            expires = rng.choice([None, today + timedelta(days=rng.choice([-100, -89, -1, 0, 15, 30, 31, 60, 90, 91, 300]))])
+            certificates.append({"user_id": uid, "direction": rng.choice(["issued", "received"]), "policy_id": pid,
+                                 "counterparty_name": f"Holder {pid}", "counterparty_type": "landlord",
+                                 "expiration_date": expires,
+                                 "status": rng.choice(["active", "active", "expiring", "expired", "pending"])})
+    for uid in user_ids:
+        if rng.random() < 0.5:
+            profiles.append({"user_id": uid, **{flag: rng.random() < 0.4 for flag in (
+                "is_homeowner", "is_renter", "has_dependents", "has_vehicle", "owns_business", "high_net_worth")}})
+    for table, rows in ((Premium, premiums), (Certificate, certificates), (UserProfile, profiles)):
+        for i in range(0, len(rows), 5000):
+            db.execute(insert(table), rows[i:i + 5000])
+    db.commit()
+
+
+def _count_statements(engines, counter: dict):
+    from sqlalchemy import event
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+        counter["writes"] += statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE")
+
+    for e in engines:
+        event.listen(e, "before_cursor_execute", _count)
+
+
+def _normalized(gaps: dict) -> dict:
+    # summary.policy_types comes from a set; its order depends on the process's hash seed
+    return {**gaps, "summary": {k: sorted(v) if isinstance(v, list) else v for k, v in gaps["summary"].items()}}
+
+
+def _canonical(alerts: list[dict]) -> list[dict]:
+    # The old endpoint listed policies in whatever order the database returned them (no ORDER BY);
+    # within a severity, alerts now follow policy id order
+    severity = {"high": 0, "medium": 1, "low": 2}
+    return sorted(alerts, key=lambda a: (severity[a["severity"]], a["policy_id"], a["type"], a["title"]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--policies", type=int, default=6, help="policies per user")
+    parser.add_argument("--check", type=int, default=200, help="users compared against live computation")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--shard-size", type=int, default=250)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    create_schema()
+    from sqlalchemy import func, select, update
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app import batch
+    from app.auth import create_access_token
+    from app.db import SessionLocal, engine, writer_engine
+    from app.gap_cache import gap_cache
+    from app.models import User
+    from app.models_features import BatchShard, Certificate, UserSnapshot
+    from app.routes_certificates import certificate_status
+    from app.routes_gaps import _build_user_context, _gap_payload, _load_policies_eager
+    from app.routes_reminders import build_smart_reminders
+    from ._reminders_reference import smart_reminders as reference
+
+    rng = random.Random(5)
+    db = SessionLocal()
+    user_ids = seed_portfolios(db, args.users, policies_per_user=args.policies, details_per_policy=4)
+    _seed_extras(db, user_ids, rng)
+    db.close()
+    sample = rng.sample(user_ids, min(args.check, len(user_ids)))
+    today = date.today()
+    checks = []
+
+    with SessionLocal() as s:
+        built = build_smart_reminders(s, sample, today)
+        checks.append(("build_smart_reminders matches the old endpoint",
+                       all(_canonical(built[uid]) == _canonical(reference(s, s.get(User, uid))) for uid in sample)))
+
+    def snapshots():
+        with engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(UserSnapshot)).scalar()
+
+    quiet = ["--shard-size", str(args.shard_size)]
+    batch.main(["--dry-run", "--workers", "1", *quiet])
+    checks.append(("dry run stores nothing", snapshots() == 0))
+
+    batch_rows = []
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        code = batch.main(["--restart", "--workers", str(workers), *quiet])
+        elapsed = time.perf_counter() - t0
+        batch_rows.append((workers, elapsed, args.users / elapsed * 60))
+        checks.append((f"batch with {workers} worker(s) succeeds", code == 0 and snapshots() == 2 * args.users))
+
+    counter = {"statements": 0, "writes": 0}
+    _count_statements({engine, writer_engine or engine, app_main.async_engine.sync_engine}, counter)
+    timing_rows = []
+    with TestClient(app_main.app) as client:
+        def get(path, uid):
+            r = client.get(path, headers={"Authorization": f"Bearer {create_access_token(uid)}"})
+            assert r.status_code == 200, (path, r.status_code, r.text)
+            return r.json()
+
+        with SessionLocal() as s:
+            live_gaps = {uid: _gap_payload(_load_policies_eager(s, uid), _build_user_context(s, uid), today)
+                         for uid in sample}
+            live_alerts = build_smart_reminders(s, sample, today)
+        gap_cache.clear()
+        checks.append(("/gaps from snapshots matches live computation",
+                       all(_normalized(get("/gaps", uid)) == _normalized(live_gaps[uid]) for uid in sample)))
+        checks.append(("/reminders/smart from snapshots matches live",
+                       all(get("/reminders/smart", uid) == live_alerts[uid] for uid in sample)))
+
+        with engine.connect() as conn:
+            stored = conn.execute(select(Certificate.expiration_date, Certificate.status)).all()
+        checks.append(("stored certificate statuses are current",
+                       all(certificate_status(exp, status, today) == status for exp, status in stored)))
+        counter["writes"] = 0
+        for uid in sample:
+            get("/certificates", uid)
+        checks.append(("GET /certificates doesn't write", counter["writes"] == 0))
+
+        def timed(path, uids):
+            times, statements = [], 0
+            for i in range(args.repeat):
+                gap_cache.clear()
+                counter["statements"] = 0
+                t0 = time.perf_counter()
+                get(path, uids[i % len(uids)])
+                times.append((time.perf_counter() - t0) * 1000)
+                statements += counter["statements"]
+            return statistics.median(times), statements / args.repeat
+
+        for path in ("/gaps", "/reminders/smart"):
+            served = timed(path, sample)
+            with engine.begin() as conn:  # yesterday's snapshots aren't served
+                conn.execute(update(UserSnapshot).values(computed_for=today - timedelta(days=1)))
+            live = timed(path, sample)
+            with engine.begin() as conn:
+                conn.execute(update(UserSnapshot).values(computed_for=today))
+            timing_rows.append((path, live, served))
+
+        uid = sample[0]
+        with SessionLocal() as s:
+            pid = _load_policies_eager(s, uid)[0].id
+        headers = {"Authorization": f"Bearer {create_access_token(uid)}"}
+        client.put(f"/policies/{pid}", json={"coverage_amount": 12_345, "renewal_date": str(today + timedelta(days=3))},
+                   headers=headers).raise_for_status()
+        gap_cache.clear()
+        with SessionLocal() as s:
+            fresh_gaps = _gap_payload(_load_policies_eager(s, uid), _build_user_context(s, uid), today)
+            fresh_alerts = build_smart_reminders(s, [uid], today)[uid]
+        checks.append(("edited policy: stale snapshots not served",
+                       _normalized(get("/gaps", uid)) == _normalized(fresh_gaps)
+                       and get("/reminders/smart", uid) == fresh_alerts
+                       and fresh_alerts != live_alerts[uid]))
+
+    # Interrupt a run: forget all but the first two shards' checkpoints, then resume
+    run_id = "resume-check"
+    batch.main(["--run", run_id, "--workers", "1", *quiet])
+    with engine.begin() as conn:
+        conn.execute(update(BatchShard).where(BatchShard.run_id == run_id, BatchShard.shard >= 2)
+                     .values(finished_at=None))
+        pending, total = batch.plan(conn, run_id, args.shard_size)
+        expected_users = sum(s.users for s in pending)
+    processed = {}
+    real_run_shard = batch.run_shard
+
+    def counting_run_shard(*a, **kw):
+        result = real_run_shard(*a, **kw)
+        processed[result[0]] = result[1]
+        return result
+
+    batch.run_shard = counting_run_shard
+    try:
+        code = batch.main(["--run", run_id, "--workers", "1", *quiet])
+    finally:
+        batch.run_shard = real_run_shard
+    with engine.connect() as conn:
+        unfinished = conn.execute(select(func.count()).select_from(BatchShard).where(
+            BatchShard.run_id == run_id, BatchShard.finished_at.is_(None))).scalar()
+    checks.append(("interrupted run resumes its unfinished shards only",
+                   code == 0 and sorted(processed) == [s.index for s in pending] and unfinished == 0
+                   and sum(processed.values()) == expected_users and total > 2))
+
+    print(f"\n{'workers':>7} {'seconds':>8} {'users/min':>10}   ({args.users} users, shards of {args.shard_size})")
+    for workers, elapsed, rate in batch_rows:
+        print(f"{workers:>7} {elapsed:8.2f} {rate:10,.0f}")
+    print(f"\n{'endpoint':<18} {'live ms':>8} {'stmts':>6} {'snapshot ms':>12} {'stmts':>6}")
+    for path, (live_ms, live_q), (served_ms, served_q) in timing_rows:
+        print(f"{path:<18} {live_ms:8.2f} {live_q:6.1f} {served_ms:12.2f} {served_q:6.1f}")
+    print()
+
+    failures = 0
+    for label, ok in checks:
+        failures += not ok
+        print(f"{label:<52} {'ok' if ok else 'FAILED'}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Loading policy details from policy_details rows vs policies.details_json.
+
+    python -m benchmarks.policy_details_load [--users 20] [--policies 200] [--details 8] [--repeat 7]
+
+Seeds --users portfolios of --policies policies with --details details each
+(bulk inserts, so details_json starts out NULL, as for rows written before
+migration 0008), and calls the endpoints that read details with the JSON
+unbuilt (every policy read from policy_details). It then builds the JSON with
+the backfill and calls them again.
+
+Checks that the responses are identical both ways, and that the flush hook
+keeps the JSON in step when details are added, edited and deleted through
+the ORM. Prints median times and the PolicyDetail rows loaded per request. Exits
+non-zero if any check fails.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+
+def _endpoints(policy_ids: list[int]) -> list[tuple[str, str]]:
+    return [
+        ("GET", "/policies"),
+        ("GET", "/gaps"),
+        ("POST", "/coverage-scores/recalculate"),
+        ("GET", f"/policies/compare?ids={','.join(map(str, policy_ids[:4]))}"),
+        ("GET", f"/export/policies/{policy_ids[0]}"),
+    ]
+
+
+def _call(client, headers, method: str, path: str):
+    r = client.request(method, path, headers=headers)
+    r.raise_for_status()
+    return r.json() if r.headers.get("content-type", "").startswith("application/json") else r.text
+
+
+def _measure(client, headers, endpoints, repeat: int, row_counter) -> dict[str, tuple[object, float, int]]:
+    out = {}
+    for method, path in endpoints:
+        body = _call(client, headers, method, path)
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            _call(client, headers, method, path)
+            times.append((time.perf_counter() - t0) * 1000)
+        row_counter["rows"] = 0
+        _call(client, headers, method, path)
+        out[f"{method} {path.split('?')[0]}"] = (body, statistics.median(times), row_counter["rows"])
+    return out
+
+
+def _sync_checks(uid: int) -> list[tuple[str, bool]]:
+    from sqlalchemy import select
+    from app.db import SessionLocal
+    from app.models import Policy, PolicyDetail
+    from app.policy_details import build
+
+    def stored_matches(db, pid):
+        stored = db.execute(select(Policy.details_json).where(Policy.id == pid)).scalar()
+        return stored == build(db.connection(), [pid])[pid]
+
+    checks = []
+    db = SessionLocal()
+    policy = db.execute(select(Policy).where(Policy.user_id == uid).order_by(Policy.id)).scalars().first()
+    db.add(PolicyDetail(policy_id=policy.id, field_name="sync_check", field_value="added"))
+    db.commit()
+    checks.append(("hook: detail added", stored_matches(db, policy.id)
+                   and any(d["field_value"] == "added" for d in policy.details_json)))
+
+    detail = db.execute(select(PolicyDetail).where(PolicyDetail.field_name == "sync_check")).scalar_one()
+    detail.field_value = "edited"
+    db.commit()
+    checks.append(("hook: detail edited", stored_matches(db, policy.id)
+                   and any(d["field_value"] == "edited" for d in policy.details_json)))
+
+    db.delete(detail)
+    db.commit()
+    checks.append(("hook: detail deleted", stored_matches(db, policy.id)
+                   and not any(d["field_name"] == "sync_check" for d in policy.details_json)))
+
+    fresh = Policy(user_id=uid, scope="personal", policy_type="auto", carrier="GEICO", policy_number="NEW-1")
+    fresh.details.append(PolicyDetail(field_name="vin", field_value="1HGCM82633A004352"))
+    db.add(fresh)
+    db.commit()
+    checks.append(("hook: new policy with details", stored_matches(db, fresh.id) and len(fresh.details_json) == 1))
+    db.close()
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--policies", type=int, default=200, help="policies per user")
+    parser.add_argument("--details", type=int, default=8, help="details per policy")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    create_schema()
+    from sqlalchemy import event, select, func
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.auth import create_access_token
+    from app.db import SessionLocal, engine
+    from app.models import Policy, PolicyDetail, User
+    from app.policy_details import rebuild
+
+    db = SessionLocal()
+    t0 = time.perf_counter()
+    user_ids = seed_portfolios(db, args.users, policies_per_user=args.policies, details_per_policy=args.details)
+    uid = user_ids[0]
+    db.get(User, uid).plan = "pro"
+    db.commit()
+    policy_ids = list(db.execute(select(Policy.id).where(Policy.user_id == uid).order_by(Policy.id)).scalars())
+    db.close()
+    print(f"seeded {args.users} users x {args.policies} policies x {args.details} details "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+    # PolicyDetail rows loaded per request (both paths load them through the ORM)
+    counter = {"rows": 0}
+    event.listen(PolicyDetail, "load", lambda target, context: counter.__setitem__("rows", counter["rows"] + 1))
+
+    headers = {"Authorization": f"Bearer {create_access_token(uid)}"}
+    endpoints = _endpoints(policy_ids)
+    failures = 0
+    with TestClient(app_main.app) as client:
+        before = _measure(client, headers, endpoints, args.repeat, counter)
+
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            built = rebuild(conn, only_missing=True)
+        print(f"built details_json for {built} policies in {time.perf_counter() - t0:.1f}s\n")
+        with engine.connect() as conn:
+            unbuilt = conn.execute(select(func.count(Policy.id)).where(Policy.details_json.is_(None))).scalar()
+
+        after = _measure(client, headers, endpoints, args.repeat, counter)
+
+    print(f"{'endpoint':<34} {'rows ms':>9} {'json ms':>9} {'detail rows':>12} {'with json':>10}")
+    for key in before:
+        print(f"{key:<34} {before[key][1]:9.1f} {after[key][1]:9.1f} {before[key][2]:12d} {after[key][2]:10d}")
+    print()
+
+    checks = [("every policy built", unbuilt == 0)]
+    checks += [(f"same response: {key}", before[key][0] == after[key][0]) for key in before]
+    checks += _sync_checks(uid)
+    for label, ok in checks:
+        failures += not ok
+        print(f"{label:<44} {'ok' if ok else 'FAILED'}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+How much of each chat request can the provider serve from its prompt cache?
+
+    python -m benchmarks.prompt_cache [--policies 12] [--turns 6] [--live]
+
+Offline it replays a conversation and, for every request, measures the prefix
+shared with an earlier request. That is what OpenAI's automatic prefix cache can
+reuse: prompts of 1024+ tokens, cached in 128-token steps. It compares the
+legacy single system message (date ahead of the context block) with the layered
+prompt built by routes_chat._build_prompt_messages across three situations:
+the next turn, the next turn after a policy edit, and the first turn on the
+next day. With --live and OPENAI_API_KEY set it sends the layered conversation
+and prints the cached_tokens reported by the API for each turn.
+"""
+
+import argparse
+import os
+from datetime import date, timedelta
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+from .chat_modes import count_tokens
+
+use_temp_database()
+
+LEGACY_TEMPLATE = "{instructions}- Today's date: {today}\n\n{context}"
+
+TURNS = [
+    "What policies do I have?",
+    "What's my auto deductible?",
+    "Who do I call to file a claim on my home policy?",
+    "Am I covered for water backup?",
+    "What gaps do I have?",
+    "When does my next policy renew?",
+]
+
+
+def _render(messages: list[dict]) -> str:
+    return "".join(f"<{m['role']}>{m['content']}" for m in messages)
+
+
+def cacheable_tokens(previous: list[dict], current: list[dict]) -> int:
+    a, b = _render(previous), _render(current)
+    n = 0
+    limit = min(len(a), len(b))
+    while n < limit and a[n] == b[n]:
+        n += 1
+    tokens = count_tokens(b[:n])
+    if tokens < 1024:
+        return 0
+    return tokens - tokens % 128
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--policies", type=int, default=12)
+    parser.add_argument("--details", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=len(TURNS))
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    create_schema()
+    from app.db import SessionLocal
+    from app.models import User, Policy, PolicyDetail
+    from app.routes_chat import _ASSISTANT_INSTRUCTIONS, _build_chat_context, _build_prompt_messages
+
+    db = SessionLocal()
+    user_id = seed_portfolios(db, 1, policies_per_user=args.policies, details_per_policy=args.details)[0]
+    user = db.get(User, user_id)
+    today = date.today().isoformat()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    questions = (TURNS * (args.turns // len(TURNS) + 1))[:args.turns]
+
+    def legacy(day: str, history: list[dict]) -> list[dict]:
+        prompt = LEGACY_TEMPLATE.format(
+            instructions=_ASSISTANT_INSTRUCTIONS, today=day, context=_build_chat_context(user, db),
+        )
+        return [{"role": "system", "content": prompt}] + history
+
+    def layered(day: str, history: list[dict]) -> list[dict]:
+        return _build_prompt_messages("context", user, db, day, history)
+
+    def conversation(build, day: str) -> list[list[dict]]:
+        requests, history = [], []
+        for q in questions:
+            history = history + [{"role": "user", "content": q}]
+            requests.append(build(day, history))
+            history = history + [{"role": "assistant", "content": "Here's the quick rundown: " + q}]
+        return requests
+
+    def edit_newest_policy():
+        newest = db.query(Policy).filter(Policy.user_id == user_id).order_by(Policy.id.desc()).first()
+        db.add(PolicyDetail(policy_id=newest.id, field_name="note", field_value="Added roof endorsement"))
+        db.commit()
+
+    results = {}
+    for name, build in (("legacy", legacy), ("layered", layered)):
+        requests = conversation(build, today)
+        total = sum(count_tokens(_render(r)) for r in requests[1:])
+        reused = sum(cacheable_tokens(requests[i - 1], requests[i]) for i in range(1, len(requests)))
+        results[name] = {"next turn": (reused, total)}
+        results[name]["first_request"] = requests[0]
+
+    first_q = [{"role": "user", "content": questions[0]}]
+    for name, build in (("legacy", legacy), ("layered", layered)):
+        before = results[name]["first_request"]
+        nextday = build(tomorrow, first_q)
+        results[name]["next day"] = (cacheable_tokens(before, nextday), count_tokens(_render(nextday)))
+
+    snapshots = {name: build(today, first_q) for name, build in (("legacy", legacy), ("layered", layered))}
+    edit_newest_policy()
+    for name, build in (("legacy", legacy), ("layered", layered)):
+        after = build(today, first_q)
+        results[name]["after edit"] = (cacheable_tokens(snapshots[name], after), count_tokens(_render(after)))
+
+    print(f"{'scenario':<12} {'legacy cached':>16} {'layered cached':>16}")
+    for scenario in ("next turn", "after edit", "next day"):
+        cells = []
+        for name in ("legacy", "layered"):
+            reused, total = results[name][scenario]
+            cells.append(f"{100 * reused / max(total, 1):6.1f}% of {total:5d}")
+        print(f"{scenario:<12} {cells[0]:>16} {cells[1]:>16}")
+
+    if not args.live:
+        db.close()
+        return
+    if not os.environ.get("OPENAI_API_KEY"):
+        raise SystemExit("--live needs OPENAI_API_KEY")
+
+    import openai
+    from app.routes_chat import _stream_completion
+    client = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    history: list[dict] = []
+    for i, q in enumerate(questions, 1):
+        history.append({"role": "user", "content": q})
+        usage: dict = {}
+        answer = "".join(_stream_completion(client, layered(today, history), usage))
+        history.append({"role": "assistant", "content": answer})
+        prompt = usage.get("prompt_tokens", 0)
+        cached = usage.get("cached_tokens", 0)
+        print(f"turn {i}: prompt {prompt:6d}  cached {cached:6d}  ({100 * cached / max(prompt, 1):.0f}%)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
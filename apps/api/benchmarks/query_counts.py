@@ -0,0 +1,106 @@
+"""
+Statement counts per endpoint at two data sizes, to spot N+1 queries.
+
+    python -m benchmarks.query_counts [--sizes 2 10] [--strict]
+
+For each size n it seeds a fresh agent with n clients, each holding n policies
+(shared with the agent, with deltas and scores), then calls the endpoints
+through the app and counts statements with app.query_stats. An endpoint whose
+count grows with n issues queries per row. --strict exits non-zero if any do.
+"""
+
+import argparse
+import sys
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+ENDPOINTS = [
+    "/agent/clients",
+    "/agent/clients/{client_id}/summary",
+    "/policies",
+    "/coverage-scores",
+    "/deltas",
+    "/reminders/smart",
+    "/gaps",
+    "/gaps/summary",
+]
+
+
+def _seed_agent_book(db, n: int) -> tuple[int, int]:
+    """An agent with n clients of n policies each. Returns (agent id, first client id)."""
+    from sqlalchemy import insert, select
+    from app.models import User, Policy
+    from app.models_features import PolicyShare, PolicyDelta, CoverageScore
+    from app.portfolio_stats import refresh
+
+    agent_id, = seed_portfolios(db, 1, policies_per_user=0)
+    agent = db.get(User, agent_id)
+    agent.role = "agent"
+    client_ids = seed_portfolios(db, n, policies_per_user=n, seed=n)
+    policies = db.execute(select(Policy.id, Policy.user_id).where(Policy.user_id.in_(client_ids))).all()
+    db.execute(insert(PolicyShare), [
+        {"policy_id": pid, "owner_id": uid, "shared_with_email": agent.email,
+         "permission": "view", "role_label": "broker", "accepted": True}
+        for pid, uid in policies
+    ])
+    db.execute(insert(PolicyDelta), [
+        {"policy_id": pid, "field_key": "premium_amount", "old_value": "100", "new_value": "120",
+         "delta_type": "increased", "severity": "warning"}
+        for pid, _ in policies for _ in range(2)
+    ])
+    db.execute(insert(CoverageScore), [
+        {"user_id": uid, "category": "overall", "score_total": 50} for uid in client_ids
+    ])
+    refresh(db.connection(), client_ids)  # bulk inserts bypass the stats flush hooks
+    db.commit()
+    return agent_id, client_ids[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs=2, default=[2, 10])
+    parser.add_argument("--strict", action="store_true", help="exit 1 if any endpoint's count grows")
+    parser.add_argument("--endpoints", nargs="*", default=ENDPOINTS)
+    args = parser.parse_args()
+
+    create_schema()
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.auth import create_access_token
+    from app.db import SessionLocal
+    from app.query_stats import capture_queries
+
+    results: dict[str, list] = {path: [] for path in args.endpoints}
+    with TestClient(app_main.app) as client:
+        for n in args.sizes:
+            db = SessionLocal()
+            agent_id, client_id = _seed_agent_book(db, n)
+            db.close()
+            for path in args.endpoints:
+                user = agent_id if path.startswith("/agent") else client_id
+                headers = {"Authorization": f"Bearer {create_access_token(user)}"}
+                with capture_queries() as stats:
+                    r = client.get(path.format(client_id=client_id), headers=headers)
+                if r.status_code != 200:
+                    raise SystemExit(f"{path}: HTTP {r.status_code} {r.text[:200]}")
+                results[path].append(stats)
+
+    small, large = args.sizes
+    grew = 0
+    print(f"{'endpoint':<38} {f'n={small}':>7} {f'n={large}':>7}  most repeated at n={large}")
+    for path, (a, b) in results.items():
+        top = b.repeated(1)[:1]
+        note = f"{top[0][1]}x {top[0][0][:70]}" if top else ""
+        flag = "  GROWS" if b.count > a.count else ""
+        grew += b.count > a.count
+        print(f"{path:<38} {a.count:7d} {b.count:7d}  {note}{flag}")
+
+    if args.strict and grew:
+        print(f"{grew} endpoint(s) issue queries per row")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Query plan regression check for the hot query shapes.
+
+    python -m benchmarks.query_plans [--users 2000]
+
+Seeds a synthetic dataset, runs ANALYZE, then EXPLAINs each hot query shape
+(written with the same filters as the routes that issue it) and checks that the
+planner picks the expected composite index. Exits non-zero if any shape
+regresses, so it can run in CI against SQLite or, with DATABASE_URL set, a
+scratch Postgres.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+
+def _seed_activity(db, user_ids: list[int], seed: int = 7):
+    """Deltas, shares, reminders, premiums, scores and audit rows for the seeded portfolios."""
+    from sqlalchemy import insert, select
+    from app.models import Policy
+    from app.models_features import PolicyDelta, PolicyShare, RenewalReminder, Premium, CoverageScore, AuditLog
+
+    rng = random.Random(seed)
+    today = date.today()
+    policies = db.execute(select(Policy.id, Policy.user_id).where(Policy.user_id.in_(user_ids))).all()
+
+    deltas, shares, reminders, premiums, audits = [], [], [], [], []
+    for pid, uid in policies:
+        for _ in range(4):
+            deltas.append({
+                "policy_id": pid, "field_key": "premium_amount", "old_value": "100", "new_value": "120",
+                "delta_type": "increased", "severity": rng.choice(["info", "warning", "critical"]),
+                "is_acknowledged": rng.random() < 0.7,
+            })
+        if rng.random() < 0.3:
+            shares.append({
+                "policy_id": pid, "owner_id": uid, "shared_with_email": f"agent{rng.randint(1, 50)}@example.com",
+                "permission": "view", "role_label": "broker", "accepted": rng.random() < 0.8,
+                "expires_at": rng.choice([None, today + timedelta(days=rng.randint(-30, 365))]),
+            })
+        for k in range(2):
+            reminders.append({
+                "policy_id": pid, "remind_at": today + timedelta(days=rng.randint(-60, 60)),
+                "dismissed": rng.random() < 0.8,
+            })
+        for m in range(12):
+            due = today - timedelta(days=30 * m)
+            premiums.append({
+                "policy_id": pid, "amount": 10_000, "frequency": "monthly", "due_date": due,
+                "paid_date": None if (m == 0 or rng.random() < 0.05) else due,
+            })
+    scores = [
+        {"user_id": uid, "category": cat, "score_total": rng.randint(0, 100)}
+        for uid in user_ids for cat in ("auto", "home", "life", "umbrella", "overall")
+    ]
+    for uid in user_ids:
+        for _ in range(30):
+            audits.append({"user_id": uid, "action": "updated", "entity_type": "policy", "entity_id": 1})
+
+    for model, rows in ((PolicyDelta, deltas), (PolicyShare, shares), (RenewalReminder, reminders),
+                        (Premium, premiums), (CoverageScore, scores), (AuditLog, audits)):
+        for i in range(0, len(rows), 5000):
+            db.execute(insert(model), rows[i:i + 5000])
+    db.commit()
+
+
+def hot_queries(user_id: int, policy_id: int, policy_ids: list[int]):
+    """(label, statement, expected index) for each hot query shape."""
+    from sqlalchemy import select, func
+    from app.models import Policy
+    from app.models_features import PolicyDelta, PolicyShare, RenewalReminder, Premium, CoverageScore, AuditLog
+
+    today = date.today()
+    return [
+        ("create_policy plan limit",
+         select(Policy).where(Policy.user_id == user_id, Policy.status == "active"),
+         "ix_policies_user_id_status"),
+        ("upcoming renewals",
+         select(Policy).where(Policy.user_id == user_id, Policy.renewal_date >= today,
+                              Policy.renewal_date <= today + timedelta(days=30)).order_by(Policy.renewal_date),
+         "ix_policies_user_id_renewal_date"),
+        ("policy deltas",
+         select(PolicyDelta).where(PolicyDelta.policy_id == policy_id).order_by(PolicyDelta.created_at.desc()),
+         "ix_policy_deltas_policy_id_created_at"),
+        ("unacknowledged deltas",
+         select(func.count(PolicyDelta.id)).where(PolicyDelta.policy_id.in_(policy_ids),
+                                                  PolicyDelta.is_acknowledged == False),  # noqa: E712
+         "ix_policy_deltas_policy_id_is_acknowledged"),
+        ("shared with me",
+         select(PolicyShare).where(PolicyShare.shared_with_email == "agent7@example.com",
+                                   PolicyShare.accepted == True,  # noqa: E712
+                                   (PolicyShare.expires_at.is_(None)) | (PolicyShare.expires_at >= today)),
+         "ix_policy_shares_email_accepted_expires_at"),
+        ("agent clients",
+         select(PolicyShare.owner_id).where(PolicyShare.shared_with_email == "agent7@example.com",
+                                            PolicyShare.role_label == "broker",
+                                            PolicyShare.accepted == True).distinct(),  # noqa: E712
+         "ix_policy_shares_email_role_accepted_owner"),
+        ("due reminders",
+         select(RenewalReminder).where(RenewalReminder.dismissed == False,  # noqa: E712
+                                       RenewalReminder.remind_at <= today),
+         "ix_renewal_reminders_dismissed_remind_at"),
+        ("overdue premium",
+         select(Premium).where(Premium.policy_id == policy_id, Premium.paid_date.is_(None),
+                               Premium.due_date < today).order_by(Premium.due_date),
+         "ix_premiums_policy_id_paid_date_due_date"),
+        ("overall score",
+         select(CoverageScore).where(CoverageScore.user_id == user_id, CoverageScore.category == "overall"),
+         "ix_coverage_scores_user_id_category"),
+        ("audit page",
+         select(AuditLog).where(AuditLog.user_id == user_id)
+         .order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(20),
+         "ix_audit_logs_user_id_created_at_desc"),
+    ]
+
+
+def explain(conn, stmt) -> str:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    rows = conn.exec_driver_sql(prefix + sql).all()
+    return "\n".join(" ".join(str(c) for c in row) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    create_schema()
+    from sqlalchemy import select
+    from app.db import SessionLocal, engine
+    from app.models import Policy
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    user_ids = seed_portfolios(db, args.users)
+    _seed_activity(db, user_ids)
+    print(f"seeded {args.users} users in {time.perf_counter() - start:.1f}s")
+
+    user_id = user_ids[len(user_ids) // 2]
+    policy_ids = db.execute(select(Policy.id).where(Policy.user_id == user_id)).scalars().all()
+    db.close()
+
+    failures = 0
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+        print(f"{'query':<28} {'ms':>8}  index")
+        for label, stmt, expected in hot_queries(user_id, policy_ids[0], policy_ids):
+            plan = explain(conn, stmt)
+            t0 = time.perf_counter()
+            conn.execute(stmt).all()
+            ms = (time.perf_counter() - t0) * 1000
+            ok = expected in plan
+            failures += not ok
+            print(f"{label:<28} {ms:8.2f}  {'ok  ' if ok else 'MISS'} {expected}")
+            if args.verbose or not ok:
+                print("    " + plan.replace("\n", "\n    "))
+
+    if failures:
+        print(f"{failures} query shape(s) not using their index")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
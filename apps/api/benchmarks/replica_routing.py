@@ -0,0 +1,145 @@
+"""
+Exercise read-replica routing locally with two SQLite files.
+
+    python -m benchmarks.replica_routing
+
+Creates a primary and a "replica" database (a copy of the primary taken before
+a later change, so it lags), then checks through the real app that:
+
+1. GET requests (sync and async routes) read from the replica,
+2. after a PUT, that user's reads stay on the primary for the
+   read-your-writes window, and other users keep reading the replica,
+3. on a worker that didn't see the write (its memory of recent writers
+   cleared), reads that send back the PUT's X-Last-Write still go to the
+   primary, and reads that don't go to the replica,
+4. a GET checks out one replica connection: replica health is cached,
+   not re-checked with a connection of its own on every request,
+5. once the window passes, reads go back to the replica,
+6. an unreachable replica falls back to the primary.
+
+Exits non-zero if any check fails. The same works with two Postgres URLs via
+DATABASE_URL / DATABASE_REPLICA_URLS (step 6 is skipped then).
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+WINDOW = 1
+
+_tmp = tempfile.mkdtemp(prefix="covrabl_replica_")
+PRIMARY = os.path.join(_tmp, "primary.db")
+REPLICA = os.path.join(_tmp, "replica.db")
+_local = not os.environ.get("DATABASE_URL")
+if _local:
+    os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+    os.environ["DATABASE_REPLICA_URLS"] = f"sqlite:///{REPLICA}"
+os.environ["DB_READ_YOUR_WRITES_SECONDS"] = str(WINDOW)
+
+from ._seed import create_schema, seed_portfolios  # noqa: E402
+
+failures = 0
+
+
+def check(label: str, got, expected):
+    global failures
+    ok = got == expected
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {label}: {got!r}" + ("" if ok else f" (expected {expected!r})"))
+
+
+def main():
+    create_schema()
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, update
+    import main as app_main
+    from app import db as app_db
+    from app.auth import create_access_token
+    from app.db import LAST_WRITE_HEADER, SessionLocal, engine, replica_engines
+    from app.models import Policy
+
+    if not replica_engines:
+        raise SystemExit("set DATABASE_REPLICA_URLS")
+
+    db = SessionLocal()
+    alice, bob = seed_portfolios(db, 2, policies_per_user=1)
+    alice_policy = db.query(Policy.id).filter(Policy.user_id == alice).scalar()
+    bob_policy = db.query(Policy.id).filter(Policy.user_id == bob).scalar()
+    db.close()
+
+    if _local:
+        # Snapshot the primary as the replica, then change the primary so the replica lags
+        engine.dispose()
+        shutil.copy(PRIMARY, REPLICA)
+    with engine.begin() as conn:
+        conn.execute(update(Policy).values(carrier="primary"))
+    if not _local:
+        print("note: with external databases, make sure the replica still shows the old carrier")
+
+    headers = {u: {"Authorization": f"Bearer {create_access_token(u)}"} for u in (alice, bob)}
+
+    def carrier(user, policy_id, async_route=False, **extra):
+        """Which database served the read: the primary has carrier "primary", the replica doesn't."""
+        if async_route:
+            rows = client.get("/policies", headers={**headers[user], **extra}).json()
+            value = next(p["carrier"] for p in rows if p["id"] == policy_id)
+        else:
+            value = client.get(f"/policies/{policy_id}", headers={**headers[user], **extra}).json()["carrier"]
+        return "primary" if value == "primary" else "replica"
+
+    checkouts = {"count": 0}
+
+    def _count_checkout(dbapi_conn, record, proxy):
+        checkouts["count"] += 1
+
+    for e in replica_engines:
+        event.listen(e, "checkout", _count_checkout)
+
+    with TestClient(app_main.app) as client:
+        check("sync GET reads", carrier(alice, alice_policy), "replica")
+        check("async GET reads", carrier(alice, alice_policy, async_route=True), "replica")
+
+        r = client.put(f"/policies/{alice_policy}", json={"nickname": "Edited"}, headers=headers[alice])
+        check("PUT status", r.status_code, 200)
+        check("writer's sync GET within window", carrier(alice, alice_policy), "primary")
+        check("writer's async GET within window", carrier(alice, alice_policy, async_route=True), "primary")
+        check("other user's GET within window", carrier(bob, bob_policy), "replica")
+
+        last_write = r.headers.get(LAST_WRITE_HEADER)
+        check("PUT response carries X-Last-Write", last_write is not None, True)
+        app_db._last_write.clear()  # as if the next request landed on another worker
+        check("other worker, GET echoing X-Last-Write", carrier(alice, alice_policy, **{LAST_WRITE_HEADER: last_write}),
+              "primary")
+        check("other worker, async GET echoing it",
+              carrier(alice, alice_policy, async_route=True, **{LAST_WRITE_HEADER: last_write}), "primary")
+        check("other worker, GET without it", carrier(alice, alice_policy), "replica")
+        check("GET doesn't carry X-Last-Write",
+              LAST_WRITE_HEADER in client.get(f"/policies/{bob_policy}", headers=headers[bob]).headers, False)
+
+        checkouts["count"] = 0
+        carrier(bob, bob_policy)
+        check("replica checkouts per GET (health cached)", checkouts["count"], 1)
+
+        time.sleep(WINDOW + 0.2)
+        check("writer's GET after window", carrier(alice, alice_policy), "replica")
+        check("GET echoing an expired X-Last-Write",
+              carrier(alice, alice_policy, **{LAST_WRITE_HEADER: last_write}), "replica")
+
+        if _local:
+            # Take the replica "offline": drop pooled connections and make the path unopenable
+            for e in replica_engines:
+                e.dispose()
+            os.remove(REPLICA)
+            os.mkdir(REPLICA)
+            app_db._replica_up_until.clear()  # past its health interval
+            check("GET with replica down", carrier(bob, bob_policy), "primary")
+
+    shutil.rmtree(_tmp, ignore_errors=True)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Batch coverage scoring (app.score_batch): equivalence with the per-user path, and throughput.
+
+    python -m benchmarks.score_batch [--users 20000] [--edge-users 500] [--check 1000] [--batch-size 5000]
+
+Seeds --users ordinary portfolios plus --edge-users with awkward data:
+coverage at and around every threshold, None/zero/negative amounts, mixed-case
+and unknown policy types, placeholder policies, renters with and without home,
+home policies exactly two years old, and coverage_type details that are
+missing, empty, duplicated or differently cased.
+
+Checks that the batch engine returns exactly what ``_score_user`` does for
+every edge user and --check ordinary ones, and that stored rows match and
+read back through GET /coverage-scores as current. Then times load, compute
+and store over all users; the target is 100k users a minute on one core.
+Exits non-zero if any check fails.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from ._seed import use_temp_database, create_schema, seed_portfolios
+
+use_temp_database()
+
+EDGE_TYPES = ["auto", "AUTO", "home", "Home", "life", "umbrella", "renters", "general_liability",
+              "professional_liability", "commercial_property", "cyber", "health", "pet", ""]
+EDGE_AMOUNTS = [None, 0, -5, 1, 50_000, 99_999, 100_000, 100_001, 249_999, 250_000, 499_999, 500_000,
+                999_999, 1_000_000, 2_000_000]
+EDGE_AGES = [0, 1, 729, 730, 731, 1500, 4000]  # days
+COVERAGE_TYPES = ["", "Comprehensive", "COLLISION only", "comprehensive, collision, uninsured motorist",
+                  "liability", "Uninsured Motorist"]
+
+
+def _seed_edge_users(db, n: int) -> list[int]:
+    from sqlalchemy import insert, select, func
+    from app.models import Policy, PolicyDetail
+    from app.routes_scores import PLACEHOLDER_CARRIER
+
+    rng = random.Random(7)
+    user_ids = seed_portfolios(db, n, policies_per_user=0)
+    first = (db.execute(select(func.max(Policy.id))).scalar() or 0) + 1
+    now = datetime.now()
+    policies, details = [], []
+    pid = first
+    for uid in user_ids:
+        for _ in range(rng.choice([0, 1, 2, 4, 8, 12])):
+            policies.append({
+                "id": pid, "user_id": uid, "scope": "personal", "policy_type": rng.choice(EDGE_TYPES),
+                "carrier": PLACEHOLDER_CARRIER if rng.random() < 0.05 else "Acme",
+                "policy_number": f"E-{pid:08d}",
+                "coverage_amount": rng.choice(EDGE_AMOUNTS + [rng.randint(0, 3_000_000)]),
+                "created_at": now - timedelta(days=rng.choice(EDGE_AGES + [rng.randint(0, 3000)]), hours=rng.randint(0, 20)),
+            })
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                details.append({"policy_id": pid, "field_name": rng.choice(["coverage_type", "Coverage_Type", "vin"]),
+                                "field_value": rng.choice(COVERAGE_TYPES)})
+            pid += 1
+    if policies:
+        db.execute(insert(Policy), policies)
+    if details:
+        db.execute(insert(PolicyDetail), details)
+    db.commit()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--edge-users", type=int, default=500)
+    parser.add_argument("--check", type=int, default=1000, help="ordinary users compared with the per-user path")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    create_schema()
+    import json
+    from sqlalchemy import select
+    from fastapi.testclient import TestClient
+    import main as app_main
+    from app.auth import create_access_token
+    from app.db import SessionLocal, engine
+    from app.models_features import CoverageScore
+    from app.routes_scores import _score_user
+    from app.score_batch import compute, data_versions, load, score_users
+    from app.score_queue import score_queue
+
+    db = SessionLocal()
+    t0 = time.perf_counter()
+    ordinary = seed_portfolios(db, args.users)
+    edge = _seed_edge_users(db, args.edge_users)
+    db.close()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    print(f"seeded {args.users} + {args.edge_users} edge-case users in {time.perf_counter() - t0:.1f}s")
+
+    sample = edge + random.Random(1).sample(ordinary, min(args.check, len(ordinary)))
+    with engine.connect() as conn:
+        batch = compute(load(conn, sample))
+    mismatched = []
+    t0 = time.perf_counter()
+    with SessionLocal() as s:
+        for uid in sample:
+            if batch[uid] != _score_user(s, uid):
+                mismatched.append(uid)
+    per_user_s = time.perf_counter() - t0
+    for uid in mismatched[:3]:
+        with SessionLocal() as s:
+            print(f"user {uid}:\n  batch    {batch[uid]}\n  per-user {_score_user(s, uid)}")
+    checks = [(f"same results as _score_user ({len(sample)} users)", not mismatched)]
+
+    # Time over every user: load + compute (dry run), then with storing
+    all_users = ordinary + edge
+    timings = {"load": 0.0, "compute": 0.0}
+    with engine.connect() as conn:
+        for i in range(0, len(all_users), args.batch_size):
+            chunk = all_users[i:i + args.batch_size]
+            t0 = time.perf_counter()
+            data_versions(conn, chunk)
+            cols = load(conn, chunk)
+            t1 = time.perf_counter()
+            compute(cols)
+            timings["load"] += t1 - t0
+            timings["compute"] += time.perf_counter() - t1
+    t0 = time.perf_counter()
+    for i in range(0, len(all_users), args.batch_size):
+        with engine.begin() as conn:
+            score_users(conn, all_users[i:i + args.batch_size])
+    stored_s = time.perf_counter() - t0
+
+    n = len(all_users)
+    print(f"\n{'stage (' + str(n) + ' users)':<28} {'seconds':>8} {'users/min':>12}")
+    for label, seconds in (("load", timings["load"]), ("compute", timings["compute"]),
+                           ("load + compute", timings["load"] + timings["compute"]),
+                           ("load + compute + store", stored_s)):
+        print(f"{label:<28} {seconds:8.2f} {n / seconds * 60:12,.0f}")
+    print(f"{'(_score_user, per user)':<28} {'':>8} {len(sample) / per_user_s * 60:12,.0f}\n")
+
+    with engine.connect() as conn:
+        stored = {}
+        for row in conn.execute(select(CoverageScore).where(CoverageScore.user_id.in_(sample))):
+            stored.setdefault(row.user_id, {})[row.category] = (row.score_total, json.loads(row.score_breakdown),
+                                                                json.loads(row.insights))
+    expected = {uid: {**{c: (d["score"], d["breakdown"], d["insights"]) for c, d in r["categories"].items()},
+                      "overall": (r["overall"]["score"], r["overall"]["breakdown"], r["overall"]["insights"])}
+                for uid, r in batch.items()}
+    checks.append(("stored rows match", stored == expected))
+
+    with TestClient(app_main.app) as client:
+        served = [client.get("/coverage-scores", headers={"Authorization": f"Bearer {create_access_token(uid)}"}).json()
+                  for uid in sample[:20]]
+        queued = score_queue.pending() + score_queue.computed  # a stale read would have queued a recompute
+    checks.append(("GET serves the batch scores as current", served == [batch[uid] for uid in sample[:20]] and not queued))
+
+    failures = 0
+    for label, ok in checks:
+        failures += not ok
+        print(f"{label:<48} {'ok' if ok else 'FAILED'}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Mixed read/write throughput on SQLite, default vs production profile.
+
+    python -m benchmarks.sqlite_mixed [--threads 16] [--duration 10] [--write-ratio 0.2]
+
+Runs the same workload once per SQLITE_PROFILE, each in a fresh process on its
+own database file: worker threads open app sessions and either read a user's
+policies with their details or update a policy and write an audit row (the
+shape of a PUT /policies/{id}). Reports operations/s, p50/p99 per kind and how
+many operations failed (e.g. "database is locked").
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+PROFILES = ("default", "production")
+
+
+def _workload(threads: int, duration: float, write_ratio: float, users: int) -> dict:
+    from ._seed import use_temp_database, create_schema, seed_portfolios, percentile
+
+    use_temp_database()
+    create_schema()
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from app.db import SessionLocal
+    from app.models import Policy
+    from app.models_features import AuditLog
+
+    db = SessionLocal()
+    user_ids = seed_portfolios(db, users)
+    policies = db.execute(select(Policy.id, Policy.user_id)).all()
+    db.close()
+
+    latencies: dict[str, list[float]] = {"read": [], "write": []}
+    errors: dict[str, int] = {"read": 0, "write": 0}
+    deadline = time.monotonic() + duration
+
+    def read(db, rng):
+        uid = rng.choice(user_ids)
+        rows = db.query(Policy).options(selectinload(Policy.details)).filter(Policy.user_id == uid).all()
+        sum(len(p.details) for p in rows)
+
+    def write(db, rng):
+        pid, uid = rng.choice(policies)
+        policy = db.get(Policy, pid)
+        policy.nickname = f"n{rng.randrange(1_000_000)}"
+        db.add(AuditLog(user_id=uid, action="updated", entity_type="policy", entity_id=pid))
+        db.commit()
+
+    def worker(i: int):
+        rng = random.Random(i)
+        while time.monotonic() < deadline:
+            kind = "write" if rng.random() < write_ratio else "read"
+            start = time.perf_counter()
+            db = SessionLocal()
+            try:
+                (write if kind == "write" else read)(db, rng)
+            except Exception:
+                errors[kind] += 1
+                db.rollback()
+            finally:
+                db.close()
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+
+    started = time.monotonic()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        kind: {
+            "ops": len(lat) / elapsed,
+            "p50": percentile(lat, 50),
+            "p99": percentile(lat, 99),
+            "errors": errors[kind],
+        }
+        for kind, lat in latencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_workload(args.threads, args.duration, args.write_ratio, args.users)))
+        return
+
+    if os.environ.get("DATABASE_URL"):
+        raise SystemExit("this benchmark creates its own SQLite files; unset DATABASE_URL")
+    print(f"{args.threads} threads x {args.duration:.0f}s, {args.write_ratio:.0%} writes")
+    print(f"{'profile':<12} {'kind':<6} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for profile in PROFILES:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.sqlite_mixed", "--child",
+             "--threads", str(args.threads), "--duration", str(args.duration),
+             "--write-ratio", str(args.write_ratio), "--users", str(args.users)],
+            env={**os.environ, "SQLITE_PROFILE": profile, "RAILWAY_ENVIRONMENT": "bench"},
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        for kind, r in result.items():
+            print(f"{profile:<12} {kind:<6} {r['ops']:9.1f} {r['p50']:9.1f} {r['p99']:9.1f} {r['errors']:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,19 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app.db import engine, Base
+from app.db import LAST_WRITE_HEADER, ReadYourWritesMiddleware, engine, async_engine
+from app.config import settings
+from app.query_stats import QueryStatsMiddleware
+from app.pagination import NEXT_CURSOR_HEADER
 from app.models import User, Policy, Contact, CoverageItem, PolicyDetail, PasswordReset, Exposure  # noqa: F401 — register models
 from app.models_documents import Document  # noqa: F401
-from app.models_features import Premium, Claim, RenewalReminder, AuditLog, PolicyShare, EmergencyCard, PremiumHistory, PolicyDelta, DeltaExplanation, CoverageScore, InboundAddress, InboundEmail, PolicyDraft, Certificate, CertificateReminder  # noqa: F401
+from app.models_features import Premium, Claim, RenewalReminder, AuditLog, PolicyShare, EmergencyCard, PremiumHistory, PolicyDelta, DeltaExplanation, CoverageScore, InboundAddress, InboundEmail, PolicyDraft, Certificate, CertificateReminder, UserDataVersion, UserPortfolioStats, AuditJournalSegment  # noqa: F401
 from app.models_profile import UserProfile, ProfileContact  # noqa: F401
 from app.models_chat import Conversation, ChatMessage  # noqa: F401
+# Flush hooks: per-user data versions, user_portfolio_stats, policies.details_json
+from app import data_version, policy_details, portfolio_stats  # noqa: F401
+from app.audit_writer import audit_writer
+from app.score_queue import score_queue
 
 from app.routes_auth import router as auth_router
 from app.routes_policies import router as policies_router
@@ -40,6 +47,7 @@ from app.routes_certificates import router as certificates_router
 from app.routes_profile import router as profile_router
 from app.routes_billing import router as billing_router
 from app.routes_chat import router as chat_router
+from app.routes_health import router as health_router
 
 app = FastAPI(title="Covrabl API")
 
@@ -57,6 +65,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, LAST_WRITE_HEADER],
+)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(
+    QueryStatsMiddleware,
+    headers=settings.query_stats_headers,
+    repeat_threshold=settings.query_stats_repeat_warn,
 )
 
 
@@ -78,65 +93,29 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 @app.on_event("startup")
 def on_startup():
-    logging.info("Starting up — creating tables if needed")
-    Base.metadata.create_all(bind=engine)
-    # Add nickname column to existing policies table if missing
-    from sqlalchemy import inspect, text
-    insp = inspect(engine)
-    if "policies" in insp.get_table_names():
-        cols = [c["name"] for c in insp.get_columns("policies")]
-        with engine.begin() as conn:
-            if "nickname" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN nickname VARCHAR(200)"))
-            if "premium_amount" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN premium_amount INTEGER"))
-            if "business_name" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN business_name VARCHAR(200)"))
-            if "exposure_id" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN exposure_id INTEGER"))
-            if "status" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN status VARCHAR(20) DEFAULT 'active'"))
-            # Health-specific fields
-            if "plan_subtype" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN plan_subtype VARCHAR(30)"))
-            if "out_of_pocket_max" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN out_of_pocket_max INTEGER"))
-            if "family_deductible" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN family_deductible INTEGER"))
-            if "family_oop_max" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN family_oop_max INTEGER"))
-            # Deductible tracking
-            if "deductible_type" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN deductible_type VARCHAR(20)"))
-            if "deductible_period_start" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN deductible_period_start DATE"))
-            if "deductible_applied" not in cols:
-                conn.execute(text("ALTER TABLE policies ADD COLUMN deductible_applied INTEGER"))
-    if "users" in insp.get_table_names():
-        user_cols = [c["name"] for c in insp.get_columns("users")]
-        with engine.begin() as conn:
-            if "role" not in user_cols:
-                conn.execute(text("ALTER TABLE users ADD COLUMN role VARCHAR(20) DEFAULT 'individual'"))
-            if "plan" not in user_cols:
-                conn.execute(text("ALTER TABLE users ADD COLUMN plan VARCHAR(20) DEFAULT 'trial'"))
-            if "stripe_customer_id" not in user_cols:
-                conn.execute(text("ALTER TABLE users ADD COLUMN stripe_customer_id VARCHAR(100)"))
-            if "stripe_subscription_id" not in user_cols:
-                conn.execute(text("ALTER TABLE users ADD COLUMN stripe_subscription_id VARCHAR(100)"))
-            if "trial_ends_at" not in user_cols:
-                conn.execute(text("ALTER TABLE users ADD COLUMN trial_ends_at TIMESTAMP"))
-    if "documents" in insp.get_table_names():
-        doc_cols = [c["name"] for c in insp.get_columns("documents")]
-        with engine.begin() as conn:
-            if "cached_text" not in doc_cols:
-                conn.execute(text("ALTER TABLE documents ADD COLUMN cached_text TEXT"))
-    if "policy_shares" in insp.get_table_names():
-        share_cols = [c["name"] for c in insp.get_columns("policy_shares")]
-        with engine.begin() as conn:
-            if "role_label" not in share_cols:
-                conn.execute(text("ALTER TABLE policy_shares ADD COLUMN role_label VARCHAR(30)"))
-            if "expires_at" not in share_cols:
-                conn.execute(text("ALTER TABLE policy_shares ADD COLUMN expires_at DATE"))
+    # Schema changes are applied by `python -m app.migrate`; startup only checks
+    # that it ran (a single query, no introspection).
+    from app.migrations import HEAD, current_version, migrate
+    version = current_version(engine)
+    if version < HEAD:
+        if not settings.db_auto_migrate:
+            raise RuntimeError(
+                f"Database schema is at version {version} but this build expects {HEAD}. "
+                "Run `python -m app.migrate` (or set DB_AUTO_MIGRATE=true)."
+            )
+        logging.info("Database at schema version %d, migrating to %d", version, HEAD)
+        migrate(engine)
+    if settings.audit_buffered:
+        audit_writer.start()
+    if settings.scores_background:
+        score_queue.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    score_queue.stop()
+    audit_writer.stop()
+    await async_engine.dispose()
 
 
 app.include_router(files_router)
@@ -166,3 +145,4 @@ app.include_router(certificates_router)
 app.include_router(profile_router)
 app.include_router(billing_router)
 app.include_router(chat_router)
+app.include_router(health_router)
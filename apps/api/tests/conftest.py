@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+# A throwaway SQLite file and audit journal; must be set before anything imports app.*
+if not os.environ.get("DATABASE_URL"):
+    fd, path = tempfile.mkstemp(prefix="covrabl_test_", suffix=".db")
+    os.close(fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+os.environ.setdefault("AUDIT_JOURNAL_DIR", tempfile.mkdtemp(prefix="covrabl_audit_"))
+
+import pytest
+
+from app.query_stats import capture_queries
+
+
+@pytest.fixture
+def query_counter():
+    """Context manager that counts the statements run inside it (including inside requests)."""
+    return capture_queries
+
+
+@pytest.fixture
+def query_scaling():
+    """Fail if an endpoint's statement count grows with the data it reads (N+1).
+
+    ``query_scaling(call, grow)``: ``grow(n)`` brings the data the endpoint reads
+    to size ``n``; ``call()`` is run at each size and its statements counted.
+    """
+    def check(call, grow, sizes: tuple[int, ...] = (2, 10), slack: int = 0) -> dict[int, int]:
+        counts = {}
+        shapes = {}
+        for n in sizes:
+            grow(n)
+            with capture_queries() as stats:
+                call()
+            counts[n] = stats.count
+            shapes[n] = stats.shapes
+        small, large = sizes[0], sizes[-1]
+        if counts[large] > counts[small] + slack:
+            grown = [
+                f"  {shapes[large][shape]}x (was {shapes[small][shape]}x) {shape[:160]}"
+                for shape in shapes[large]
+                if shapes[large][shape] > shapes[small][shape]
+            ]
+            pytest.fail(
+                f"query count grows with data size: {counts}\n" + "\n".join(grown),
+                pytrace=False,
+            )
+        return counts
+
+    return check
@@ -0,0 +1,30 @@
+"""Chat answer cache: only the same question, in the same mode, is a hit."""
+
+from app.chat_cache import ChatAnswerCache
+
+
+def _cache_with(question: str, mode: str = "context") -> ChatAnswerCache:
+    cache = ChatAnswerCache(max_entries=10, ttl_seconds=60)
+    cache.put(1, mode, "v1", question, "cached answer")
+    return cache
+
+
+def test_rewording_of_the_same_question_hits():
+    cache = _cache_with("What does my homeowners policy cover?")
+    assert cache.get(1, "context", "v1", "what does my house cover") == "cached answer"
+
+
+def test_questions_differing_in_a_key_term_miss():
+    cache = _cache_with("Is water backup damage covered?")
+    assert cache.get(1, "context", "v1", "Is water damage from a sewer line covered?") is None
+    cache = _cache_with("Is 123 Main St covered?")
+    assert cache.get(1, "context", "v1", "Is 125 Main St covered?") is None
+    cache = _cache_with("Does my home policy cover my car?")
+    assert cache.get(1, "context", "v1", "Does my car policy cover my home?") is None
+
+
+def test_scoped_to_user_mode_and_data_version():
+    cache = _cache_with("What does my auto cover?")
+    assert cache.get(2, "context", "v1", "What does my auto cover?") is None
+    assert cache.get(1, "tools", "v1", "What does my auto cover?") is None
+    assert cache.get(1, "context", "v2", "What does my auto cover?") is None
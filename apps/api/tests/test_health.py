@@ -0,0 +1,32 @@
+"""Only the bare /health probe is public; the telemetry routes need the health token."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.config import settings
+
+TELEMETRY = ["/health/db", "/health/audit", "/health/scores"]
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_liveness_probe_is_public(client):
+    assert client.get("/health").json() == {"status": "ok"}
+
+
+@pytest.mark.parametrize("path", TELEMETRY)
+def test_telemetry_disabled_without_a_token(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "health_token", "")
+    assert client.get(path, headers={"X-Health-Token": ""}).status_code == 404
+
+
+@pytest.mark.parametrize("path", TELEMETRY)
+def test_telemetry_needs_the_token(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "health_token", "s3cret")
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Health-Token": "wrong"}).status_code == 403
+    assert client.get(path, headers={"X-Health-Token": "s3cret"}).status_code == 200
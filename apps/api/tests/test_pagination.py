@@ -0,0 +1,39 @@
+"""Keyset cursors: the anchor row is looked up within the listing's own filters."""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.db import SessionLocal, engine
+from app.migrations import migrate
+from app.models import User
+from app.models_chat import Conversation
+from app.pagination import apply_keyset, encode_cursor
+
+
+def _user_with_conversations(db, updated: list[datetime]) -> int:
+    user = User(email=f"pages-{uuid.uuid4().hex[:8]}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add_all(Conversation(user_id=user.id, title=f"c{i}", updated_at=at) for i, at in enumerate(updated))
+    db.flush()
+    return user.id
+
+
+def test_cursor_naming_another_users_row_does_not_anchor_on_it():
+    migrate(engine)
+    with SessionLocal() as db:
+        mine = _user_with_conversations(db, [datetime(2024, 1, day) for day in (1, 10, 20)])
+        theirs = _user_with_conversations(db, [datetime(2024, 1, 15)])
+        their_row = db.execute(select(Conversation.id).where(Conversation.user_id == theirs)).scalar()
+
+        def page(cursor):
+            stmt = apply_keyset(select(Conversation.updated_at).where(Conversation.user_id == mine),
+                                [Conversation.updated_at, Conversation.id], cursor, 10, [datetime.fromisoformat, int])
+            return db.execute(stmt).scalars().all()
+
+        # Anchoring on their row (Jan 15) would return Jan 10 and Jan 1; the cursor's own value is used instead
+        crafted = encode_cursor(datetime(2024, 1, 31), their_row)
+        assert page(crafted) == [datetime(2024, 1, day) for day in (20, 10, 1)]
+        db.rollback()
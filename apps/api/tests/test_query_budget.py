@@ -0,0 +1,63 @@
+"""Statement budgets for list endpoints: a fixed number of queries, whatever the portfolio size."""
+
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.auth import create_access_token
+from app.db import SessionLocal, engine
+from app.migrations import migrate
+from app.models import Contact, Policy, PolicyDetail, User
+
+
+@pytest.fixture(scope="module")
+def client():
+    migrate(engine)
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def user_id():
+    with SessionLocal() as db:
+        user = User(email=f"budget-{uuid.uuid4().hex[:8]}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+def _grow_policies(user_id: int):
+    def grow(n: int):
+        with SessionLocal() as db:
+            have = len(db.query(Policy.id).filter(Policy.user_id == user_id).all())
+            for i in range(have, n):
+                policy = Policy(user_id=user_id, scope="personal", policy_type="auto", carrier="Acme",
+                                policy_number=f"P-{i}", renewal_date=date.today() + timedelta(days=30 + i))
+                policy.contacts.append(Contact(role="claims", name=f"Claims {i}"))
+                policy.details.append(PolicyDetail(field_name="vin", field_value=f"VIN{i}"))
+                db.add(policy)
+            db.commit()
+    return grow
+
+
+def test_list_policies_query_count_is_flat(client, user_id, query_scaling):
+    headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+    def call():
+        response = client.get("/policies", headers=headers)
+        assert response.status_code == 200
+
+    counts = query_scaling(call, _grow_policies(user_id), sizes=(2, 12))
+    assert counts[12] <= 5, counts  # user, policies, contacts, exposures, shares
+
+
+def test_get_policy_query_budget(client, user_id, query_counter):
+    _grow_policies(user_id)(1)
+    with SessionLocal() as db:
+        policy_id = db.query(Policy.id).filter(Policy.user_id == user_id).scalar()
+    with query_counter() as stats:
+        response = client.get(f"/policies/{policy_id}", headers={"Authorization": f"Bearer {create_access_token(user_id)}"})
+    assert response.status_code == 200
+    assert stats.count <= 3, stats.shapes  # user, policy with its contacts and details
@@ -0,0 +1,21 @@
+"""RoutingSession: which statements count as writes."""
+
+from sqlalchemy import select, text, update
+
+from app.db import SessionLocal
+from app.models import Policy
+
+
+def test_reads_including_raw_sql_keep_the_session_on_reads():
+    with SessionLocal() as db:
+        db.info["read_only"] = True
+        db.get_bind(clause=select(Policy.id))
+        db.get_bind(clause=text("SELECT count(*) FROM policies"))
+        assert not db.info.get("wrote")
+
+
+def test_core_dml_goes_to_the_primary():
+    with SessionLocal() as db:
+        db.info["read_only"] = True
+        assert db.get_bind(clause=update(Policy).values(nickname="x")) is db.primary
+        assert db.info["wrote"]
@@ -0,0 +1,78 @@
+"""
+Writes under the SQLite production profile (SQLITE_PROFILE=production).
+
+The profile is chosen when app.db is imported, so each case runs the app in
+a fresh interpreter on its own database file.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+_SCRIPT = """
+import json
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import main
+from app.auth import create_access_token
+from app.db import SessionLocal, engine
+from app.migrations import migrate
+from app.models import Policy, User
+from app.models_features import RenewalReminder
+
+migrate(engine)
+with SessionLocal() as db:
+    user = User(email="writer@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    policy = Policy(user_id=user.id, scope="personal", policy_type="auto", carrier="Acme", policy_number="P-1",
+                    renewal_date=date.today() + timedelta(days=20))
+    db.add(policy)
+    db.commit()
+    user_id, policy_id = user.id, policy.id
+
+headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+renewal = date.today() + timedelta(days=60)
+with TestClient(main.app) as client:
+    statuses = [
+        client.put(f"/policies/{policy_id}", json={"renewal_date": str(renewal)}, headers=headers).status_code,
+        client.put(f"/policies/{policy_id}", json={"nickname": "Car"}, headers=headers).status_code,
+    ]
+with SessionLocal() as db:
+    stored = db.execute(select(Policy.renewal_date, Policy.nickname).where(Policy.id == policy_id)).one()
+    reminders = db.execute(select(RenewalReminder.remind_at).where(RenewalReminder.policy_id == policy_id)).all()
+print(json.dumps({"statuses": statuses, "renewal_date": str(stored.renewal_date), "nickname": stored.nickname,
+                  "reminders": len(reminders)}))
+"""
+
+
+@pytest.mark.parametrize("audit_buffered", ["true", "false"])
+def test_put_policy_with_production_profile(audit_buffered):
+    tmp = tempfile.mkdtemp(prefix="covrabl_test_")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'app.db')}",
+        "SQLITE_PROFILE": "production",
+        "SQLITE_BUSY_TIMEOUT_MS": "1000",  # a lock conflict fails the request quickly instead of hanging
+        "AUDIT_BUFFERED": audit_buffered,
+        "AUDIT_JOURNAL_DIR": os.path.join(tmp, "audit_journal"),
+    }
+    env.pop("DATABASE_REPLICA_URLS", None)
+    done = subprocess.run([sys.executable, "-c", _SCRIPT], cwd=API_DIR, env=env, capture_output=True, text=True,
+                          timeout=120)
+    assert done.returncode == 0, done.stderr[-2000:]
+    result = json.loads(done.stdout.strip().splitlines()[-1])
+
+    assert result["statuses"] == [200, 200]
+    assert result["nickname"] == "Car"
+    assert result["reminders"] == 3  # 30/14/7 days before the new renewal date
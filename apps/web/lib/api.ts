@@ -8,6 +8,16 @@ function getToken(): string | null {
   return localStorage.getItem("pv_token");
 }
 
+// The API reads from replicas; after a write it sends X-Last-Write, and echoing it
+// back keeps our reads on the primary (whichever server answers) until replicas catch up
+const LAST_WRITE_HEADER = "X-Last-Write";
+let lastWrite: string | null = null;
+
+function rememberLastWrite(res: Response) {
+  const value = res.headers.get(LAST_WRITE_HEADER);
+  if (value) lastWrite = value;
+}
+
 async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
   const url = `${API_BASE}${path}`;
   const token = getToken();
@@ -17,8 +27,10 @@ async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
     ...(options.headers as Record<string, string> || {}),
   };
   if (token) headers["Authorization"] = `Bearer ${token}`;
+  if (lastWrite) headers[LAST_WRITE_HEADER] = lastWrite;
 
   const res = await fetch(url, { ...options, headers });
+  rememberLastWrite(res);
   const text = await res.text();
   const data = text ? safeJsonParse(text) : null;
 